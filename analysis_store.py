@@ -0,0 +1,33 @@
+import threading
+from collections import OrderedDict
+
+MAX_STORED_ANALYSES = 16
+
+
+class AnalysisStore:
+    """Bounded LRU of recent analyses, keyed by result ID.
+
+    Each entry is a dict holding the JSON result plus in-memory artifacts (the
+    compact graph, render inputs, a rendered PNG once requested) so follow-up
+    requests can be answered without re-running the analysis.
+    """
+
+    def __init__(self, max_entries=MAX_STORED_ANALYSES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, result_id, **entry):
+        with self._lock:
+            self._entries[result_id] = entry
+            self._entries.move_to_end(result_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get(self, result_id):
+        with self._lock:
+            entry = self._entries.get(result_id)
+            if entry is not None:
+                self._entries.move_to_end(result_id)
+            return entry
@@ -1,353 +1,624 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_file, g, Response
 from flask_cors import CORS
 import pandas as pd
-import networkx as nx
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import base64
 import io
 import time
 import logging
+import os
+import json
 from datetime import timedelta
 import numpy as np
-from matplotlib.patches import Patch
 from collections import Counter
+from itertools import chain
+from ingest import read_transactions, IngestError, REQUIRED_COLUMNS
+from jobs import JobManager, QueueFullError
+from cache import ResultCache, hash_upload, hash_batch
+from render import select_viz_nodes, classify_viz_nodes, render_network_png, encode_png
+from analysis_store import AnalysisStore
+from streaming import StreamingDetector
+from merchants import DEFAULT_CLASSIFIER
+from metrics import RunMetrics, MetricsRegistry
+from store import TransactionStore
+from investigate import account_detail, ring_detail
+from rings import consolidate_rings
+from pipeline import Pipeline, DEFAULT_PARAMS, DETECTORS
+from budget import Budget
+from snapshot import save_graph, load_graph, prune_snapshots
+from results import SECTIONS, dumps, parse_query, page, summary_view, iter_ndjson
+from utils import validate_csv_structure
 
 app = Flask(__name__)
 CORS(app, origins=['http://127.0.0.1:5500', 'http://localhost:5500', 'http://127.0.0.1:3000', 'http://localhost:3000'])
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper())
+# At DEBUG, only the first LOG_RING_SAMPLE rings of an analysis are logged individually
+LOG_RING_SAMPLE = int(os.environ.get('LOG_RING_SAMPLE', 5))
+
+DETECTION_PARAMS = {
+    **DEFAULT_PARAMS,
+    # Registered detectors to run (see pipeline.py), e.g. DETECTORS=fan_in,fan_out,cycles,shell_chains
+    'detectors': os.environ.get('DETECTORS', ','.join(DEFAULT_PARAMS['detectors'])).split(','),
+    'cycle_mode': os.environ.get('CYCLE_MODE', DEFAULT_PARAMS['cycle_mode']),
+    # Only name patterns mark merchants here: the volume rule would also drop large fan-in aggregators
+    'merchant_min_receipts': None,
+    # Also return rings that share members merged into clusters
+    'consolidate_rings': os.environ.get('CONSOLIDATE_RINGS', '').lower() in ('1', 'true', 'yes'),
+    'max_seconds': float(os.environ['ANALYSIS_MAX_SECONDS']) if os.environ.get('ANALYSIS_MAX_SECONDS') else None
+}
+# Detectors run cheapest first, so a spent budget cuts the expensive searches
+STAGES = ['parse', 'graph'] + [name for name in DETECTORS if name in DETECTION_PARAMS['detectors']] + ['scoring', 'render']
+# Worker processes for the cycle and shell searches; results do not depend on it, so it is not a detection parameter
+DETECTION_WORKERS = int(os.environ.get('DETECTION_WORKERS', 1))
+# Directory for memory-mappable graph snapshots of recent uploads (see snapshot.py); off when unset
+GRAPH_SNAPSHOT_DIR = os.environ.get('GRAPH_SNAPSHOT_DIR')
+if GRAPH_SNAPSHOT_DIR:
+    os.makedirs(GRAPH_SNAPSHOT_DIR, exist_ok=True)
+JOBS = JobManager()
+RESULT_CACHE = ResultCache(disk_dir=os.environ.get('RESULT_CACHE_DIR'))
+ANALYSES = AnalysisStore()
+# Persistent transaction history, enabled by pointing TRANSACTION_STORE_PATH at a SQLite file
+TRANSACTION_STORE_PATH = os.environ.get('TRANSACTION_STORE_PATH')
+TRANSACTIONS = TransactionStore(TRANSACTION_STORE_PATH) if TRANSACTION_STORE_PATH else None
+METRICS = MetricsRegistry()
+METRICS.describe('analysis_stage_seconds', 'Time spent in each analysis stage')
+METRICS.describe('http_request_seconds', 'Request latency by endpoint')
+METRICS.describe('response_bytes_total', 'Bytes returned by endpoint')
+METRICS.describe('job_seconds', 'Time from job submission to its result')
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    if endpoint != '/metrics' and 'request_start' in g:
+        METRICS.observe('http_request_seconds', time.perf_counter() - g.request_start, endpoint=endpoint)
+        METRICS.inc('http_requests_total', endpoint=endpoint, status=response.status_code)
+        if response.is_streamed:
+            # Counted as the chunks go out; measuring now would buffer the whole stream
+            response.response = count_streamed_bytes(response.response, endpoint)
+        elif not response.direct_passthrough:
+            METRICS.inc('response_bytes_total', response.calculate_content_length() or 0, endpoint=endpoint)
+    return response
+
+def count_streamed_bytes(chunks, endpoint):
+    for chunk in chunks:
+        METRICS.inc('response_bytes_total', len(chunk), endpoint=endpoint)
+        yield chunk
+
+def json_response(obj, status=200):
+    return Response(dumps(obj), status=status, mimetype='application/json')
 
 @app.route('/health', methods=['GET'])
 def health():
     return jsonify({'status': 'ok', 'message': 'Server is running'})
 
-def detect_cycles(G):
-    cycles = []
-    try:
-        all_cycles = list(nx.simple_cycles(G))
-        for cycle in all_cycles:
-            if 3 <= len(cycle) <= 5:
-                cycle_sorted = sorted(cycle)
-                if cycle_sorted not in cycles:
-                    cycles.append(cycle_sorted)
-    except Exception as e:
-        app.logger.error(f"Cycle detection error: {e}")
-    return cycles
-
-def detect_fan_in(df, hours=72):
-    rings = []
-    receivers = df['receiver_id'].unique()
-    
-    for receiver in receivers:
-        receiver_txs = df[df['receiver_id'] == receiver].sort_values('timestamp')
-        if len(receiver_txs) >= 4:
-            time_window = (receiver_txs['timestamp'].iloc[-1] - receiver_txs['timestamp'].iloc[0]).total_seconds() / 3600
-            if time_window <= hours:
-                senders = receiver_txs['sender_id'].unique().tolist()
-                if len(senders) >= 3:
-                    rings.append({
-                        'type': 'fan_in',
-                        'aggregator': receiver,
-                        'senders': senders,
-                        'transaction_count': len(receiver_txs)
-                    })
-    return rings
-
-def detect_fan_out(df, hours=72):
-    rings = []
-    senders = df['sender_id'].unique()
-    
-    for sender in senders:
-        sender_txs = df[df['sender_id'] == sender].sort_values('timestamp')
-        if len(sender_txs) >= 4:
-            time_window = (sender_txs['timestamp'].iloc[-1] - sender_txs['timestamp'].iloc[0]).total_seconds() / 3600
-            if time_window <= hours:
-                receivers = sender_txs['receiver_id'].unique().tolist()
-                if len(receivers) >= 3:
-                    rings.append({
-                        'type': 'fan_out',
-                        'sender': sender,
-                        'receivers': receivers,
-                        'transaction_count': len(sender_txs)
-                    })
-    return rings
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    METRICS.set('jobs_queue_depth', JOBS.queue_depth())
+    return Response(METRICS.render(), mimetype='text/plain; version=0.0.4')
 
 def is_merchant_account(account_id):
+    return DEFAULT_CLASSIFIER.is_merchant(account_id)
+
+def is_smurf_account(account_id):
     if not isinstance(account_id, str):
         return False
+    return 'SMURF' in account_id.upper()
+
+def run_analysis(source, progress=None, params=None, render=False, artifacts=None, store=None, workers=None,
+                 snapshot=None):
+    """Run the full upload analysis on an uploaded file object and return the result dict.
+
+    `source` may also be an already typed transactions frame (e.g. pulled from
+    the transaction store), or a list of (filename, file object) pairs that
+    read_batch merges into one graph with per-file provenance. Parsed
+    uploads are appended to `store` if given. Parsing, graph building,
+    detection and scoring are a Pipeline (see pipeline.py).
+
+    `params` overrides entries of DETECTION_PARAMS; `workers` (default
+    DETECTION_WORKERS) > 1 runs the cycle search on a process pool. With a
+    `snapshot` directory the graph and its account -> ring index are saved
+    there, and pool workers memory-map the graph instead of copying it.
+    `progress(stage)` is called as each of STAGES starts; it may raise to
+    abort. The network PNG is only drawn when `render` is set. If an
+    `artifacts` dict is given it receives the graph and render inputs for
+    later use. Per-stage timings and counters are returned under "metrics"
+    and folded into METRICS. Raises IngestError when the file cannot be
+    parsed.
+    """
+    start_time = time.time()
+    report = progress or (lambda stage: None)
+    params = {**DETECTION_PARAMS, **(params or {})}
+    run = RunMetrics()
+    # One clock for every stage; it is checked as each one starts
+    budget = Budget(params['max_seconds'], params['max_cycles_explored'])
     
-    if account_id.startswith('ACC_02'):
-        return True
+    with Pipeline(source, params=params, workers=workers or DETECTION_WORKERS, snapshot=snapshot,
+                  budget=budget) as pipeline:
+        report('parse')
+        with run.stage('parse'):
+            df = pipeline.artifact('frame')
+        ingest_stats = pipeline.ingest_stats
+        if store is not None:
+            with run.stage('store'):
+                run.count('rows_stored', store.append(df))
+        
+        total_transactions = len(df)
+        run.count('rows_parsed', total_transactions)
+        app.logger.debug("CSV loaded with %d rows (%s rows/sec, %s engine)", total_transactions,
+                         ingest_stats['rows_per_second'], ingest_stats['engine'])
+        
+        budget_check(budget, run, 'graph')
+        report('graph')
+        with run.stage('graph'):
+            graph = pipeline.artifact('graph')
+            merchant_accounts = pipeline.artifact('merchant_accounts')
+        total_unique_accounts = graph.number_of_nodes()
+        run.count('graph_nodes', total_unique_accounts)
+        run.count('graph_edges', graph.number_of_edges())
+        if snapshot:
+            with run.stage('snapshot'):
+                save_graph(graph, snapshot)
+        app.logger.debug("Total accounts: %d, merchants: %d", total_unique_accounts, len(merchant_accounts))
+        
+        budget_check(budget, run, 'detection')
+        detectors = pipeline.detect(progress=report)
+    run.stages.update(pipeline.seconds)
+    run.count('cycles_explored', pipeline.stats.get('cycles', {}).get('paths_explored', 0))
+    run.count('windows_scanned', sum(stats.get('windows_scanned', 0) for stats in pipeline.stats.values()))
+    for name, info in detectors.items():
+        if info['status'] != 'complete':
+            run.count(f'{name}_{info["status"]}', 1)
+            app.logger.warning("Detector %s %s at %.0f%% coverage", name, info['status'], info['coverage'] * 100)
+    app.logger.debug("Found %s", {name: len(found) for name, found in pipeline.candidates.items()})
+    
+    budget_check(budget, run, 'scoring')
+    report('scoring')
+    scoring_start = time.perf_counter()
+    # Rings with an already seen member set are merged into the first as they are generated
+    fraud_rings, account_rings, suspicious_accounts, duplicates = pipeline.score()
+    run.count('duplicate_rings', duplicates)
+    for ring in fraud_rings[:LOG_RING_SAMPLE]:
+        app.logger.debug("Added %s ring %s: %s", ring['pattern_type'], ring['ring_id'], ring['member_accounts'])
+    
+    fraud_count = len(suspicious_accounts)
+    merchant_count = len(merchant_accounts)
+    normal_count = total_unique_accounts - fraud_count - merchant_count
+    
+    app.logger.debug("FINAL COUNTS: total=%d fraud=%d merchants=%d normal=%d",
+                     total_unique_accounts, fraud_count, merchant_count, normal_count)
+    
+    ring_membership = {account: len({ring_id for ring_id, _ in memberships})
+                       for account, memberships in account_rings.items()}
     
-    if 'MERCHANT' in account_id.upper():
-        return True
+    fraud_set = {acc['account_id'] for acc in suspicious_accounts}
+    viz_nodes = select_viz_nodes(graph)
+    viz_roles = classify_viz_nodes(graph, viz_nodes, merchant_accounts, fraud_set, ring_membership)
+    role_counts = Counter(viz_roles.values())
+    repeat_count = role_counts['repeat']
+    single_ring_count = role_counts['single']
+    run.stages['scoring'] = time.perf_counter() - scoring_start
     
-    return False
+    processing_time = time.time() - start_time
+    
+    result = {
+        "suspicious_accounts": suspicious_accounts,
+        "fraud_rings": fraud_rings,
+        "summary": {
+            "total_transactions": total_transactions,
+            "total_accounts_analyzed": total_unique_accounts,
+            "suspicious_accounts_flagged": fraud_count,
+            "fraud_rings_detected": len(fraud_rings),
+            "merchant_accounts_detected": merchant_count,
+            "normal_accounts": normal_count,
+            "repeat_offenders": repeat_count,
+            "single_ring_members": single_ring_count,
+            "multi_ring_accounts": sum(1 for acc in suspicious_accounts if acc['ring_count'] > 1),
+            "processing_time_seconds": round(processing_time, 2),
+            "complete": all(info['status'] == 'complete' for info in detectors.values()),
+            "ingest_rows_per_second": ingest_stats['rows_per_second']
+        },
+        "detectors": detectors
+    }
+    
+    if 'files' in ingest_stats:
+        result['summary']['source_files'] = len(ingest_stats['files'])
+        result['summary']['duplicate_transactions'] = ingest_stats['duplicate_transactions']
+        result['sources'] = ingest_stats['files']
+    
+    if params['consolidate_rings']:
+        result['ring_clusters'] = consolidate_rings(fraud_rings, account_rings)
+        result['summary']['ring_clusters'] = len(result['ring_clusters'])
+    
+    if snapshot:
+        with open(os.path.join(snapshot, 'account_rings.json'), 'wb') as fh:
+            fh.write(dumps(account_rings))
+        with open(os.path.join(snapshot, 'render.json'), 'wb') as fh:
+            fh.write(dumps({'viz_nodes': viz_nodes.tolist(), 'viz_roles': viz_roles}))
+    
+    if artifacts is not None:
+        artifacts.update(graph=graph, viz_nodes=viz_nodes, viz_roles=viz_roles, account_rings=account_rings,
+                         rings={ring['ring_id']: ring for ring in fraud_rings},
+                         accounts={acc['account_id']: acc for acc in suspicious_accounts})
+    if render and budget_check(budget, run, 'render'):
+        result['graph'] = None
+    elif render:
+        report('render')
+        with run.stage('render'):
+            png = render_network_png(graph, viz_nodes, viz_roles, result['summary'])
+        result['graph'] = encode_png(png)
+        if artifacts is not None:
+            artifacts['png'] = png
+        result['summary']['processing_time_seconds'] = round(time.time() - start_time, 2)
+    
+    METRICS.record_run(run)
+    result['metrics'] = run.as_dict()
+    return result
 
-def is_smurf_account(account_id):
-    if not isinstance(account_id, str):
+def budget_check(budget, run, stage):
+    """True, logged and counted, when the analysis budget is spent before `stage`.
+
+    Parsing, graph building and scoring are needed for any result and run
+    regardless; spent detectors are skipped by the pipeline and the PNG is
+    left to be drawn on demand by /graph.
+    """
+    if not budget.expired():
         return False
-    return 'SMURF' in account_id.upper()
+    run.count(f'budget_spent_before_{stage}', 1)
+    app.logger.warning("Analysis budget of %ss spent before %s", budget.max_seconds, stage)
+    return True
+
+def request_budget(values):
+    """Read optional max_seconds / max_cycles_explored request values as DETECTION_PARAMS overrides."""
+    params = {}
+    if values.get('max_seconds'):
+        params['max_seconds'] = float(values['max_seconds'])
+    if values.get('max_cycles_explored'):
+        params['max_cycles_explored'] = int(values['max_cycles_explored'])
+    return params
+
+def request_refresh(values):
+    return values.get('refresh', 'false').lower() in ('1', 'true', 'yes')
+
+def cached_result(result_id):
+    """The cached result for `result_id`, from memory or RESULT_CACHE_DIR, else None.
+
+    The result is served even when its analysis (graph, drill-down, PNG) is
+    no longer held; those endpoints then answer 404 (see missing_analysis).
+    A result cut short by its budget stays cached for /results paging but is
+    never a hit, so the next upload gets another chance at a complete one.
+    """
+    result = RESULT_CACHE.get(result_id)
+    if result is None or not result['summary']['complete']:
+        return None
+    app.logger.debug("Cache hit for %s", result_id)
+    METRICS.inc('result_cache_hits_total')
+    return result
+
+def analyze_upload(result_id, source, params=None, progress=None, store=None):
+    """Analyze an upload hashed to `result_id`; returns (result, artifacts) for keep_analysis.
+
+    The graph snapshot is written under GRAPH_SNAPSHOT_DIR when it is set,
+    and the parsed rows are appended to `store` if given.
+    """
+    artifacts = {}
+    snapshot = os.path.join(GRAPH_SNAPSHOT_DIR, result_id) if GRAPH_SNAPSHOT_DIR else None
+    result = run_analysis(source, progress=progress, params=params, artifacts=artifacts, store=store,
+                          snapshot=snapshot)
+    return result, artifacts
+
+def analyze_job(result_id, source, progress=None):
+    """analyze_upload in a job worker process, which hands (result, artifacts) back to finish_job.
+
+    A forked worker must not touch the server's SQLite connection or the
+    lock guarding it, so it appends to a store connection of its own.
+    """
+    store = TransactionStore(TRANSACTION_STORE_PATH) if TRANSACTION_STORE_PATH else None
+    try:
+        return analyze_upload(result_id, source, progress=progress, store=store)
+    finally:
+        if store is not None:
+            store.close()
+
+def keep_analysis(result_id, result, artifacts):
+    """Cache a fresh result under `result_id` with its investigation artifacts and return it."""
+    if GRAPH_SNAPSHOT_DIR:
+        prune_snapshots(GRAPH_SNAPSHOT_DIR)
+    result['result_id'] = result_id
+    result['graph_url'] = f"/graph/{result_id}.png"
+    RESULT_CACHE.put(result_id, result)
+    ANALYSES.put(result_id, result=result, **artifacts)
+    return result
+
+def cached_analysis(result_id, source, params, refresh=False):
+    """Return (result, cache_hit) for an upload hashed to `result_id`, analyzing it on a miss.
+
+    With `refresh` the upload is analyzed even when cached, which rebuilds
+    an expired analysis for drill-down. Raises IngestError when the upload
+    cannot be parsed.
+    """
+    result = None if refresh else cached_result(result_id)
+    if result is not None:
+        return result, True
+    return keep_analysis(result_id, *analyze_upload(result_id, source, params, store=TRANSACTIONS)), False
+
+def analysis_response(result_id, result, cache_hit):
+    # view=summary leaves the accounts and rings to /results/<id>/... paging or streaming
+    summary_only = request.values.get('view', 'full') == 'summary'
+    render = request.values.get('render', 'false').lower() in ('1', 'true', 'yes')
+    response = {**(summary_view(result) if summary_only else result), 'cache_hit': cache_hit}
+    if render:
+        png = graph_png_bytes(result_id)
+        response['graph'] = encode_png(png) if png is not None else None
+    app.logger.debug("Returning result %s: %s", result_id, result['summary'])
+    return json_response(response)
 
 @app.route('/upload', methods=['POST'])
 def upload():
     try:
-        start_time = time.time()
-        app.logger.debug("Received upload request")
-        
         if 'file' not in request.files:
             return jsonify({'error': 'No file provided'}), 400
             
         file = request.files['file']
-        app.logger.debug(f"File received: {file.filename}")
+        app.logger.debug("File received: %s", file.filename)
         
-        df = pd.read_csv(file)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        try:
+            params = request_budget(request.values)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid budget: {e}'}), 400
+        result_id = hash_upload(file.stream, {**DETECTION_PARAMS, **params})
+        try:
+            result, cache_hit = cached_analysis(result_id, file, params, refresh=request_refresh(request.values))
+        except IngestError as e:
+            return jsonify({'error': str(e)}), 400
+        return analysis_response(result_id, result, cache_hit)
         
-        total_transactions = len(df)
-        app.logger.debug(f"CSV loaded with {total_transactions} rows")
-        
-        required_cols = ['sender_id', 'receiver_id', 'timestamp', 'amount']
-        missing = [col for col in required_cols if col not in df.columns]
-        if missing:
-            return jsonify({'error': f'Missing columns: {missing}'}), 400
-        
-        all_senders = set(df['sender_id'].unique())
-        all_receivers = set(df['receiver_id'].unique())
-        all_accounts = all_senders.union(all_receivers)
-        
-        total_unique_accounts = len(all_accounts)
-        app.logger.debug(f"Unique senders: {len(all_senders)}")
-        app.logger.debug(f"Unique receivers: {len(all_receivers)}")
-        app.logger.debug(f"TOTAL UNIQUE ACCOUNTS: {total_unique_accounts}")
-        
-        merchant_accounts = set()
-        for acc in all_accounts:
-            if is_merchant_account(acc):
-                merchant_accounts.add(acc)
-        
-        app.logger.debug(f"Merchant accounts found: {sorted(list(merchant_accounts))}")
-        app.logger.debug(f"Merchant count: {len(merchant_accounts)}")
-        
-        G = nx.from_pandas_edgelist(df, 'sender_id', 'receiver_id', create_using=nx.DiGraph())
-        
-        cycles = detect_cycles(G)
-        fan_in_rings = detect_fan_in(df)
-        fan_out_rings = detect_fan_out(df)
-        
-        app.logger.debug(f"Found {len(cycles)} cycles")
-        app.logger.debug(f"Found {len(fan_in_rings)} fan-in rings")
-        app.logger.debug(f"Found {len(fan_out_rings)} fan-out rings")
-        
-        fraud_rings = []
-        ring_counter = 0
-        fraud_accounts = set()
-        
-        for cycle in cycles:
-            if len(cycle) >= 3:
-                ring_counter += 1
-                ring_id = f"RING_{ring_counter:03d}"
-                fraud_rings.append({
-                    "ring_id": ring_id,
-                    "member_accounts": cycle,
-                    "pattern_type": "cycle",
-                    "risk_score": 95.0,
-                    "member_count": len(cycle)
-                })
-                fraud_accounts.update(cycle)
-                app.logger.debug(f"Added cycle ring {ring_counter}: {cycle}")
-        
-        for ring in fan_in_rings:
-            members = list(set(ring['senders'] + [ring['aggregator']]))
-            if len(members) >= 3:
-                ring_counter += 1
-                ring_id = f"RING_{ring_counter:03d}"
-                fraud_rings.append({
-                    "ring_id": ring_id,
-                    "member_accounts": members,
-                    "pattern_type": "fan_in",
-                    "risk_score": 85.0,
-                    "member_count": len(members)
-                })
-                fraud_accounts.update(members)
-                app.logger.debug(f"Added fan-in ring {ring_counter}: {members}")
-        
-        for ring in fan_out_rings:
-            members = list(set([ring['sender']] + ring['receivers']))
-            if len(members) >= 3:
-                ring_counter += 1
-                ring_id = f"RING_{ring_counter:03d}"
-                fraud_rings.append({
-                    "ring_id": ring_id,
-                    "member_accounts": members,
-                    "pattern_type": "fan_out",
-                    "risk_score": 85.0,
-                    "member_count": len(members)
-                })
-                fraud_accounts.update(members)
-        
-        suspicious_accounts = []
-        
-        for account in fraud_accounts:
-            if account in merchant_accounts:
-                continue
-            
-            patterns = []
-            
-            for cycle in cycles:
-                if account in cycle:
-                    patterns.append('cycle')
-                    break
-            
-            for ring in fan_in_rings:
-                if account == ring['aggregator']:
-                    patterns.append('aggregator')
-                elif account in ring['senders']:
-                    patterns.append('smurf_sender')
-            
-            for ring in fan_out_rings:
-                if account == ring['sender']:
-                    patterns.append('distributor')
-                elif account in ring['receivers']:
-                    patterns.append('receiver')
-            
-            if 'cycle' in patterns:
-                score = 95.0
-            elif 'aggregator' in patterns:
-                score = 90.0
-            elif 'distributor' in patterns:
-                score = 88.0
-            elif 'smurf_sender' in patterns:
-                score = 85.0
-            else:
-                score = 80.0
-            
-            ring_id = "NONE"
-            for ring in fraud_rings:
-                if account in ring['member_accounts']:
-                    ring_id = ring['ring_id']
-                    break
-            
-            suspicious_accounts.append({
-                "account_id": account,
-                "suspicion_score": score,
-                "detected_patterns": list(set(patterns)),
-                "ring_id": ring_id
-            })
-        
-        suspicious_accounts.sort(key=lambda x: x['suspicion_score'], reverse=True)
-        
-        fraud_count = len(suspicious_accounts)
-        merchant_count = len(merchant_accounts)
-        normal_count = total_unique_accounts - fraud_count - merchant_count
-        
-        app.logger.debug(f"FINAL COUNTS:")
-        app.logger.debug(f"  Total Accounts: {total_unique_accounts}")
-        app.logger.debug(f"  🔴 FRAUD: {fraud_count}")
-        app.logger.debug(f"  ⚪ MERCHANTS: {merchant_count}")
-        app.logger.debug(f"  🟢 NORMAL: {normal_count}")
-        
-        plt.figure(figsize=(20, 14), facecolor='black')
-        
-        if G.number_of_nodes() > 0:
-            if G.number_of_nodes() > 200:
-                degrees = dict(G.degree())
-                top_nodes = sorted(degrees, key=degrees.get, reverse=True)[:200]
-                G_viz = G.subgraph(top_nodes)
-            else:
-                G_viz = G
-            
-            pos = nx.spring_layout(G_viz, k=2, iterations=50, seed=42)
-            
-            ring_membership = Counter()
-            for ring in fraud_rings:
-                for account in ring['member_accounts']:
-                    ring_membership[account] += 1
-            
-            node_colors = []
-            node_sizes = []
-            
-            fraud_set = {acc['account_id'] for acc in suspicious_accounts}
-            repeat_count = 0
-            single_ring_count = 0
-            
-            for node in G_viz.nodes():
-                if node in merchant_accounts:
-                    node_colors.append('#ffffff')
-                    node_sizes.append(250)
-                elif node in fraud_set:
-                    if ring_membership.get(node, 0) > 1:
-                        node_colors.append('#ffaa00')
-                        node_sizes.append(350)
-                        repeat_count += 1
-                    else:
-                        node_colors.append('#ff3333')
-                        node_sizes.append(300)
-                        single_ring_count += 1
-                else:
-                    node_colors.append('#33ff33')
-                    node_sizes.append(200)
-            
-            nx.draw_networkx_nodes(G_viz, pos, node_color=node_colors, 
-                                  node_size=node_sizes, alpha=0.9)
-            nx.draw_networkx_edges(G_viz, pos, edge_color='#444444', 
-                                  arrows=True, arrowsize=8, width=0.5, alpha=0.3)
-            nx.draw_networkx_labels(G_viz, pos, font_size=5, font_color='white', 
-                                   font_weight='bold')
-            
-            legend_elements = [
-                Patch(facecolor='#ff3333', label=f'🔴 Single Ring ({single_ring_count})'),
-                Patch(facecolor='#ffaa00', label=f'🟡 Repeat Offender ({repeat_count})'),
-                Patch(facecolor='#ffffff', label=f'⚪ Merchants ({merchant_count})'),
-                Patch(facecolor='#33ff33', label=f'🟢 Normal ({normal_count})')
-            ]
-            plt.legend(handles=legend_elements, loc='upper right', 
-                      facecolor='#222222', labelcolor='white', framealpha=0.9,
-                      fontsize=10)
-            
-            plt.title(f'Transaction Network - {total_unique_accounts} Total Accounts', 
-                     color='white', size=16, pad=20, fontweight='bold')
-        else:
-            plt.text(0.5, 0.5, 'No graph data available', color='white', 
-                    size=16, ha='center', va='center')
-        
-        plt.axis('off')
-        plt.tight_layout()
-        
-        img = io.BytesIO()
-        plt.savefig(img, format='png', facecolor='black', dpi=150, 
-                   bbox_inches='tight', pad_inches=0.5)
-        img.seek(0)
-        plt.close()
-        
-        graph_base64 = base64.b64encode(img.getvalue()).decode()
-        
-        processing_time = time.time() - start_time
-        
-        result = {
-            "suspicious_accounts": suspicious_accounts,
-            "fraud_rings": fraud_rings,
-            "summary": {
-                "total_transactions": total_transactions,
-                "total_accounts_analyzed": total_unique_accounts,
-                "suspicious_accounts_flagged": fraud_count,
-                "fraud_rings_detected": len(fraud_rings),
-                "merchant_accounts_detected": merchant_count,
-                "normal_accounts": normal_count,
-                "repeat_offenders": repeat_count,
-                "single_ring_members": single_ring_count,
-                "processing_time_seconds": round(processing_time, 2)
-            },
-            "graph": graph_base64
-        }
+    except Exception as e:
+        app.logger.error("Error: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/batch', methods=['POST'])
+def batch_upload():
+    """Analyze several files, or zip/tar archives of them, as one merged transaction graph."""
+    try:
+        files = request.files.getlist('files') + request.files.getlist('file')
+        if not files:
+            return jsonify({'error': 'No files provided'}), 400
+        app.logger.debug("Batch received: %s", [file.filename for file in files])
         
-        app.logger.debug(f"RETURNING RESULT: {result['summary']}")
-        return jsonify(result)
+        try:
+            params = request_budget(request.values)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid budget: {e}'}), 400
+        uploads = [(file.filename, file.stream) for file in files]
+        result_id = hash_batch(uploads, {**DETECTION_PARAMS, **params})
+        try:
+            result, cache_hit = cached_analysis(result_id, uploads, params, refresh=request_refresh(request.values))
+        except IngestError as e:
+            return jsonify({'error': str(e)}), 400
+        return analysis_response(result_id, result, cache_hit)
         
     except Exception as e:
-        app.logger.error(f"Error: {str(e)}")
+        app.logger.error("Error: %s", e)
         return jsonify({'error': str(e)}), 500
 
+def graph_png_bytes(result_id):
+    """Render (once) and return the network PNG of a stored analysis, or None if it is gone."""
+    analysis = stored_analysis(result_id)
+    if analysis is None:
+        return None
+    if analysis.get('png') is None:
+        start = time.perf_counter()
+        analysis['png'] = render_network_png(analysis['graph'], analysis['viz_nodes'],
+                                             analysis['viz_roles'], analysis['result']['summary'])
+        METRICS.observe('analysis_stage_seconds', time.perf_counter() - start, stage='render')
+    return analysis['png']
+
+@app.route('/graph/<result_id>.png', methods=['GET'])
+def graph_image(result_id):
+    png = graph_png_bytes(result_id)
+    if png is None:
+        return jsonify({'error': 'Unknown or expired result'}), 404
+    return send_file(io.BytesIO(png), mimetype='image/png')
+
+@app.route('/results/<result_id>/stream', methods=['GET'])
+def stream_results(result_id):
+    result = RESULT_CACHE.get(result_id)
+    if result is None:
+        return jsonify({'error': 'Unknown or expired result'}), 404
+    sections = request.args.get('sections', 'rings,accounts').split(',')
+    try:
+        if not set(sections) <= set(SECTIONS):
+            raise ValueError(f"sections must be among {', '.join(SECTIONS)}")
+        query = parse_query(request.args)
+        chunks = iter_ndjson(result, sections, query)
+        first = next(chunks)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query: {e}'}), 400
+    return Response(chain([first], chunks), mimetype='application/x-ndjson')
+
+@app.route('/results/<result_id>/<section>', methods=['GET'])
+def result_page(result_id, section):
+    result = RESULT_CACHE.get(result_id)
+    if result is None or section not in SECTIONS:
+        return jsonify({'error': 'Unknown or expired result'}), 404
+    try:
+        body = page(result, section, parse_query(request.args))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query: {e}'}), 400
+    return json_response(body)
+
+def stored_analysis(result_id):
+    """The in-memory analysis for `result_id`, else one reopened from its graph snapshot, else None.
+
+    A reopened analysis is put back into ANALYSES, so later requests find it in memory.
+    """
+    analysis = ANALYSES.get(result_id)
+    if analysis is not None or not GRAPH_SNAPSHOT_DIR:
+        return analysis
+    result = RESULT_CACHE.get(result_id)
+    if result is None:
+        return None
+    path = os.path.join(GRAPH_SNAPSHOT_DIR, result_id)
+    try:
+        graph = load_graph(path)
+        with open(os.path.join(path, 'account_rings.json')) as fh:
+            account_rings = {account: [tuple(m) for m in memberships] for account, memberships in json.load(fh).items()}
+        with open(os.path.join(path, 'render.json')) as fh:
+            render_inputs = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    return ANALYSES.put(result_id, graph=graph, account_rings=account_rings, result=result,
+                        viz_nodes=np.asarray(render_inputs['viz_nodes'], dtype=np.int64),
+                        viz_roles=render_inputs['viz_roles'],
+                        rings={ring['ring_id']: ring for ring in result['fraud_rings']},
+                        accounts={acc['account_id']: acc for acc in result['suspicious_accounts']})
+
+def missing_analysis(result_id):
+    """The 404 drill-down answers when the analysis behind `result_id` is not held.
+
+    Drill-down reads the analysis' graph, not just its JSON result. Without
+    GRAPH_SNAPSHOT_DIR only the most recent analyses (see AnalysisStore) are
+    kept, so a result that /results/<id> still serves can be past drill-down:
+    that 404 carries "expired": true, and uploading the file again with
+    refresh=true rebuilds it under the same result_id.
+    """
+    if RESULT_CACHE.get(result_id) is not None:
+        return jsonify({'error': 'Analysis expired; upload the file again with refresh=true to drill down',
+                        'result_id': result_id, 'expired': True}), 404
+    return jsonify({'error': 'Unknown or expired result', 'result_id': result_id, 'expired': False}), 404
+
+@app.route('/analysis/<result_id>/account/<account_id>', methods=['GET'])
+def analysis_account(result_id, account_id):
+    analysis = stored_analysis(result_id)
+    if analysis is None:
+        return missing_analysis(result_id)
+    try:
+        detail = account_detail(analysis, account_id, depth=request.args.get('depth', 1),
+                                start=request.args.get('start'), end=request.args.get('end'),
+                                limit=request.args.get('limit', 1000))
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid query: {e}'}), 400
+    if detail is None:
+        return jsonify({'error': 'Unknown account'}), 404
+    return jsonify(detail)
+
+@app.route('/analysis/<result_id>/ring/<ring_id>', methods=['GET'])
+def analysis_ring(result_id, ring_id):
+    analysis = stored_analysis(result_id)
+    if analysis is None:
+        return missing_analysis(result_id)
+    detail = ring_detail(analysis, ring_id)
+    if detail is None:
+        return jsonify({'error': 'Unknown ring'}), 404
+    return jsonify(detail)
+
+@app.route('/history/analyze', methods=['POST'])
+def analyze_history():
+    """Run the upload analysis over stored history selected by time range and/or accounts."""
+    if TRANSACTIONS is None:
+        return jsonify({'error': 'Transaction store is not configured'}), 503
+    
+    query = request.get_json(silent=True) or {}
+    try:
+        if query.get('accounts'):
+            df = TRANSACTIONS.accounts(query['accounts'], start=query.get('start'), end=query.get('end'),
+                                       hops=int(query.get('hops', 1)))
+        else:
+            df = TRANSACTIONS.time_range(start=query.get('start'), end=query.get('end'))
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid history query: {e}'}), 400
+    
+    result = run_analysis(df)
+    result['query'] = {key: query.get(key) for key in ('start', 'end', 'accounts', 'hops')}
+    return jsonify(result)
+
+STREAM = StreamingDetector(window_hours=DETECTION_PARAMS['fan_hours'],
+                           min_txs=DETECTION_PARAMS['fan_min_txs'],
+                           min_counterparties=DETECTION_PARAMS['fan_min_counterparties'],
+                           is_merchant=is_merchant_account)
+
+@app.route('/ingest', methods=['POST'])
+def ingest():
+    try:
+        if 'file' in request.files:
+            df, _ = read_transactions(request.files['file'])
+        else:
+            payload = request.get_json(silent=True)
+            transactions = payload.get('transactions', []) if isinstance(payload, dict) else None
+            if not isinstance(transactions, list):
+                return jsonify({'error': 'Expected a JSON object with a "transactions" list'}), 400
+            # An empty batch is a no-op that still reports the detector state
+            df = pd.DataFrame(transactions, columns=None if transactions else REQUIRED_COLUMNS)
+            valid, missing = validate_csv_structure(df)
+            if not valid:
+                return jsonify({'error': f'Missing columns: {missing}'}), 400
+        result = STREAM.ingest(df)
+    except IngestError as e:
+        return jsonify({'error': str(e)}), 400
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid transactions: {e}'}), 400
+    
+    app.logger.debug("Ingested %d transactions: %s", len(df), result['summary'])
+    return jsonify(result)
+
+def finish_job(job_id, status, value, job):
+    """Settle a background job here, in the server process (see JobManager.on_done).
+
+    The worker's run_analysis recorded its metrics in the worker's own
+    registry, so they are folded into METRICS again from the result. A
+    finished analysis is cached as an upload's is, so its result_id works
+    with /graph, /analysis and /results and a resubmit is a cache hit.
+    """
+    METRICS.inc('jobs_total', status=status)
+    METRICS.observe('job_seconds', job['finished_at'] - job['submitted_at'])
+    app.logger.debug("Job %s %s", job_id, status)
+    if status != 'done':
+        return value
+    result, artifacts = value
+    METRICS.record_run(RunMetrics.from_dict(result['metrics']))
+    return keep_analysis(job['result_id'], result, artifacts)
+
+JOBS.analyze = analyze_job
+JOBS.on_done = finish_job
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+    
+    file = request.files['file']
+    data = file.read()
+    # Keyed like an /upload without budget overrides, so either one's result serves the other
+    result_id = hash_upload(io.BytesIO(data), DETECTION_PARAMS)
+    result = cached_result(result_id)
+    if result is not None:
+        job_id = JOBS.complete(result, file.filename, result_id=result_id)
+        return jsonify({'job_id': job_id, 'status': 'done', 'result_id': result_id, 'cache_hit': True,
+                        'stages': STAGES})
+    try:
+        job_id = JOBS.submit(data, file.filename, result_id=result_id)
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 429
+    
+    app.logger.debug("Queued job %s for %s", job_id, file.filename)
+    return jsonify({'job_id': job_id, 'status': 'queued', 'result_id': result_id, 'cache_hit': False,
+                    'stages': STAGES}), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    info = JOBS.status(job_id)
+    if info is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(info)
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    info = JOBS.cancel(job_id)
+    if info is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(info)
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,146 @@
+import io
+import os
+import posixpath
+import tarfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from ingest import read_transactions, share_account_categories, IngestError
+
+MAX_BATCH_FILES = 256
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+
+def _skipped_member(name):
+    # Directories and archiver metadata (__MACOSX/, ._foo, .DS_Store) are not transaction files
+    base = posixpath.basename(name)
+    return not base or base.startswith('.') or name.startswith('__MACOSX/')
+
+
+def _zip_member(archive, member):
+    return io.BytesIO(archive.read(member))
+
+
+def _opened(stream):
+    return stream
+
+
+def expand_uploads(uploads):
+    """Yield (name, open) for every transaction file in `uploads`, a list of (filename, file object).
+
+    Zip archives (by magic bytes) and tarballs (by suffix) are opened and
+    each member becomes its own file named "<archive>/<member>". `open()`
+    returns a seekable file object; zip members are decompressed by
+    whichever thread calls it, tar members are read up front because
+    tarfile cannot be shared between threads.
+    """
+    for name, stream in uploads:
+        name = name or 'upload'
+        if zipfile.is_zipfile(stream):
+            stream.seek(0)
+            archive = zipfile.ZipFile(stream)
+            for member in archive.infolist():
+                if not member.is_dir() and not _skipped_member(member.filename):
+                    yield f'{name}/{member.filename}', partial(_zip_member, archive, member)
+        elif name.lower().endswith(TAR_SUFFIXES):
+            stream.seek(0)
+            with tarfile.open(fileobj=stream, mode='r:*') as archive:
+                for member in archive.getmembers():
+                    if member.isfile() and not _skipped_member(member.name):
+                        data = archive.extractfile(member).read()
+                        yield f'{name}/{member.name}', partial(io.BytesIO, data)
+        else:
+            stream.seek(0)
+            yield name, partial(_opened, stream)
+
+
+def _parse(name, open_file):
+    try:
+        return read_transactions(open_file())
+    except IngestError as e:
+        raise IngestError(f'{name}: {e}') from e
+    except (zipfile.BadZipFile, tarfile.TarError, OSError) as e:
+        raise IngestError(f'{name}: could not read archive member: {e}') from e
+
+
+def read_batch(uploads, workers=None):
+    """Parse several uploaded files (or archives of them) into one deduplicated frame.
+
+    Files are parsed concurrently on a thread pool: the pyarrow CSV and
+    columnar readers release the GIL, so the parse takes about as long as the
+    largest file. Account IDs share one category set across files, so the
+    merged frame interns every account once. A transaction ID seen in more
+    than one file (or twice in one) is kept in its first file, in upload
+    order. The frame gains a categorical `source_file` column naming each
+    row's file. Returns (df, stats) with per-file rows, formats, timings and
+    dropped duplicates; raises IngestError naming the offending file.
+    """
+    start = time.perf_counter()
+    try:
+        files = list(expand_uploads(uploads))
+    except (zipfile.BadZipFile, tarfile.TarError) as e:
+        raise IngestError(f'Could not open archive: {e}') from e
+    if not files:
+        raise IngestError('No transaction files in the batch')
+    if len(files) > MAX_BATCH_FILES:
+        raise IngestError(f'Too many files in the batch ({len(files)} > {MAX_BATCH_FILES})')
+
+    names = []
+    for name, _ in files:
+        # Provenance needs distinct names; repeated uploads of one filename get a suffix
+        unique, k = name, 1
+        while unique in names:
+            k += 1
+            unique = f'{name}#{k}'
+        names.append(unique)
+    workers = workers or min(len(files), os.cpu_count() or 1)
+    with ThreadPoolExecutor(workers) as pool:
+        parsed = list(pool.map(_parse, names, [open_file for _, open_file in files]))
+
+    frames = share_account_categories([df for df, _ in parsed])
+    sizes = [len(df) for df in frames]
+    codes = np.repeat(np.arange(len(frames), dtype=np.int16), sizes)
+    df = pd.concat(frames, ignore_index=True)
+    df['source_file'] = pd.Categorical.from_codes(codes, categories=names)
+    duplicate = df['transaction_id'].duplicated().to_numpy()
+    dropped = np.bincount(codes[duplicate], minlength=len(frames)).tolist()
+    if dropped and sum(dropped):
+        df = df[~duplicate].reset_index(drop=True)
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        'rows': len(df),
+        'format': 'batch',
+        'engine': ','.join(sorted({file_stats['engine'] for _, file_stats in parsed})),
+        'seconds': round(elapsed, 4),
+        'rows_per_second': round(sum(sizes) / elapsed) if elapsed > 0 else 0,
+        'duplicate_transactions': sum(dropped),
+        'files': [{'name': name, 'rows': file_stats['rows'], 'duplicates': duplicates,
+                   'format': file_stats['format'], 'seconds': file_stats['seconds']}
+                  for name, (_, file_stats), duplicates in zip(names, parsed, dropped)]
+    }
+    return df, stats
+
+
+def ring_sources(graph, rings):
+    """Set each ring's `source_files`: the files holding its transfers between members.
+
+    A ring whose transfers span several files is one that no single-file
+    upload could have shown. Only graphs built from a read_batch frame carry
+    provenance; for others this does nothing.
+    """
+    if graph.source_files is None:
+        return rings
+    for ring in rings:
+        nodes = np.array([graph.index_of(account) for account in ring['member_accounts']])
+        lo, hi = graph.out_indptr[nodes], graph.out_indptr[nodes + 1]
+        rows = np.concatenate([np.arange(a, b) for a, b in zip(lo.tolist(), hi.tolist())])
+        internal = rows[np.isin(graph.out_dst[rows], nodes)]
+        files = np.unique(graph.transaction_sources[graph.out_tx[internal]])
+        ring['source_files'] = [str(name) for name in graph.source_files[files]]
+    return rings
@@ -0,0 +1,170 @@
+import argparse
+import io
+import json
+import platform
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from synth import generate_transactions, write_transactions
+from ingest import read_transactions
+from render import select_viz_nodes, classify_viz_nodes, render_network_png
+from pipeline import Pipeline, DETECTORS
+from snapshot import save_graph, load_graph
+import app as upload_app
+
+DEFAULT_ROWS = [1000, 10000, 100000]
+
+
+@contextmanager
+def timed(stages, name, trace_memory):
+    if trace_memory:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    yield
+    stage = {'seconds': round(time.perf_counter() - start, 4)}
+    if trace_memory:
+        stage['peak_bytes'] = tracemalloc.get_traced_memory()[1] - base
+    stages[name] = stage
+
+
+def recall(found, planted):
+    return round(sum(1 for item in planted if item in found) / len(planted), 4) if planted else None
+
+
+def run_benchmark(n_rows, seed=42, render=False, trace_memory=True, fmt='csv', cycle_mode='structural',
+                  workers=1):
+    """Time every pipeline stage on a synthetic frame and score recall against the planted truth."""
+    df, truth = generate_transactions(n_rows, seed=seed)
+    buffer = io.BytesIO()
+    write_transactions(df, buffer, fmt)
+    input_bytes = buffer.getvalue()
+    stages = {}
+    if trace_memory:
+        tracemalloc.start()
+
+    with timed(stages, 'parse', trace_memory):
+        parsed, ingest_stats = read_transactions(io.BytesIO(input_bytes))
+    # The upload defaults with every registered detector enabled, each timed separately
+    pipeline = Pipeline(parsed, params={**upload_app.DETECTION_PARAMS, 'cycle_mode': cycle_mode,
+                                        'detectors': list(DETECTORS)}, workers=workers)
+    with timed(stages, 'graph', trace_memory):
+        graph = pipeline.artifact('graph')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with timed(stages, 'snapshot_save', trace_memory):
+            save_graph(graph, os.path.join(tmp_dir, 'graph'))
+        with timed(stages, 'snapshot_load', trace_memory):
+            load_graph(os.path.join(tmp_dir, 'graph'))
+    with timed(stages, 'merchants', trace_memory):
+        merchant_accounts = pipeline.artifact('merchant_accounts')
+    with pipeline:
+        pipeline.detect()
+    for name, seconds in pipeline.seconds.items():
+        stages[name] = {'seconds': round(seconds, 4)}
+    found = pipeline.candidates
+    cycles = [ring['member_accounts'] for ring in found['cycles']]
+    shells = [ring['member_accounts'] for ring in found['shell_chains']]
+    aggregators = {account for ring in found['fan_in'] for account, role in ring['roles'].items()
+                   if role == 'aggregator'}
+    distributors = {account for ring in found['fan_out'] for account, role in ring['roles'].items()
+                    if role == 'distributor'}
+    with timed(stages, 'scoring', trace_memory):
+        _, _, suspicious_accounts, _ = pipeline.score()
+    flagged = {account['account_id'] for account in suspicious_accounts}
+
+    if render:
+        with timed(stages, 'render', trace_memory):
+            nodes = select_viz_nodes(graph)
+            roles = classify_viz_nodes(graph, nodes, merchant_accounts, flagged, {})
+            render_network_png(graph, nodes, roles, {
+                'single_ring_members': 0, 'repeat_offenders': 0, 'normal_accounts': 0,
+                'merchant_accounts_detected': len(merchant_accounts),
+                'total_accounts_analyzed': graph.number_of_nodes()})
+
+    with timed(stages, 'upload_total', trace_memory):
+        upload_app.run_analysis(io.BytesIO(input_bytes), params={'cycle_mode': cycle_mode}, workers=workers)
+    if trace_memory:
+        tracemalloc.stop()
+
+    return {
+        'rows': len(df),
+        'seed': seed,
+        'format': fmt,
+        'cycle_mode': cycle_mode,
+        'workers': workers,
+        'input_bytes': len(input_bytes),
+        'ingest_rows_per_second': ingest_stats['rows_per_second'],
+        'stages': stages,
+        'counts': {
+            'nodes': graph.number_of_nodes(),
+            'edges': graph.number_of_edges(),
+            'cycles': len(cycles),
+            'fan_in': len(found['fan_in']),
+            'fan_out': len(found['fan_out']),
+            'shell_chains': len(shells)
+        },
+        'recall': {
+            'cycles': recall({tuple(c) for c in cycles}, [tuple(sorted(m)) for m in truth['cycles']]),
+            'fan_in': recall(aggregators, [m[0] for m in truth['fan_in']]),
+            'fan_out': recall(distributors, [m[0] for m in truth['fan_out']]),
+            # A planted chain counts only if that exact path was reported, not just its accounts
+            'shells': recall({tuple(path) for path in shells}, [tuple(m) for m in truth['shells']]),
+            'merchants': recall(merchant_accounts, truth['merchants'])
+        }
+    }
+
+
+def _run_key(run):
+    return (run['rows'], run['seed'], run.get('format', 'csv'), run.get('cycle_mode', 'structural'),
+            run.get('workers', 1))
+
+
+def compare(current, baseline):
+    """Print per-stage time ratios of `current` against a previous results file."""
+    previous = {_run_key(run): run for run in baseline['runs']}
+    for run in current['runs']:
+        old = previous.get(_run_key(run))
+        if old is None:
+            continue
+        for name, stage in run['stages'].items():
+            before = old['stages'].get(name, {}).get('seconds')
+            if before:
+                print(f"{run['rows']:>10} {name:<14} {before:>9.4f}s -> {stage['seconds']:>9.4f}s "
+                      f"({stage['seconds'] / before:.2f}x)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the detection pipeline on synthetic data')
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--format', default='csv', choices=['csv', 'gzip', 'zstd', 'parquet', 'feather'],
+                        help='upload format to generate and parse')
+    parser.add_argument('--cycle-mode', default='structural', choices=['structural', 'temporal'])
+    parser.add_argument('--workers', type=int, default=1, help='processes for the cycle search')
+    parser.add_argument('--render', action='store_true', help='also time the matplotlib render')
+    parser.add_argument('--no-memory', action='store_true', help='skip tracemalloc peak tracking')
+    parser.add_argument('--out', help='write JSON results to this path')
+    parser.add_argument('--compare', help='previous JSON results to compare against')
+    args = parser.parse_args()
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'runs': [run_benchmark(rows, args.seed, render=args.render, trace_memory=not args.no_memory,
+                               fmt=args.format, cycle_mode=args.cycle_mode,
+                               workers=args.workers) for rows in args.rows]
+    }
+    if args.out:
+        with open(args.out, 'w') as fh:
+            json.dump(results, fh, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        with open(args.compare) as fh:
+            compare(results, json.load(fh))
@@ -0,0 +1,62 @@
+import math
+import time
+
+# Searches consult the budget every this many path extensions
+CHECK_INTERVAL = 1024
+
+
+class Budget:
+    """Wall-clock and search-work limits shared by the detectors of one analysis.
+
+    The clock starts when the budget is created. Detectors call check()
+    between units of work and stop, recording stats['truncated'], once it
+    returns False. `max_cycles_explored` caps the partial paths a cycle
+    search may extend. None means unlimited.
+    """
+
+    def __init__(self, max_seconds=None, max_cycles_explored=None):
+        self.max_seconds = max_seconds
+        self.max_cycles_explored = max_cycles_explored
+        self.deadline = time.monotonic() + max_seconds if max_seconds is not None else None
+
+    def expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def check(self, paths_explored=0):
+        """True while a search that has extended `paths_explored` paths may go on."""
+        if self.max_cycles_explored is not None and paths_explored >= self.max_cycles_explored:
+            return False
+        return not self.expired()
+
+    def split(self, parts):
+        """A budget with the same deadline and 1/parts of the path allowance, for one of `parts` workers."""
+        share = Budget(max_cycles_explored=None if self.max_cycles_explored is None
+                       else math.ceil(self.max_cycles_explored / parts))
+        share.max_seconds, share.deadline = self.max_seconds, self.deadline
+        return share
+
+
+def detector_report(stats, seconds):
+    """Summarise one detector's stats dict as status, coverage and work counters.
+
+    Status is 'skipped' when the budget ran out before the detector started,
+    'truncated' when it stopped early (budget or result cap) and 'complete'
+    otherwise. Coverage is the share of search roots or sources finished.
+    """
+    if stats.get('skipped'):
+        status = 'skipped'
+    elif stats.get('truncated'):
+        status = 'truncated'
+    else:
+        status = 'complete'
+    report = {'status': status, 'seconds': round(seconds, 4)}
+    for done, total in (('roots_searched', 'roots_total'), ('sources_searched', 'sources_total')):
+        if total in stats:
+            report['coverage'] = round(stats[done] / stats[total], 4) if stats[total] else 1.0
+    if 'coverage' not in report:
+        report['coverage'] = 0.0 if status == 'skipped' else 1.0
+    for key in ('paths_explored', 'windows_scanned', 'roots_searched', 'roots_total',
+                'sources_searched', 'sources_total', 'error'):
+        if key in stats:
+            report[key] = stats[key]
+    return report
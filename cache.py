@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+HASH_CHUNK_BYTES = 1 << 20
+MAX_MEMORY_ENTRIES = 32
+MAX_DISK_BYTES = 512 * 1024 * 1024
+
+
+def hash_upload(stream, params=None):
+    """Hash an uploaded file in fixed-size chunks together with the detection parameters.
+
+    The stream is rewound afterwards so it can still be parsed.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(params or {}, sort_keys=True).encode())
+    for chunk in iter(lambda: stream.read(HASH_CHUNK_BYTES), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def hash_batch(uploads, params=None):
+    """Hash a list of (filename, stream) uploads, in order, together with the detection parameters.
+
+    File names are part of the key because results report provenance by name.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(params or {}, sort_keys=True).encode())
+    for name, stream in uploads:
+        digest.update(json.dumps(name).encode())
+        digest.update(hash_upload(stream).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Two-tier cache of analysis results keyed by content hash.
+
+    An in-memory LRU holds up to `max_entries` results. When `disk_dir` is set,
+    results are also written there as JSON and the least recently used files
+    are deleted once the directory grows past `max_disk_bytes`.
+    """
+
+    def __init__(self, max_entries=MAX_MEMORY_ENTRIES, disk_dir=None, max_disk_bytes=MAX_DISK_BYTES):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f'{key}.json')
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path) as fh:
+                result = json.load(fh)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        self._remember(key, result)
+        return result
+
+    def put(self, key, result):
+        self._remember(key, result)
+        if self.disk_dir:
+            fd, tmp_path = tempfile.mkstemp(prefix=f'.{key}.', suffix='.tmp', dir=self.disk_dir)
+            with os.fdopen(fd, 'w') as fh:
+                json.dump(result, fh)
+            os.replace(tmp_path, self._path(key))
+            self._evict_disk()
+
+    def _remember(self, key, result):
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        entries = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith('.json'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
@@ -0,0 +1,271 @@
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+
+def intern_accounts(senders, receivers):
+    """Map sender/receiver account IDs to int32 node indices in first-seen order."""
+    if (isinstance(senders.dtype, pd.CategoricalDtype) and isinstance(receivers.dtype, pd.CategoricalDtype)
+            and senders.cat.categories.equals(receivers.cat.categories)):
+        values = np.column_stack((senders.cat.codes.to_numpy(), receivers.cat.codes.to_numpy())).ravel()
+        codes, uniques = pd.factorize(values)
+        labels = np.asarray(senders.cat.categories, dtype=object)[uniques]
+    else:
+        values = np.column_stack((senders.to_numpy(dtype=object), receivers.to_numpy(dtype=object))).ravel()
+        codes, uniques = pd.factorize(values)
+        labels = np.asarray(uniques, dtype=object)
+    codes = codes.astype(np.int32).reshape(-1, 2)
+    return codes[:, 0].copy(), codes[:, 1].copy(), labels
+
+
+# Every array a CompactGraph is made of besides its labels and transaction IDs
+GRAPH_ARRAYS = ('out_indptr', 'out_dst', 'out_amount', 'out_timestamp', 'out_tx',
+                'in_indptr', 'in_src', 'in_amount', 'in_timestamp', 'in_tx',
+                'succ_indptr', 'succ', 'pred_indptr', 'pred')
+
+
+def _csr(keys, n, *columns):
+    order = np.lexsort(columns[::-1] + (keys,)) if columns else np.argsort(keys, kind='stable')
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n), out=indptr[1:])
+    return indptr, order
+
+
+class CompactGraph:
+    """Directed transaction graph over int32 node indices stored as CSR arrays.
+
+    Node i is account `labels[i]`. Every transaction is kept once in the out-
+    and once in the in-adjacency, time-ordered within each account, with
+    parallel amount, timestamp (int64 ns) and source-row arrays. Distinct
+    neighbour lists back the networkx-style methods, so detectors written
+    against a DiGraph can run on it unchanged (using node indices).
+    For merged uploads, `transaction_sources[row]` indexes `source_files`,
+    the name of the file each transaction came from.
+    """
+
+    def __init__(self, labels, src, dst, amount=None, timestamp=None, tx_index=None,
+                 transaction_ids=None, transaction_sources=None, source_files=None):
+        n = len(labels)
+        m = len(src)
+        self.labels = labels
+        self.transaction_ids = transaction_ids
+        self.transaction_sources = transaction_sources
+        self.source_files = source_files
+        amount = np.zeros(m) if amount is None else np.asarray(amount, dtype=np.float64)
+        timestamp = np.zeros(m, dtype=np.int64) if timestamp is None else np.asarray(timestamp, dtype=np.int64)
+        tx_index = np.arange(m, dtype=np.int64) if tx_index is None else np.asarray(tx_index, dtype=np.int64)
+
+        self.out_indptr, order = _csr(src, n, timestamp)
+        self.out_dst = dst[order]
+        self.out_amount = amount[order]
+        self.out_timestamp = timestamp[order]
+        self.out_tx = tx_index[order]
+
+        self.in_indptr, order = _csr(dst, n, timestamp)
+        self.in_src = src[order]
+        self.in_amount = amount[order]
+        self.in_timestamp = timestamp[order]
+        self.in_tx = tx_index[order]
+
+        pairs = np.unique(src.astype(np.int64) * n + dst)
+        succ_src = (pairs // n).astype(np.int32)
+        succ_dst = (pairs % n).astype(np.int32)
+        self.succ_indptr, _ = _csr(succ_src, n)
+        self.succ = succ_dst
+        self.pred_indptr, order = _csr(succ_dst, n)
+        self.pred = succ_src[order]
+        self._index = None
+        self._label_order = None
+
+    @classmethod
+    def from_arrays(cls, labels, arrays, transaction_ids=None, label_order=None, transaction_sources=None,
+                    source_files=None):
+        """Rebuild a graph from its GRAPH_ARRAYS (e.g. memory-mapped) without re-sorting anything.
+
+        `label_order` (argsort of labels) lets index_of binary-search instead
+        of building a dict over every label.
+        """
+        graph = cls.__new__(cls)
+        graph.labels = labels
+        graph.transaction_ids = transaction_ids
+        graph.transaction_sources = transaction_sources
+        graph.source_files = source_files
+        for name in GRAPH_ARRAYS:
+            setattr(graph, name, arrays[name])
+        graph._index = None
+        graph._label_order = label_order
+        return graph
+
+    @classmethod
+    def from_frame(cls, df, sender_col='sender_id', receiver_col='receiver_id'):
+        src, dst, labels = intern_accounts(df[sender_col], df[receiver_col])
+        amount = df['amount'].to_numpy(dtype=np.float64) if 'amount' in df else None
+        timestamp = None
+        if 'timestamp' in df:
+            timestamp = df['timestamp'].to_numpy(dtype='datetime64[ns]').view('int64')
+        transaction_ids = df['transaction_id'].to_numpy() if 'transaction_id' in df else None
+        transaction_sources = source_files = None
+        if 'source_file' in df:
+            sources = df['source_file'].astype('category')
+            transaction_sources = sources.cat.codes.to_numpy()
+            source_files = np.asarray(sources.cat.categories, dtype=object)
+        return cls(labels, src, dst, amount, timestamp, transaction_ids=transaction_ids,
+                   transaction_sources=transaction_sources, source_files=source_files)
+
+    # networkx-compatible surface
+    def __len__(self):
+        return len(self.labels)
+
+    def __iter__(self):
+        return iter(range(len(self.labels)))
+
+    def __contains__(self, node):
+        return isinstance(node, (int, np.integer)) and 0 <= node < len(self.labels)
+
+    def nodes(self):
+        return range(len(self.labels))
+
+    def number_of_nodes(self):
+        return len(self.labels)
+
+    def number_of_edges(self):
+        return len(self.succ)
+
+    def number_of_transactions(self):
+        return len(self.out_dst)
+
+    def is_directed(self):
+        return True
+
+    def successors(self, node):
+        return self.succ[self.succ_indptr[node]:self.succ_indptr[node + 1]].tolist()
+
+    def predecessors(self, node):
+        return self.pred[self.pred_indptr[node]:self.pred_indptr[node + 1]].tolist()
+
+    def degrees(self):
+        return np.diff(self.succ_indptr) + np.diff(self.pred_indptr)
+
+    def degree(self, node=None):
+        if node is not None:
+            return int(self.succ_indptr[node + 1] - self.succ_indptr[node]
+                       + self.pred_indptr[node + 1] - self.pred_indptr[node])
+        return zip(range(len(self.labels)), self.degrees().tolist())
+
+    # account lookups
+    def index_of(self, account):
+        if self._index is None and self._label_order is not None:
+            pos = int(np.searchsorted(self.labels, account, sorter=self._label_order))
+            if pos < len(self.labels) and self.labels[self._label_order[pos]] == account:
+                return int(self._label_order[pos])
+            return None
+        if self._index is None:
+            self._index = {label: i for i, label in enumerate(self.labels.tolist())}
+        return self._index.get(account)
+
+    def transaction_id(self, tx):
+        return str(self.transaction_ids[tx]) if self.transaction_ids is not None else tx
+
+    def source_file(self, tx):
+        """Name of the file source row `tx` came from, or None for single-file graphs."""
+        return str(self.source_files[self.transaction_sources[tx]]) if self.source_files is not None else None
+
+    def node_mask(self, exclude):
+        """Normalise a node-index collection or boolean mask to a boolean mask."""
+        if exclude is None:
+            return np.zeros(len(self.labels), dtype=bool)
+        if isinstance(exclude, np.ndarray) and exclude.dtype == bool:
+            return exclude
+        mask = np.zeros(len(self.labels), dtype=bool)
+        mask[list(exclude)] = True
+        return mask
+
+    # per-transaction edge slices, time-ordered
+    def out_edges(self, node):
+        lo, hi = self.out_indptr[node], self.out_indptr[node + 1]
+        return self.out_dst[lo:hi], self.out_amount[lo:hi], self.out_timestamp[lo:hi], self.out_tx[lo:hi]
+
+    def in_edges(self, node):
+        lo, hi = self.in_indptr[node], self.in_indptr[node + 1]
+        return self.in_src[lo:hi], self.in_amount[lo:hi], self.in_timestamp[lo:hi], self.in_tx[lo:hi]
+
+    def edges_between(self, node, direction='out', start=None, end=None):
+        """Return the (counterparty, amount, timestamp, tx) slices of `node` with start <= ts <= end."""
+        edges = self.out_edges(node) if direction == 'out' else self.in_edges(node)
+        ts = edges[2]
+        lo = np.searchsorted(ts, start, side='left') if start is not None else 0
+        hi = np.searchsorted(ts, end, side='right') if end is not None else len(ts)
+        return tuple(column[lo:hi] for column in edges)
+
+    # neighbourhoods
+    def ego_network(self, node, depth=1, max_nodes=None):
+        """Return the nodes within `depth` hops of `node` in either direction, nearest first."""
+        seen = {node}
+        order = [node]
+        frontier = [node]
+        for _ in range(depth):
+            next_frontier = []
+            for current in frontier:
+                for other in self.successors(current) + self.predecessors(current):
+                    if other not in seen:
+                        seen.add(other)
+                        order.append(other)
+                        next_frontier.append(other)
+                        if max_nodes is not None and len(order) >= max_nodes:
+                            return order
+            frontier = next_frontier
+        return order
+
+    def subgraph_edges(self, nodes):
+        """Return the distinct (u, v) node pairs with both ends in `nodes`."""
+        mask = self.node_mask(nodes)
+        edges = []
+        for u in nodes:
+            targets = self.succ[self.succ_indptr[u]:self.succ_indptr[u + 1]]
+            edges.extend((u, v) for v in targets[mask[targets]].tolist())
+        return edges
+
+    def sorted_edges(self, direction='in'):
+        """Return (account, timestamp, counterparty) arrays sorted by account then time."""
+        if direction == 'in':
+            keys = np.repeat(np.arange(len(self.labels), dtype=np.int32), np.diff(self.in_indptr))
+            return keys, self.in_timestamp, self.in_src
+        keys = np.repeat(np.arange(len(self.labels), dtype=np.int32), np.diff(self.out_indptr))
+        return keys, self.out_timestamp, self.out_dst
+
+    # components
+    def adjacency_matrix(self, exclude=None):
+        n = len(self.labels)
+        data = np.ones(len(self.succ), dtype=np.int8)
+        if exclude is not None:
+            mask = self.node_mask(exclude)
+            src = np.repeat(np.arange(n, dtype=np.int32), np.diff(self.succ_indptr))
+            data[mask[src] | mask[self.succ]] = 0
+        matrix = csr_matrix((data, self.succ, self.succ_indptr), shape=(n, n), copy=True)
+        matrix.eliminate_zeros()
+        return matrix
+
+    def strongly_connected_components(self, exclude=None):
+        if not len(self.labels):
+            return []
+        count, component = connected_components(self.adjacency_matrix(exclude), directed=True,
+                                                connection='strong')
+        order = np.argsort(component, kind='stable')
+        groups = np.split(order, np.cumsum(np.bincount(component, minlength=count))[:-1])
+        if exclude is not None:
+            mask = self.node_mask(exclude)
+            groups = [g for g in groups if not mask[g[0]]]
+        return groups
+
+    def to_networkx(self, nodes=None):
+        """Build a networkx DiGraph (labelled by account ID) over `nodes`, or all nodes."""
+        import networkx as nx
+        n = len(self.labels)
+        keep = np.ones(n, dtype=bool) if nodes is None else self.node_mask(nodes)
+        src = np.repeat(np.arange(n, dtype=np.int32), np.diff(self.succ_indptr))
+        selected = keep[src] & keep[self.succ]
+        G = nx.DiGraph()
+        G.add_nodes_from(self.labels[keep].tolist())
+        G.add_edges_from(zip(self.labels[src[selected]].tolist(), self.labels[self.succ[selected]].tolist()))
+        return G
@@ -0,0 +1,187 @@
+from bisect import bisect_right
+
+import networkx as nx
+import numpy as np
+
+from budget import CHECK_INTERVAL
+from compact_graph import CompactGraph
+
+MIN_CYCLE_LENGTH = 3
+MAX_CYCLE_LENGTH = 5
+MAX_CYCLES = 100000
+CYCLE_WINDOW_HOURS = 72
+NS_PER_HOUR = 3600 * 10**9
+
+
+def iter_short_cycles(G, min_length=MIN_CYCLE_LENGTH, max_length=MAX_CYCLE_LENGTH, exclude=None, stats=None,
+                      components=None, roots=None, budget=None):
+    """Yield every simple cycle with min_length..max_length nodes exactly once.
+
+    The search runs per strongly connected component (trivial ones are dropped)
+    and roots each cycle at its lowest-ranked member, so no rotation of a cycle
+    is reported twice. Nodes in `exclude` are never entered; on a CompactGraph
+    it may also be a boolean node mask. If a `stats` dict is given, the number
+    of partial paths extended is added to stats['paths_explored'].
+
+    `components` (precomputed SCCs, excluded nodes already removed) and
+    `roots` (the only nodes searches may start from) let callers split the
+    work; every cycle is found from exactly one root, its first node.
+
+    With a `budget` (see budget.py) the search stops once it is spent and
+    sets stats['truncated']; stats['roots_searched'] / stats['roots_total']
+    then tell how much of the graph was covered.
+    """
+    if components is not None:
+        components = [c.tolist() if isinstance(c, np.ndarray) else list(c) for c in components]
+    elif isinstance(G, CompactGraph):
+        components = [c.tolist() for c in G.strongly_connected_components(exclude)]
+    else:
+        search_graph = G.subgraph([n for n in G if n not in exclude]) if exclude else G
+        components = list(nx.strongly_connected_components(search_graph))
+    components = [c for c in components if len(c) >= min_length]
+
+    explored = searched = 0
+    truncated = False
+    try:
+        for component in components:
+            rank = {node: i for i, node in enumerate(component)}
+            for start, start_rank in rank.items():
+                if roots is not None and start not in roots:
+                    continue
+                if budget is not None and not budget.check(explored):
+                    truncated = True
+                    return
+                path = [start]
+                on_path = {start}
+                stack = [iter(G.successors(start))]
+                while stack:
+                    for nxt in stack[-1]:
+                        if nxt == start:
+                            if len(path) >= min_length:
+                                yield list(path)
+                        elif (len(path) < max_length and rank.get(nxt, -1) > start_rank
+                              and nxt not in on_path):
+                            explored += 1
+                            if budget is not None and explored % CHECK_INTERVAL == 0 and not budget.check(explored):
+                                truncated = True
+                                return
+                            path.append(nxt)
+                            on_path.add(nxt)
+                            stack.append(iter(G.successors(nxt)))
+                            break
+                    else:
+                        stack.pop()
+                        on_path.discard(path.pop())
+                searched += 1
+    finally:
+        if stats is not None:
+            total = sum(len(c) if roots is None else sum(1 for node in c if node in roots) for c in components)
+            _record(stats, explored, searched, total, truncated)
+
+
+def _record(stats, explored, searched, total, truncated):
+    stats['paths_explored'] = stats.get('paths_explored', 0) + explored
+    stats['roots_searched'] = stats.get('roots_searched', 0) + searched
+    stats['roots_total'] = stats.get('roots_total', 0) + total
+    if truncated:
+        stats['truncated'] = True
+
+
+def iter_temporal_cycles(G, window_hours=CYCLE_WINDOW_HOURS, min_length=MIN_CYCLE_LENGTH,
+                         max_length=MAX_CYCLE_LENGTH, exclude=None, amount_tolerance=None, stats=None,
+                         components=None, roots=None, budget=None):
+    """Yield every distinct time-respecting cycle on a CompactGraph once, as a node list.
+
+    A path is only extended along a transaction strictly later than the
+    previous leg, and the whole loop must close within `window_hours` of its
+    first leg. Each step binary-searches the account's time-sorted out-edges
+    for that (previous leg, deadline] range, so stale edges are never looked
+    at, and a first leg is skipped outright when its sender receives nothing
+    inside the window to close the loop. Without `amount_tolerance` only the earliest qualifying transaction
+    to each counterparty is followed (a later one can never close more
+    loops); with it, each leg must also carry between (1 - tolerance) and 1
+    times the previous leg's amount, and every qualifying transaction is
+    tried. The cycle is listed starting at the sender of its first leg.
+    Nodes in `exclude` (accounts or a node mask) are never entered.
+    `components`, `roots` and `budget` work as in iter_short_cycles.
+    """
+    window = int(window_hours * NS_PER_HOUR)
+    indptr = G.out_indptr.tolist()
+    in_indptr = G.in_indptr.tolist()
+    dst = G.out_dst.tolist()
+    ts = G.out_timestamp.tolist()
+    in_ts = G.in_timestamp.tolist()
+    amounts = G.out_amount.tolist()
+
+    # Time-respecting cycles are structural cycles too, so they never leave an SCC
+    component = np.full(len(G.labels), -1, dtype=np.int64)
+    if components is None:
+        components = G.strongly_connected_components(exclude)
+    for i, members in enumerate(components):
+        if len(members) >= min_length:
+            component[members] = i
+    candidates = np.flatnonzero(component >= 0).tolist()
+    roots = candidates if roots is None else [root for root in candidates if root in roots]
+    component = component.tolist()
+
+    def legs(node, after, deadline, prev_amount):
+        lo, hi = indptr[node], indptr[node + 1]
+        if after is not None:
+            lo = bisect_right(ts, after, lo, hi)
+            hi = bisect_right(ts, deadline, lo, hi)
+        tried = set()
+        for edge in range(lo, hi):
+            nxt = dst[edge]
+            if amount_tolerance is not None:
+                if prev_amount is not None and not (prev_amount * (1 - amount_tolerance) <= amounts[edge] <= prev_amount):
+                    continue
+            elif after is not None:
+                if nxt in tried:
+                    continue
+                tried.add(nxt)
+            yield nxt, ts[edge], amounts[edge]
+
+    seen = set()
+    explored = searched = 0
+    truncated = False
+    try:
+        for root in roots:
+            if budget is not None and not budget.check(explored):
+                truncated = True
+                return
+            group = component[root]
+            path = [root]
+            on_path = {root}
+            deadline = None
+            stack = [legs(root, None, None, None)]
+            while stack:
+                for nxt, leg_ts, leg_amount in stack[-1]:
+                    if nxt == root:
+                        if len(path) >= min_length:
+                            low = path.index(min(path))
+                            key = tuple(path[low:] + path[:low])
+                            if key not in seen:
+                                seen.add(key)
+                                yield list(path)
+                    elif len(path) < max_length and component[nxt] == group and nxt not in on_path:
+                        if len(path) == 1:
+                            deadline = leg_ts + window
+                            # The loop has to come back to the root after this leg and by the deadline
+                            lo, hi = in_indptr[root], in_indptr[root + 1]
+                            if bisect_right(in_ts, leg_ts, lo, hi) == bisect_right(in_ts, deadline, lo, hi):
+                                continue
+                        explored += 1
+                        if budget is not None and explored % CHECK_INTERVAL == 0 and not budget.check(explored):
+                            truncated = True
+                            return
+                        path.append(nxt)
+                        on_path.add(nxt)
+                        stack.append(legs(nxt, leg_ts, deadline, leg_amount))
+                        break
+                else:
+                    stack.pop()
+                    on_path.discard(path.pop())
+            searched += 1
+    finally:
+        if stats is not None:
+            _record(stats, explored, searched, len(roots), truncated)
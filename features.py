@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+from compact_graph import CompactGraph, intern_accounts
+
+WINDOW_HOURS = 72
+NS_PER_HOUR = 3600 * 10**9
+
+
+def compute_account_features(labels, src, dst, amount, timestamp, hours=WINDOW_HOURS):
+    """Build the per-account feature table from parallel transaction arrays.
+
+    Every transaction contributes one row for its sender and one for its
+    receiver (self-transfers count once). Those rows are sorted by (account,
+    time) once, and every column is a bincount or segment reduction over that
+    order, so the cost is a single O(N log N) pass for all accounts.
+    velocity_per_hour is transactions per hour over the account's active
+    span (at least one hour); `hours` sets the window of max_window_txs and
+    of window_velocity_per_hour, the rate in the busiest such window.
+    """
+    n = len(labels)
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    amount = np.asarray(amount, dtype=np.float64)
+    timestamp = np.asarray(timestamp, dtype=np.int64)
+
+    other = src != dst
+    nodes = np.concatenate((src, dst[other]))
+    peers = np.concatenate((dst, src[other]))
+    amounts = np.concatenate((amount, amount[other]))
+    times = np.concatenate((timestamp, timestamp[other]))
+    order = np.lexsort((times, nodes))
+    nodes, peers, amounts, times = nodes[order], peers[order], amounts[order], times[order]
+
+    tx_count = np.bincount(nodes, minlength=n)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(tx_count, out=indptr[1:])
+    active = tx_count > 0
+    starts, ends = indptr[:-1][active], indptr[1:][active]
+
+    max_amount = np.zeros(n)
+    first_seen = np.zeros(n, dtype=np.int64)
+    last_seen = np.zeros(n, dtype=np.int64)
+    if len(nodes):
+        max_amount[active] = np.maximum.reduceat(amounts, starts)
+        first_seen[active] = times[starts]
+        last_seen[active] = times[ends - 1]
+
+    # Largest number of the account's transactions inside any `hours` window:
+    # bisect, for every row at once, for the last row of the same account in range
+    group_end = np.repeat(indptr[1:], tx_count)
+    reach = times + int(hours * NS_PER_HOUR)
+    lo = np.arange(len(nodes))
+    hi = group_end.copy()
+    while True:
+        open_ = lo < hi
+        if not open_.any():
+            break
+        mid = (lo + hi) // 2
+        inside = open_ & (times[np.minimum(mid, len(nodes) - 1)] <= reach)
+        lo = np.where(inside, mid + 1, lo)
+        hi = np.where(open_ & ~inside, mid, hi)
+    window_txs = lo - np.arange(len(nodes))
+    max_window_txs = np.zeros(n, dtype=np.int64)
+    np.maximum.at(max_window_txs, nodes, window_txs)
+    span_hours = (last_seen - first_seen) / NS_PER_HOUR
+    velocity = np.where(tx_count >= 2, tx_count / np.maximum(span_hours, 1), 0.0)
+    # A lifetime average dilutes bursts; the busiest window keeps them
+    window_velocity = np.where(tx_count >= 2, max_window_txs / hours, 0.0)
+
+    pairs = _distinct(nodes * n + peers)
+    distinct_src = _distinct(src * n + dst)
+
+    sent_amount = np.bincount(src, weights=amount, minlength=n)
+    received_amount = np.bincount(dst, weights=amount, minlength=n)
+    total_amount = np.bincount(nodes, weights=amounts, minlength=n)
+
+    table = pd.DataFrame({
+        'in_count': np.bincount(dst, minlength=n),
+        'out_count': np.bincount(src, minlength=n),
+        'tx_count': tx_count,
+        'in_counterparties': np.bincount(distinct_src % n, minlength=n),
+        'out_counterparties': np.bincount(distinct_src // n, minlength=n),
+        'counterparties': np.bincount(pairs // n, minlength=n),
+        'sent_amount': sent_amount,
+        'received_amount': received_amount,
+        'total_amount': total_amount,
+        'mean_amount': np.divide(total_amount, tx_count, out=np.zeros(n), where=tx_count > 0),
+        'max_amount': max_amount,
+        'first_seen': first_seen.view('datetime64[ns]'),
+        'last_seen': last_seen.view('datetime64[ns]'),
+        'velocity_per_hour': velocity,
+        'window_velocity_per_hour': window_velocity,
+        'max_window_txs': max_window_txs
+    }, index=pd.Index(labels, name='account_id'))
+    return table
+
+
+def _distinct(keys):
+    keys = np.sort(keys)
+    return keys[np.r_[True, keys[1:] != keys[:-1]]] if len(keys) else keys
+
+
+def _frame_arrays(df):
+    src, dst, labels = intern_accounts(df['sender_id'], df['receiver_id'])
+    amount = df['amount'].to_numpy(dtype=np.float64)
+    timestamp = pd.to_datetime(df['timestamp']).to_numpy(dtype='datetime64[ns]').view('int64')
+    return labels, src, dst, amount, timestamp
+
+
+def _graph_arrays(graph):
+    src = np.repeat(np.arange(len(graph.labels)), np.diff(graph.out_indptr))
+    return graph.labels, src, graph.out_dst, graph.out_amount, graph.out_timestamp
+
+
+def account_features(source, hours=WINDOW_HOURS):
+    """Return the per-account feature table for a transactions frame or CompactGraph, indexed by account_id.
+
+    Every call computes the table afresh; within an analysis it is built once
+    as the pipeline's account_stats artifact and shared from there.
+    """
+    arrays = _graph_arrays(source) if isinstance(source, CompactGraph) else _frame_arrays(source)
+    return compute_account_features(*arrays, hours=hours)
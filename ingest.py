@@ -0,0 +1,267 @@
+import gzip
+import io
+import time
+import zlib
+import pandas as pd
+from pandas.api.types import union_categoricals, is_datetime64_any_dtype
+from utils import validate_csv_structure
+
+try:
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.csv
+    import pyarrow.feather
+    import pyarrow.ipc
+    import pyarrow.parquet
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+REQUIRED_COLUMNS = ['transaction_id', 'sender_id', 'receiver_id', 'amount', 'timestamp']
+COLUMN_DTYPES = {
+    'transaction_id': str,
+    'sender_id': 'category',
+    'receiver_id': 'category',
+    'amount': 'float64',
+    'timestamp': str
+}
+TIMESTAMP_FORMATS = [
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%d %H:%M:%S.%f',
+    '%Y-%m-%dT%H:%M:%S.%f',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%d',
+    # Slash dates are read month first, as pandas does; day-first exports are
+    # not probed because a date like 03/04/2024 would silently change meaning
+    '%m/%d/%Y %H:%M:%S',
+    '%m/%d/%Y %H:%M'
+]
+# Leading bytes of each supported upload format; anything else is read as plain CSV
+MAGIC_BYTES = [
+    ('parquet', b'PAR1'),
+    ('arrow', b'ARROW1'),
+    ('feather', b'FEA1'),
+    ('arrow', b'\xff\xff\xff\xff'),
+    ('gzip', b'\x1f\x8b'),
+    ('zstd', b'\x28\xb5\x2f\xfd')
+]
+COLUMNAR_FORMATS = ('parquet', 'arrow', 'feather')
+CHUNK_ROWS = 500000
+HEADER_READ_BYTES = 64 * 1024
+SAMPLE_ROWS = 1000
+
+class IngestError(ValueError):
+    """Raised when an uploaded file is missing columns or cannot be parsed."""
+
+
+def detect_timestamp_format(sample):
+    """Return the first known format that parses every sampled value, or None.
+
+    Detection is per upload: one file's format says nothing about the next.
+    """
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            pd.to_datetime(sample, format=fmt)
+        except (ValueError, TypeError):
+            continue
+        return fmt
+    return None
+
+
+def parse_timestamps(values, fmt=None):
+    if fmt is None:
+        fmt = detect_timestamp_format(values.head(SAMPLE_ROWS))
+    return pd.to_datetime(values, format=fmt) if fmt else pd.to_datetime(values)
+
+
+def share_account_categories(frames):
+    """Give sender_id and receiver_id one category set across all frames so codes line up."""
+    categories = union_categoricals(
+        [f[col] for f in frames for col in ('sender_id', 'receiver_id')]
+    ).categories
+    for f in frames:
+        for col in ('sender_id', 'receiver_id'):
+            f[col] = f[col].cat.set_categories(categories)
+    return frames
+
+
+def detect_format(source):
+    """Identify the upload format from its first bytes and rewind the stream."""
+    head = source.read(8)
+    source.seek(0)
+    for fmt, magic in MAGIC_BYTES:
+        if head.startswith(magic):
+            return fmt
+    return 'csv'
+
+
+def validate_columns(columns):
+    valid, missing = validate_csv_structure(pd.DataFrame(columns=list(columns)))
+    if not valid:
+        raise IngestError(f'Missing columns: {missing}')
+    return list(columns)
+
+
+class _PrefixedStream(io.RawIOBase):
+    """Replay bytes already read from a non-seekable stream before the rest of it."""
+
+    def __init__(self, prefix, stream):
+        self._prefix = prefix
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._prefix:
+            n = min(len(buffer), len(self._prefix))
+            buffer[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def read_header(source):
+    """Validate the CSV header line and return (columns, stream positioned at the start).
+
+    Decompressing streams cannot seek or readline, so the bytes read to find
+    the header are replayed in front of the rest of the stream.
+    """
+    head = b''
+    while b'\n' not in head:
+        chunk = source.read(HEADER_READ_BYTES)
+        if not chunk:
+            break
+        head += chunk
+    columns = validate_columns(pd.read_csv(io.BytesIO(head.split(b'\n', 1)[0]), nrows=0).columns)
+    if source.seekable():
+        source.seek(0)
+        return columns, source
+    return columns, io.BufferedReader(_PrefixedStream(head, source))
+
+
+def open_csv(source, fmt):
+    """Return a file object yielding the CSV text, decompressing gzip/zstd as it is read."""
+    source.seek(0)
+    if fmt == 'gzip':
+        return gzip.GzipFile(fileobj=source, mode='rb')
+    if fmt == 'zstd':
+        if not HAS_PYARROW:
+            raise IngestError('zstd-compressed uploads require pyarrow')
+        return pyarrow.CompressedInputStream(pyarrow.PythonFile(source, mode='r'), 'zstd')
+    return source
+
+
+def read_transactions(source, chunksize=CHUNK_ROWS):
+    """Parse an uploaded transactions file from a seekable file object into a typed frame.
+
+    Parquet, Arrow IPC/Feather, gzip/zstd-compressed CSV and plain CSV are
+    told apart by their magic bytes. The header or schema is validated before
+    any rows are parsed. Only the required columns are read, account IDs
+    become categoricals sharing one category set, and text timestamps are
+    parsed with an explicit format detected from a sample. Returns (df, stats);
+    raises IngestError for missing columns or bad values.
+    """
+    start = time.perf_counter()
+    try:
+        fmt = detect_format(source)
+        if fmt in COLUMNAR_FORMATS:
+            df, engine = _read_columnar(source, fmt)
+        else:
+            _, stream = read_header(open_csv(source, fmt))
+            df, engine = _read_rows(stream, chunksize)
+    except IngestError:
+        raise
+    except (ValueError, OSError, pd.errors.ParserError) as e:
+        raise IngestError(f'Could not parse transactions: {e}') from e
+    except (EOFError, zlib.error) as e:
+        # A truncated or corrupt gzip upload only fails once the rows are read
+        raise IngestError(f'Could not decompress transactions: {e}') from e
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        'rows': len(df),
+        'format': fmt,
+        'engine': engine,
+        'seconds': round(elapsed, 4),
+        'rows_per_second': round(len(df) / elapsed) if elapsed > 0 else 0
+    }
+    return df[REQUIRED_COLUMNS], stats
+
+
+def _read_rows(source, chunksize):
+    if HAS_PYARROW:
+        engine = 'pyarrow'
+        column_types = {col: pyarrow.float64() if col == 'amount' else pyarrow.string() for col in REQUIRED_COLUMNS}
+        table = pyarrow.csv.read_csv(source, convert_options=pyarrow.csv.ConvertOptions(
+            include_columns=REQUIRED_COLUMNS, column_types=column_types))
+        df = _frame_from_arrow(table)
+    else:
+        engine = 'c'
+        chunks = []
+        fmt = None
+        for chunk in pd.read_csv(source, usecols=REQUIRED_COLUMNS, dtype=COLUMN_DTYPES, chunksize=chunksize):
+            if fmt is None:
+                fmt = detect_timestamp_format(chunk['timestamp'].head(SAMPLE_ROWS))
+            chunk['timestamp'] = parse_timestamps(chunk['timestamp'], fmt)
+            chunks.append(chunk)
+        if not chunks:
+            chunks = [pd.DataFrame({col: pd.Series(dtype='datetime64[ns]' if col == 'timestamp' else COLUMN_DTYPES[col])
+                                   for col in REQUIRED_COLUMNS})]
+        df = pd.concat(share_account_categories(chunks), ignore_index=True)
+    return df, engine
+
+
+def _read_columnar(source, fmt):
+    if not HAS_PYARROW:
+        raise IngestError(f'{fmt} uploads require pyarrow')
+    if fmt == 'parquet':
+        parquet = pyarrow.parquet.ParquetFile(source)
+        validate_columns(parquet.schema_arrow.names)
+        table = parquet.read(columns=REQUIRED_COLUMNS)
+    elif fmt == 'arrow':
+        try:
+            reader = pyarrow.ipc.open_file(source)
+        except pyarrow.ArrowInvalid:
+            source.seek(0)
+            reader = pyarrow.ipc.open_stream(source)
+        validate_columns(reader.schema.names)
+        table = reader.read_all().select(REQUIRED_COLUMNS)
+    else:
+        try:
+            table = pyarrow.feather.read_table(source, columns=REQUIRED_COLUMNS)
+        except pyarrow.ArrowInvalid:
+            # Feather v1 has no schema-only read; name any missing columns from the full file
+            source.seek(0)
+            validate_columns(pyarrow.feather.read_table(source).column_names)
+            raise
+
+    return _frame_from_arrow(table), f'pyarrow-{fmt}'
+
+
+def _frame_from_arrow(table):
+    """Convert an Arrow table of the required columns without re-factorizing in pandas.
+
+    Sender and receiver IDs are dictionary-encoded together in Arrow, which
+    gives both categoricals one shared category set directly.
+    """
+    n = table.num_rows
+    accounts = pyarrow.chunked_array(table['sender_id'].chunks + table['receiver_id'].chunks)
+    encoded = pyarrow.compute.dictionary_encode(accounts.cast(pyarrow.string()).combine_chunks())
+    codes = encoded.indices.to_numpy(zero_copy_only=False)
+    dtype = pd.CategoricalDtype(pd.Index(encoded.dictionary.to_pandas()))
+
+    df = table.select(['transaction_id', 'amount', 'timestamp']).set_column(
+        0, 'transaction_id', table['transaction_id'].cast(pyarrow.string())).set_column(
+        1, 'amount', table['amount'].cast(pyarrow.float64())).to_pandas()
+    df['sender_id'] = pd.Categorical.from_codes(codes[:n], dtype=dtype, validate=False)
+    df['receiver_id'] = pd.Categorical.from_codes(codes[n:], dtype=dtype, validate=False)
+    if is_datetime64_any_dtype(df['timestamp']):
+        if getattr(df['timestamp'].dt, 'tz', None) is not None:
+            df['timestamp'] = df['timestamp'].dt.tz_convert(None)
+    else:
+        df['timestamp'] = parse_timestamps(df['timestamp'].astype(str))
+    return df[REQUIRED_COLUMNS]
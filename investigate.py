@@ -0,0 +1,129 @@
+import heapq
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+MAX_EGO_DEPTH = 3
+MAX_EGO_NODES = 500
+MAX_TRANSACTIONS = 1000
+
+
+def _timestamp_ns(value):
+    return None if value is None else int(pd.Timestamp(value).value)
+
+
+def _format_ts(ns):
+    return pd.Timestamp(ns).isoformat()
+
+
+def _account_stats(graph, node):
+    out_dst, out_amount, out_ts, _ = graph.out_edges(node)
+    in_src, in_amount, in_ts, _ = graph.in_edges(node)
+    timestamps = np.concatenate((out_ts, in_ts))
+    return {
+        'in_count': len(in_src),
+        'out_count': len(out_dst),
+        'in_counterparties': len(np.unique(in_src)),
+        'out_counterparties': len(np.unique(out_dst)),
+        'received_amount': float(in_amount.sum()),
+        'sent_amount': float(out_amount.sum()),
+        'first_seen': _format_ts(timestamps.min()) if len(timestamps) else None,
+        'last_seen': _format_ts(timestamps.max()) if len(timestamps) else None
+    }
+
+
+def _transactions(graph, node, start, end, limit):
+    # Both directions are already time-ordered, so the first `limit` rows of the
+    # merge come from the first `limit` of each; nothing is sorted or built beyond that
+    directions = []
+    for direction in ('out', 'in'):
+        others, amounts, timestamps, txs = (column[:limit] for column in
+                                            graph.edges_between(node, direction, start, end))
+        directions.append(zip(timestamps.tolist(), [direction] * len(txs), others.tolist(), amounts.tolist(),
+                              txs.tolist()))
+    rows = []
+    for ts, direction, other, amount, tx in islice(heapq.merge(*directions, key=lambda edge: edge[0]), limit):
+        row = {
+            'transaction_id': graph.transaction_id(tx),
+            'direction': direction,
+            'counterparty': graph.labels[other],
+            'amount': amount,
+            'timestamp': _format_ts(ts)
+        }
+        if graph.source_files is not None:
+            row['source_file'] = graph.source_file(tx)
+        rows.append(row)
+    return rows
+
+
+def account_detail(analysis, account_id, depth=1, start=None, end=None, limit=MAX_TRANSACTIONS):
+    """Describe one account of a stored analysis, or return None if it is not in the graph.
+
+    Everything is answered from the analysis' CompactGraph slices and its
+    account -> ring index, so the cost depends on the account's degree and
+    ego size, not on the size of the upload.
+    """
+    graph = analysis['graph']
+    node = graph.index_of(account_id)
+    if node is None:
+        return None
+    depth = max(0, min(int(depth), MAX_EGO_DEPTH))
+    ego = graph.ego_network(node, depth, max_nodes=MAX_EGO_NODES)
+    memberships = analysis['account_rings'].get(account_id, [])
+    roles_by_ring = {}
+    for ring_id, role in memberships:
+        roles_by_ring.setdefault(ring_id, []).append(role)
+
+    return {
+        'account_id': account_id,
+        'score': analysis['accounts'].get(account_id),
+        'stats': _account_stats(graph, node),
+        'rings': [{**analysis['rings'][ring_id], 'role': roles[0], 'roles': roles}
+                  for ring_id, roles in roles_by_ring.items()],
+        'ego_network': {
+            'depth': depth,
+            'truncated': len(ego) >= MAX_EGO_NODES,
+            'nodes': graph.labels[ego].tolist(),
+            'edges': [[graph.labels[u], graph.labels[v]] for u, v in graph.subgraph_edges(ego)]
+        },
+        'transactions': _transactions(graph, node, _timestamp_ns(start), _timestamp_ns(end), max(int(limit), 0))
+    }
+
+
+def ring_detail(analysis, ring_id):
+    """Describe one ring of a stored analysis with its members and internal transfers."""
+    ring = analysis['rings'].get(ring_id)
+    if ring is None:
+        return None
+    graph = analysis['graph']
+    members = ring['member_accounts']
+    nodes = [graph.index_of(account) for account in members]
+    member_set = set(nodes)
+
+    transfers = []
+    for node in nodes:
+        others, amounts, timestamps, txs = graph.out_edges(node)
+        for other, amount, ts, tx in zip(others.tolist(), amounts.tolist(), timestamps.tolist(), txs.tolist()):
+            if other in member_set:
+                row = {
+                    'transaction_id': graph.transaction_id(tx),
+                    'sender_id': graph.labels[node],
+                    'receiver_id': graph.labels[other],
+                    'amount': amount,
+                    'timestamp': _format_ts(ts)
+                }
+                if graph.source_files is not None:
+                    row['source_file'] = graph.source_file(tx)
+                transfers.append((ts, row))
+    transfers.sort(key=lambda row: row[0])
+
+    return {
+        **ring,
+        'members': [{
+            'account_id': account,
+            'score': analysis['accounts'].get(account),
+            'roles': [role for member_ring, role in analysis['account_rings'].get(account, []) if member_ring == ring_id]
+        } for account in members],
+        'transactions': [row for _, row in transfers]
+    }
@@ -0,0 +1,176 @@
+import io
+import threading
+import time
+import uuid
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+MAX_WORKERS = 4
+MAX_QUEUED_JOBS = 16
+MAX_RETAINED_JOBS = 200
+
+
+class QueueFullError(RuntimeError):
+    """Raised when too many analysis jobs are already queued or running."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when its job has been cancelled."""
+
+
+def _run_job(analyze, job_id, result_id, data, progress, cancelled):
+    def report(stage):
+        if cancelled.get(job_id):
+            raise JobCancelled(job_id)
+        stages = dict(progress.get(job_id, {}))
+        for name, status in stages.items():
+            if status == 'running':
+                stages[name] = 'done'
+        stages[stage] = 'running'
+        progress[job_id] = stages
+
+    analysis = analyze(result_id, io.BytesIO(data), progress=report)
+    progress[job_id] = {name: 'done' for name in progress.get(job_id, {})}
+    return analysis
+
+
+class JobManager:
+    """Runs uploads on a bounded process pool so request workers return immediately.
+
+    Each job calls `analyze(result_id, file object, progress=...)` in a worker
+    process; it must be a module-level function, so it is pickled by name
+    rather than by importing the server module again, and it must not use
+    connections or locks inherited from this process.
+    The pool and the shared progress/cancel dicts are created on first use.
+    At most `max_queued` jobs may be pending or running; finished jobs are kept
+    (oldest dropped first) until `max_retained` is exceeded. When a job's
+    future resolves it is settled in this process: `on_done(job_id, status,
+    value, job)`, if given, is called with status 'done', 'failed' or
+    'cancelled' and the worker's return value or error message, and returns
+    the value to keep as the job's result. Anything a worker records in its
+    own process (metrics, caches) is lost, so that belongs in on_done.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, max_queued=MAX_QUEUED_JOBS, max_retained=MAX_RETAINED_JOBS,
+                 analyze=None, on_done=None):
+        self.max_workers = max_workers
+        self.analyze = analyze
+        self.max_queued = max_queued
+        self.max_retained = max_retained
+        self.on_done = on_done
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._manager = None
+        self._progress = None
+        self._cancelled = None
+
+    def _start(self):
+        if self._executor is None:
+            self._manager = multiprocessing.Manager()
+            self._progress = self._manager.dict()
+            self._cancelled = self._manager.dict()
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+    def queue_depth(self):
+        with self._lock:
+            return self._pending()
+
+    def _pending(self):
+        return sum(1 for job in self._jobs.values() if 'status' not in job)
+
+    def submit(self, data, filename=None, result_id=None):
+        with self._lock:
+            if self._pending() >= self.max_queued:
+                raise QueueFullError(f'{self.max_queued} analysis jobs already pending')
+            self._start()
+            job_id = uuid.uuid4().hex
+            self._progress[job_id] = {}
+            future = self._executor.submit(_run_job, self.analyze, job_id, result_id, data, self._progress,
+                                           self._cancelled)
+            self._jobs[job_id] = {'future': future, 'filename': filename, 'result_id': result_id,
+                                  'submitted_at': time.time()}
+            self._evict()
+        # Outside the lock: a future that is already done runs the callback right here
+        future.add_done_callback(partial(self._settle, job_id))
+        return job_id
+
+    def complete(self, result, filename=None, result_id=None):
+        """Record a job that needs no worker, e.g. one answered from a cache, as done with `result`."""
+        now = time.time()
+        with self._lock:
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {'filename': filename, 'result_id': result_id, 'submitted_at': now,
+                                  'finished_at': now, 'status': 'done', 'result': result}
+            self._evict()
+        return job_id
+
+    def _settle(self, job_id, future):
+        if future.cancelled():
+            status, value = 'cancelled', None
+        elif isinstance(future.exception(), JobCancelled):
+            status, value = 'cancelled', None
+        elif future.exception() is not None:
+            status, value = 'failed', str(future.exception())
+        else:
+            status, value = 'done', future.result()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job['finished_at'] = time.time()
+        if self.on_done is not None:
+            try:
+                value = self.on_done(job_id, status, value, job)
+            except Exception as e:
+                status, value = 'failed', str(e)
+        with self._lock:
+            job.pop('future', None)
+            job['status'] = status
+            job['result' if status == 'done' else 'error'] = value
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self._jobs.items() if 'status' in job]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_retained)]:
+            del self._jobs[job_id]
+            if self._progress is not None:
+                self._progress.pop(job_id, None)
+                self._cancelled.pop(job_id, None)
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+        info = {
+            'job_id': job_id,
+            'filename': job['filename'],
+            'submitted_at': job['submitted_at'],
+            'progress': dict(self._progress.get(job_id, {})) if self._progress is not None else {}
+        }
+        if 'status' in job:
+            info['status'] = job['status']
+            if job['status'] == 'done':
+                info['result'] = job['result']
+            elif job['status'] == 'failed':
+                info['error'] = job['error']
+        elif self._cancelled is not None and self._cancelled.get(job_id):
+            info['status'] = 'cancelling'
+        else:
+            # A resolved future stays 'running' for the moment it takes to settle
+            info['status'] = 'running' if info['progress'] or job['future'].done() else 'queued'
+        return info
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            future = job.get('future')
+        if future is not None and not future.cancel() and not future.done():
+            # Already running: the worker stops at its next stage boundary
+            self._cancelled[job_id] = True
+        return self.status(job_id)
@@ -0,0 +1,72 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from compact_graph import CompactGraph
+from features import account_features
+
+MERCHANT_PATTERNS = ('MERCHANT', 'PAYROLL', 'VENDO', 'SHOP', 'STORE')
+MERCHANT_PREFIXES = ('ACC_02',)
+MIN_RECEIPTS = 15
+MIN_PAYERS = 5
+
+
+class MerchantClassifier:
+    """Decide which accounts are legitimate merchants that detectors must not enter.
+
+    An account is a merchant when its ID contains one of `patterns` or starts
+    with one of `prefixes` (case-insensitive, one compiled regex), or when it
+    received at least `min_receipts` transactions from at least `min_payers`
+    distinct senders. Set `min_receipts` to None to use the name rules only.
+    """
+
+    def __init__(self, patterns=MERCHANT_PATTERNS, prefixes=MERCHANT_PREFIXES,
+                 min_receipts=MIN_RECEIPTS, min_payers=MIN_PAYERS):
+        rules = [re.escape(p) for p in patterns] + [f'^{re.escape(p)}' for p in prefixes]
+        self.regex = re.compile('|'.join(rules), re.IGNORECASE) if rules else None
+        self.min_receipts = min_receipts
+        self.min_payers = min_payers
+
+    def is_merchant(self, account_id):
+        """Name rules for a single account, for callers without per-account stats."""
+        return isinstance(account_id, str) and self.regex is not None and bool(self.regex.search(account_id))
+
+    def name_mask(self, accounts):
+        """Match the name rules against an array of distinct account IDs in one pass."""
+        if self.regex is None or not len(accounts):
+            return np.zeros(len(accounts), dtype=bool)
+        matches = pd.Series(accounts, dtype=object).str.contains(self.regex, na=False)
+        return matches.to_numpy(dtype=bool, copy=True)
+
+    def mask(self, source, features=None):
+        """Return a boolean merchant mask over the accounts of `source`.
+
+        For a CompactGraph the mask is indexed by node; for a transactions frame
+        it follows the order of its feature table (see account_labels).
+        `features` may pass in the already built account_features(source).
+        """
+        use_volume = self.min_receipts is not None
+        if features is None and (use_volume or not isinstance(source, CompactGraph)):
+            features = account_features(source)
+        mask = self.name_mask(account_labels(source, features))
+        if use_volume:
+            mask |= ((features['in_count'].to_numpy() >= self.min_receipts)
+                     & (features['in_counterparties'].to_numpy() >= self.min_payers))
+        return mask
+
+    def accounts(self, source, mask=None, features=None):
+        if features is None and not isinstance(source, CompactGraph):
+            features = account_features(source)
+        mask = self.mask(source, features) if mask is None else mask
+        return set(account_labels(source, features)[mask].tolist())
+
+
+def account_labels(source, features=None):
+    if isinstance(source, CompactGraph):
+        return source.labels
+    features = account_features(source) if features is None else features
+    return features.index.to_numpy(dtype=object)
+
+
+DEFAULT_CLASSIFIER = MerchantClassifier()
@@ -0,0 +1,138 @@
+import math
+import numbers
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class RunMetrics:
+    """Stage timings and counters collected during one analysis run."""
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = defaultdict(int)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def as_dict(self):
+        return {
+            'stage_seconds': {name: round(seconds, 4) for name, seconds in self.stages.items()},
+            'counters': dict(self.counters)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a run from as_dict() output, e.g. one returned by a worker process."""
+        run = cls()
+        run.stages.update(data['stage_seconds'])
+        run.counters.update(data['counters'])
+        return run
+
+
+class MetricsRegistry:
+    """Process-wide counters, gauges and latency histograms in Prometheus text format.
+
+    Every metric is keyed by name and a tuple of (label, value) pairs. Histograms
+    use the fixed `buckets` upper bounds in seconds.
+    """
+
+    def __init__(self, prefix='fraud_', buckets=LATENCY_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self._counters = defaultdict(int)
+        self._gauges = {}
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += 1
+            histogram[2] += seconds
+
+    def record_run(self, run):
+        """Fold a finished RunMetrics into the process-wide metrics."""
+        for stage, seconds in run.stages.items():
+            self.observe('analysis_stage_seconds', seconds, stage=stage)
+        for name, value in run.counters.items():
+            self.inc(f'analysis_{name}_total', value)
+
+    def render(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(self._histograms.items())
+
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append(f'# HELP {self.prefix}{name} {self._help[name]}')
+                lines.append(f'# TYPE {self.prefix}{name} {kind}')
+
+        for (name, labels), value in counters:
+            header(name, 'counter')
+            lines.append(f'{self.prefix}{name}{_labels(labels)} {_number(value)}')
+        for (name, labels), value in gauges:
+            header(name, 'gauge')
+            lines.append(f'{self.prefix}{name}{_labels(labels)} {_number(value)}')
+        for (name, labels), (counts, total, seconds) in histograms:
+            header(name, 'histogram')
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{self.prefix}{name}_bucket{_labels(labels + (("le", f"{bound:g}"),))} {count}')
+            lines.append(f'{self.prefix}{name}_bucket{_labels(labels + (("le", "+Inf"),))} {total}')
+            lines.append(f'{self.prefix}{name}_sum{_labels(labels)} {_number(seconds)}')
+            lines.append(f'{self.prefix}{name}_count{_labels(labels)} {total}')
+        return '\n'.join(lines) + '\n'
+
+
+def _number(value):
+    """Exposition form of a sample: integers exactly, floats at full precision."""
+    if isinstance(value, numbers.Integral):
+        return str(int(value))
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
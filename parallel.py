@@ -0,0 +1,168 @@
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+from cycles import (iter_short_cycles, iter_temporal_cycles, MIN_CYCLE_LENGTH, MAX_CYCLES,
+                    CYCLE_WINDOW_HOURS)
+from shells import iter_shell_chains
+from snapshot import load_graph
+
+UNITS_PER_WORKER = 4
+
+_graph = None
+_exclude = None
+
+
+def _init_worker(graph, exclude):
+    global _graph, _exclude
+    _graph = load_graph(graph) if isinstance(graph, str) else graph
+    _exclude = exclude
+
+
+def _cycle_unit(unit, mode, max_cycles, options, budget):
+    stats = {}
+    # A split component may arrive as several pieces; search it once from all their roots
+    pieces = {}
+    for index, nodes, roots in unit:
+        if index not in pieces:
+            pieces[index] = (nodes, set())
+        pieces[index][1].update(nodes.tolist() if roots is None else roots)
+    components = [nodes for nodes, _ in pieces.values()]
+    roots = set().union(*(roots for _, roots in pieces.values()))
+    if mode == 'temporal':
+        search = iter_temporal_cycles(_graph, exclude=_exclude, stats=stats, components=components,
+                                      roots=roots, budget=budget, **options)
+    else:
+        search = iter_short_cycles(_graph, exclude=_exclude, stats=stats, components=components, roots=roots,
+                                   budget=budget)
+    return list(islice(search, max_cycles)), stats
+
+
+def _shell_unit(sources, budget):
+    stats = {}
+    return list(iter_shell_chains(_graph, exclude=_exclude, sources=set(sources), stats=stats, budget=budget)), stats
+
+
+def _merge_stats(stats, unit_stats):
+    for key, value in unit_stats.items():
+        if key == 'truncated':
+            stats['truncated'] = stats.get('truncated', False) or value
+        else:
+            stats[key] = stats.get(key, 0) + value
+
+
+def pack_units(weights, n_units):
+    """Assign items to at most `n_units` bins, heaviest first into the lightest bin.
+
+    Returns a list of index lists, each in ascending item order.
+    """
+    bins = [(0, i, []) for i in range(min(n_units, len(weights)))]
+    heapq.heapify(bins)
+    for item in np.argsort(-np.asarray(weights), kind='stable').tolist():
+        load, i, members = heapq.heappop(bins)
+        members.append(item)
+        heapq.heappush(bins, (load + weights[item], i, members))
+    return [sorted(members) for _, _, members in sorted(bins, key=lambda b: b[1]) if members]
+
+
+class ParallelDetector:
+    """Run cycle and shell-chain searches for one graph on a pool of worker processes.
+
+    The graph and exclusion mask are handed to each worker once, when the pool
+    starts; given a `snapshot` directory of the graph (see snapshot.py),
+    workers memory-map it instead and share its pages. Cycle work is cut along strongly connected components, packed into
+    balanced units by edge count; a component heavier than one unit's share
+    is split further by search root. Shell chains are split by source account.
+    Results are merged back into the exact order a serial search produces, so
+    ring numbering does not depend on the number of workers.
+    """
+
+    def __init__(self, graph, exclude=None, workers=None, snapshot=None):
+        self.graph = graph
+        self.exclude = graph.node_mask(exclude)
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                         initargs=(snapshot or graph, self.exclude))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._pool.shutdown(cancel_futures=True)
+
+    def cycle_units(self, min_length=MIN_CYCLE_LENGTH):
+        components = [c for c in self.graph.strongly_connected_components(self.exclude) if len(c) >= min_length]
+        out_degree = np.diff(self.graph.succ_indptr)
+        weights = [int(out_degree[c].sum()) for c in components]
+        n_units = self.workers * UNITS_PER_WORKER
+        share = sum(weights) / n_units if weights else 0
+        # (component index, nodes, roots or None for all of them)
+        pieces, piece_weights = [], []
+        for i, (nodes, weight) in enumerate(zip(components, weights)):
+            splits = min(int(weight // share), len(nodes)) if share and weight > share else 1
+            for k in range(splits):
+                pieces.append((i, nodes, None if splits == 1 else nodes[k::splits].tolist()))
+                piece_weights.append(weight / splits)
+        return components, [[pieces[p] for p in unit] for unit in pack_units(piece_weights, n_units)]
+
+    def cycles(self, mode='structural', max_cycles=MAX_CYCLES, window_hours=CYCLE_WINDOW_HOURS,
+               amount_tolerance=None, stats=None, budget=None):
+        """Return the first `max_cycles` cycles (node lists) in serial search order.
+
+        A `budget` keeps its deadline in every unit and splits its path
+        allowance evenly between them.
+        """
+        components, units = self.cycle_units()
+        options = {'window_hours': window_hours, 'amount_tolerance': amount_tolerance} if mode == 'temporal' else {}
+        unit_budget = budget.split(len(units)) if budget is not None and units else None
+        futures = [self._pool.submit(_cycle_unit, unit, mode, max_cycles, options, unit_budget) for unit in units]
+        found = []
+        for future in futures:
+            cycles, unit_stats = future.result()
+            found.extend(cycles)
+            if stats is not None:
+                _merge_stats(stats, unit_stats)
+
+        # Serial order: structural by (component, root rank), temporal by root node.
+        # Each root is searched in one unit, so a stable sort restores it exactly
+        if mode == 'temporal':
+            found.sort(key=lambda cycle: cycle[0])
+            unique, seen = [], set()
+            for cycle in found:
+                low = cycle.index(min(cycle))
+                key = tuple(cycle[low:] + cycle[:low])
+                if key not in seen:
+                    seen.add(key)
+                    unique.append(cycle)
+            found = unique
+        else:
+            position = np.zeros(len(self.graph.labels), dtype=np.int64)
+            for i, nodes in enumerate(components):
+                position[nodes] = i * len(self.graph.labels) + np.arange(len(nodes))
+            position = position.tolist()
+            found.sort(key=lambda cycle: position[cycle[0]])
+        return found[:max_cycles]
+
+    def shell_chains(self, stats=None, budget=None):
+        """Return every shell chain (node lists) in serial search order.
+
+        A `budget` is split between the units as in cycles().
+        """
+        sources = np.flatnonzero(~self.exclude)
+        n_units = min(self.workers, len(sources)) or 1
+        unit_budget = budget.split(n_units) if budget is not None else None
+        futures = [self._pool.submit(_shell_unit, sources[k::n_units].tolist(), unit_budget) for k in range(n_units)]
+        found = []
+        for future in futures:
+            paths, unit_stats = future.result()
+            found.extend(paths)
+            if stats is not None:
+                _merge_stats(stats, unit_stats)
+        found.sort(key=lambda path: path[0])
+        return found
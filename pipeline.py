@@ -0,0 +1,327 @@
+import time
+
+import pandas as pd
+
+from batch import read_batch, ring_sources
+from budget import Budget, detector_report
+from compact_graph import CompactGraph
+from cycles import iter_short_cycles, iter_temporal_cycles, MAX_CYCLES, CYCLE_WINDOW_HOURS
+from features import account_features
+from ingest import read_transactions
+from merchants import MerchantClassifier, MIN_RECEIPTS, MIN_PAYERS
+from parallel import ParallelDetector
+from rings import RingSet, canonical_key
+from shells import iter_shell_chains, maximal_paths
+from windows import graph_windows
+
+DEFAULT_PARAMS = {
+    # Registered detectors to run; they always run in registration order
+    'detectors': ['fan_in', 'fan_out', 'cycles'],
+    'max_cycles': MAX_CYCLES,
+    # 'structural' finds every short loop; 'temporal' only loops whose legs run forward in time
+    'cycle_mode': 'structural',
+    'cycle_window_hours': CYCLE_WINDOW_HOURS,
+    'cycle_amount_tolerance': None,
+    'fan_hours': 72,
+    'fan_min_txs': 4,
+    'fan_min_counterparties': 3,
+    # A fan window is all of an account's transactions rather than those in any fan_hours span
+    'fan_full_span': True,
+    'min_ring_size': 3,
+    'merchant_min_receipts': MIN_RECEIPTS,
+    'merchant_min_payers': MIN_PAYERS,
+    # Budget for the whole analysis, parsing included; None is unlimited
+    'max_seconds': None,
+    'max_cycles_explored': None
+}
+# An account's score is that of its strongest role in any ring
+ROLE_SCORES = {'cycle': 95.0, 'aggregator': 90.0, 'distributor': 88.0, 'smurf_sender': 85.0}
+DEFAULT_ROLE_SCORE = 80.0
+
+ARTIFACTS = {}
+DETECTORS = {}
+
+
+def artifact(name):
+    """Register `build(pipeline)` as the builder of shared artifact `name`."""
+    def register(build):
+        ARTIFACTS[name] = build
+        return build
+    return register
+
+
+def register_detector(name, requires=(), precedence=None):
+    """Register `search(pipeline, stats, budget)` as detector `name`.
+
+    `search` returns candidate rings made with make_ring, reading artifacts
+    through pipeline.artifact; `requires` names the ones it reads, which are
+    built before its clock starts. Detectors run in registration order, so
+    register cheaper ones first. When two detectors report the same member
+    set, the ring of the lower `precedence` (default: registration order)
+    is numbered first and the other's pattern and roles are merged into it.
+    """
+    def register(search):
+        DETECTORS[name] = {'search': search, 'requires': tuple(requires),
+                           'precedence': len(DETECTORS) if precedence is None else precedence}
+        return search
+    return register
+
+
+def make_ring(members, pattern_type, risk_score, roles=None, **fields):
+    """A detector's candidate ring; accounts missing from `roles` take the pattern type as role."""
+    return {'member_accounts': members, 'pattern_type': pattern_type, 'risk_score': risk_score,
+            'roles': roles, **fields}
+
+
+class Pipeline:
+    """One analysis: shared artifacts, registered detectors and a single scoring stage.
+
+    `source` is an uploaded file object, a list of (filename, file object)
+    pairs merged by read_batch, or an already typed transactions frame.
+    Artifacts (the frame, the interned graph, its time-sorted per-account
+    edge arrays, per-account stats, the merchant mask, a process pool) are
+    built on first use and shared, so each is computed at most once and one
+    that no enabled detector asks for is never computed. With `workers` > 1
+    the cycle and shell searches share one pool, which memory-maps the graph
+    from `snapshot` when given. The `budget` (by default one built from
+    max_seconds and max_cycles_explored) is running from the moment the
+    pipeline is created. Call close() when done.
+    """
+
+    def __init__(self, source, params=None, workers=1, snapshot=None, budget=None):
+        self.source = source
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
+        unknown = set(self.params['detectors']) - set(DETECTORS)
+        if unknown:
+            raise ValueError(f"Unknown detectors: {', '.join(sorted(unknown))}")
+        self.workers = workers or 1
+        self.snapshot = snapshot
+        # The clock runs from here, so parsing and graph building spend it too
+        self.budget = budget if budget is not None else Budget(self.params['max_seconds'],
+                                                               self.params['max_cycles_explored'])
+        self.ingest_stats = None
+        self.candidates = {}
+        self.stats = {}
+        self.seconds = {}
+        self._artifacts = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pool = self._artifacts.pop('pool', None)
+        if pool is not None:
+            pool.close()
+
+    def artifact(self, name):
+        if name not in self._artifacts:
+            self._artifacts[name] = ARTIFACTS[name](self)
+        return self._artifacts[name]
+
+    def detect(self, progress=None):
+        """Run the enabled detectors, cheapest first, and return their reports.
+
+        Each detector starts only while the budget lasts and its search
+        checks the budget as it goes, so a spent budget leaves partial
+        results. `progress(name)` is called as each detector starts.
+        """
+        for name, spec in DETECTORS.items():
+            if name not in self.params['detectors']:
+                continue
+            if progress is not None:
+                progress(name)
+            stats = self.stats[name] = {}
+            if self.budget.expired():
+                stats['skipped'] = True
+                self.candidates[name], self.seconds[name] = [], 0.0
+                continue
+            for required in spec['requires']:
+                self.artifact(required)
+            start = time.perf_counter()
+            self.candidates[name] = spec['search'](self, stats, self.budget)
+            self.seconds[name] = time.perf_counter() - start
+        return self.reports()
+
+    def reports(self):
+        return {name: detector_report(stats, self.seconds[name]) for name, stats in self.stats.items()}
+
+    def score(self):
+        """Number the detected rings and score every member account.
+
+        Candidates are taken in detector precedence order. Rings below
+        min_ring_size members are dropped and a member set already seen is
+        merged into its first ring (see RingSet).
+        Each account scores its strongest role (ROLE_SCORES) across its rings.
+        Returns (rings, account_rings, suspicious_accounts, duplicates), with
+        account_rings mapping accounts to [(ring_id, role), ...].
+        """
+        ring_set = RingSet()
+        min_size = self.params['min_ring_size']
+        for name in sorted(self.candidates, key=lambda name: DETECTORS[name]['precedence']):
+            for ring in self.candidates[name]:
+                members = ring['member_accounts']
+                if len(members) >= min_size:
+                    fields = {key: value for key, value in ring.items()
+                              if key not in ('member_accounts', 'pattern_type', 'risk_score', 'roles')}
+                    ring_set.add(members, ring['pattern_type'], ring['risk_score'], roles=ring['roles'],
+                                 member_count=len(members), **fields)
+        rings = ring_sources(self.artifact('graph'), ring_set.rings)
+
+        suspicious_accounts = []
+        for account, memberships in ring_set.account_rings.items():
+            patterns = {role for _, role in memberships}
+            ring_ids = list(dict.fromkeys(ring_id for ring_id, _ in memberships))
+            suspicious_accounts.append({
+                "account_id": account,
+                "suspicion_score": max(ROLE_SCORES.get(role, DEFAULT_ROLE_SCORE) for role in patterns),
+                "detected_patterns": sorted(patterns),
+                "ring_id": ring_ids[0],
+                "ring_ids": ring_ids,
+                "ring_count": len(ring_ids)
+            })
+        suspicious_accounts.sort(key=lambda x: x['suspicion_score'], reverse=True)
+        return rings, ring_set.account_rings, suspicious_accounts, ring_set.duplicates
+
+
+# Shared artifacts
+
+@artifact('frame')
+def _frame(pipeline):
+    source = pipeline.source
+    if isinstance(source, pd.DataFrame):
+        df, pipeline.ingest_stats = source, {'rows': len(source), 'engine': 'frame', 'rows_per_second': 0}
+    elif isinstance(source, list):
+        df, pipeline.ingest_stats = read_batch(source)
+    else:
+        df, pipeline.ingest_stats = read_transactions(source)
+    return df
+
+
+@artifact('graph')
+def _graph(pipeline):
+    return CompactGraph.from_frame(pipeline.artifact('frame'))
+
+
+@artifact('edges_in')
+def _edges_in(pipeline):
+    return pipeline.artifact('graph').sorted_edges('in')
+
+
+@artifact('edges_out')
+def _edges_out(pipeline):
+    return pipeline.artifact('graph').sorted_edges('out')
+
+
+@artifact('account_stats')
+def _account_stats(pipeline):
+    return account_features(pipeline.artifact('graph'))
+
+
+@artifact('merchant_classifier')
+def _merchant_classifier(pipeline):
+    return MerchantClassifier(min_receipts=pipeline.params['merchant_min_receipts'],
+                              min_payers=pipeline.params['merchant_min_payers'])
+
+
+@artifact('merchant_mask')
+def _merchant_mask(pipeline):
+    # Merchants are classified once and never entered by any detector
+    classifier = pipeline.artifact('merchant_classifier')
+    features = pipeline.artifact('account_stats') if classifier.min_receipts is not None else None
+    return classifier.mask(pipeline.artifact('graph'), features)
+
+
+@artifact('merchant_accounts')
+def _merchant_accounts(pipeline):
+    return pipeline.artifact('merchant_classifier').accounts(pipeline.artifact('graph'),
+                                                             pipeline.artifact('merchant_mask'))
+
+
+@artifact('pool')
+def _pool(pipeline):
+    if pipeline.workers <= 1:
+        return None
+    return ParallelDetector(pipeline.artifact('graph'), pipeline.artifact('merchant_mask'), pipeline.workers,
+                            snapshot=pipeline.snapshot)
+
+
+# Detectors, cheapest first
+
+def _fan_windows(pipeline, direction, stats):
+    params = pipeline.params
+    return graph_windows(pipeline.artifact('graph'), direction, hours=params['fan_hours'],
+                         min_txs=params['fan_min_txs'], min_counterparties=params['fan_min_counterparties'],
+                         full_span=params['fan_full_span'], exclude=pipeline.artifact('merchant_mask'),
+                         stats=stats, edges=pipeline.artifact(f'edges_{direction}'))
+
+
+@register_detector('fan_in', requires=('graph', 'edges_in', 'merchant_mask'), precedence=1)
+def detect_fan_in(pipeline, stats, budget):
+    labels = pipeline.artifact('graph').labels
+    rings = []
+    for window in _fan_windows(pipeline, 'in', stats):
+        aggregator = labels[window['account']]
+        senders = labels[window['counterparties']].tolist()
+        roles = {account: 'smurf_sender' for account in senders}
+        roles[aggregator] = 'aggregator'
+        rings.append(make_ring(list(set(senders + [aggregator])), 'fan_in', 85.0, roles, aggregator=str(aggregator)))
+    return rings
+
+
+@register_detector('fan_out', requires=('graph', 'edges_out', 'merchant_mask'), precedence=2)
+def detect_fan_out(pipeline, stats, budget):
+    labels = pipeline.artifact('graph').labels
+    rings = []
+    for window in _fan_windows(pipeline, 'out', stats):
+        sender = labels[window['account']]
+        receivers = labels[window['counterparties']].tolist()
+        roles = {account: 'receiver' for account in receivers}
+        roles[sender] = 'distributor'
+        rings.append(make_ring(list(set([sender] + receivers)), 'fan_out', 85.0, roles))
+    return rings
+
+
+@register_detector('cycles', requires=('graph', 'merchant_mask', 'pool'), precedence=0)
+def detect_cycles(pipeline, stats, budget):
+    params = pipeline.params
+    graph, exclude, pool = pipeline.artifact('graph'), pipeline.artifact('merchant_mask'), pipeline.artifact('pool')
+    max_cycles = params['max_cycles']
+    temporal = {'window_hours': params['cycle_window_hours'], 'amount_tolerance': params['cycle_amount_tolerance']}
+    rings, seen, found = [], set(), 0
+    try:
+        if pool is not None:
+            # One past the cap, to tell a full result from a truncated one
+            search = pool.cycles(mode=params['cycle_mode'], max_cycles=max_cycles + 1, stats=stats, budget=budget,
+                                 **temporal)
+        elif params['cycle_mode'] == 'temporal':
+            search = iter_temporal_cycles(graph, exclude=exclude, stats=stats, budget=budget, **temporal)
+        else:
+            search = iter_short_cycles(graph, exclude=exclude, stats=stats, budget=budget)
+        for cycle in search:
+            if found == max_cycles:
+                stats['truncated'] = True
+                break
+            found += 1
+            key = canonical_key(cycle)
+            if key not in seen:
+                seen.add(key)
+                rings.append(make_ring(sorted(graph.labels[cycle].tolist()), 'cycle', 95.0))
+    except Exception as e:
+        stats['error'] = str(e)
+        stats['truncated'] = True
+    return rings
+
+
+@register_detector('shell_chains', requires=('graph', 'merchant_mask', 'pool'), precedence=3)
+def detect_shell_chains(pipeline, stats, budget):
+    # Searched from every eligible source over the low-degree subgraph
+    graph, exclude, pool = pipeline.artifact('graph'), pipeline.artifact('merchant_mask'), pipeline.artifact('pool')
+    if pool is not None:
+        paths = pool.shell_chains(stats=stats, budget=budget)
+    else:
+        paths = iter_shell_chains(graph, exclude=exclude, stats=stats, budget=budget)
+    # A chain found from several sources is reported once, at its full length
+    return [make_ring(graph.labels[path].tolist(), 'shell_network', 90.0) for path in maximal_paths(paths)]
@@ -0,0 +1,85 @@
+import base64
+import io
+import numpy as np
+
+VIZ_MAX_NODES = 200
+NODE_STYLES = {
+    'merchant': ('#ffffff', 250),
+    'repeat': ('#ffaa00', 350),
+    'single': ('#ff3333', 300),
+    'normal': ('#33ff33', 200)
+}
+
+
+def select_viz_nodes(graph, limit=VIZ_MAX_NODES):
+    """Return the node indices drawn in the network image (all nodes, or the top `limit` by degree)."""
+    if graph.number_of_nodes() > limit:
+        return np.sort(np.argsort(-graph.degrees(), kind='stable')[:limit])
+    return np.arange(graph.number_of_nodes())
+
+
+def classify_viz_nodes(graph, nodes, merchant_accounts, fraud_set, ring_membership):
+    """Map each drawn account to merchant / repeat / single / normal."""
+    roles = {}
+    for node in graph.labels[nodes].tolist():
+        if node in merchant_accounts:
+            roles[node] = 'merchant'
+        elif node in fraud_set:
+            roles[node] = 'repeat' if ring_membership.get(node, 0) > 1 else 'single'
+        else:
+            roles[node] = 'normal'
+    return roles
+
+
+def render_network_png(graph, nodes, roles, summary):
+    """Draw the network image and return PNG bytes; matplotlib is only imported here."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Patch
+    import networkx as nx
+
+    plt.figure(figsize=(20, 14), facecolor='black')
+    
+    if len(nodes) > 0:
+        G_viz = graph.to_networkx(nodes)
+        pos = nx.spring_layout(G_viz, k=2, iterations=50, seed=42)
+        
+        node_colors = [NODE_STYLES[roles[node]][0] for node in G_viz.nodes()]
+        node_sizes = [NODE_STYLES[roles[node]][1] for node in G_viz.nodes()]
+        
+        nx.draw_networkx_nodes(G_viz, pos, node_color=node_colors, 
+                              node_size=node_sizes, alpha=0.9)
+        nx.draw_networkx_edges(G_viz, pos, edge_color='#444444', 
+                              arrows=True, arrowsize=8, width=0.5, alpha=0.3)
+        nx.draw_networkx_labels(G_viz, pos, font_size=5, font_color='white', 
+                               font_weight='bold')
+        
+        legend_elements = [
+            Patch(facecolor='#ff3333', label=f"🔴 Single Ring ({summary['single_ring_members']})"),
+            Patch(facecolor='#ffaa00', label=f"🟡 Repeat Offender ({summary['repeat_offenders']})"),
+            Patch(facecolor='#ffffff', label=f"⚪ Merchants ({summary['merchant_accounts_detected']})"),
+            Patch(facecolor='#33ff33', label=f"🟢 Normal ({summary['normal_accounts']})")
+        ]
+        plt.legend(handles=legend_elements, loc='upper right', 
+                  facecolor='#222222', labelcolor='white', framealpha=0.9,
+                  fontsize=10)
+        
+        plt.title(f"Transaction Network - {summary['total_accounts_analyzed']} Total Accounts", 
+                 color='white', size=16, pad=20, fontweight='bold')
+    else:
+        plt.text(0.5, 0.5, 'No graph data available', color='white', 
+                size=16, ha='center', va='center')
+    
+    plt.axis('off')
+    plt.tight_layout()
+    
+    img = io.BytesIO()
+    plt.savefig(img, format='png', facecolor='black', dpi=150, 
+               bbox_inches='tight', pad_inches=0.5)
+    plt.close()
+    return img.getvalue()
+
+
+def encode_png(png):
+    return base64.b64encode(png).decode()
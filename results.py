@@ -0,0 +1,117 @@
+import json
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 5000
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# Per section: result key, score field, pattern test and the fields it can be sorted on
+SECTIONS = {
+    'accounts': {
+        'key': 'suspicious_accounts',
+        'score': 'suspicion_score',
+        'patterns': lambda item: item.get('detected_patterns', ()),
+        'sort_fields': {'score': 'suspicion_score', 'account_id': 'account_id', 'ring_count': 'ring_count'}
+    },
+    'rings': {
+        'key': 'fraud_rings',
+        'score': 'risk_score',
+        'patterns': lambda item: (item.get('pattern_type'),),
+        'sort_fields': {'score': 'risk_score', 'ring_id': 'ring_id', 'member_count': 'member_count'}
+    }
+}
+
+
+def dumps(obj):
+    """Serialize to JSON bytes, with orjson when it is installed."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+def parse_query(args):
+    """Read sort/filter/page options from request args. Raises ValueError on bad values."""
+    order = args.get('order', 'desc')
+    if order not in ('asc', 'desc'):
+        raise ValueError("order must be 'asc' or 'desc'")
+    min_score = args.get('min_score')
+    max_score = args.get('max_score')
+    patterns = args.get('pattern')
+    return {
+        'sort': args.get('sort', 'score'),
+        'descending': order == 'desc',
+        'min_score': float(min_score) if min_score is not None else None,
+        'max_score': float(max_score) if max_score is not None else None,
+        'patterns': set(patterns.split(',')) if patterns else None,
+        'offset': max(int(args.get('offset', 0)), 0),
+        'limit': min(max(int(args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    }
+
+
+def select(result, section, sort='score', descending=True, min_score=None, max_score=None, patterns=None,
+           **_):
+    """Return the filtered and sorted items of one result section ('accounts' or 'rings')."""
+    spec = SECTIONS[section]
+    field = spec['sort_fields'].get(sort)
+    if field is None:
+        raise ValueError(f"{section} can be sorted by {', '.join(spec['sort_fields'])}")
+    score = spec['score']
+    items = [item for item in result.get(spec['key'], [])
+             if (min_score is None or item[score] >= min_score)
+             and (max_score is None or item[score] <= max_score)
+             and (patterns is None or not patterns.isdisjoint(spec['patterns'](item)))]
+    # Stable sort, so ties keep the analysis order
+    items.sort(key=lambda item: item.get(field), reverse=descending)
+    return items
+
+
+def page(result, section, query):
+    """One page of a result section plus the paging metadata."""
+    items = select(result, section, **query)
+    offset, limit = query['offset'], query['limit']
+    return {
+        'result_id': result.get('result_id'),
+        'section': section,
+        'total': len(items),
+        'offset': offset,
+        'limit': limit,
+        'next_offset': offset + limit if offset + limit < len(items) else None,
+        'items': items[offset:offset + limit]
+    }
+
+
+def summary_view(result):
+    """The result without its per-item sections, for clients that page through them."""
+    view = {key: value for key, value in result.items()
+            if key not in ('suspicious_accounts', 'fraud_rings', 'graph', 'ring_clusters')}
+    if result.get('result_id'):
+        view['links'] = {section: f"/results/{result['result_id']}/{section}" for section in SECTIONS}
+    return view
+
+
+def iter_ndjson(result, sections=('rings', 'accounts'), query=None):
+    """Yield a result as newline-delimited JSON in chunks of about STREAM_CHUNK_BYTES.
+
+    The first line is {"type": "summary", ...}; every ring and account then
+    follows as its own {"type": "ring"|"account", ...} line, so a client can
+    render items as they arrive instead of parsing one large document.
+    Filters and sorting from `query` apply to every section; paging does not.
+    Invalid options raise ValueError on the first next().
+    """
+    query = query or {}
+    selected = [(section[:-1], select(result, section, **query)) for section in sections]
+    buffer = bytearray(dumps({'type': 'summary', **summary_view(result)}) + b'\n')
+    for kind, items in selected:
+        for item in items:
+            buffer += dumps({'type': kind, **item})
+            buffer += b'\n'
+            if len(buffer) >= STREAM_CHUNK_BYTES:
+                yield bytes(buffer)
+                buffer.clear()
+    if buffer:
+        yield bytes(buffer)
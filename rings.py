@@ -0,0 +1,128 @@
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+
+def canonical_key(members):
+    """Order-independent, hashable form of a ring's member set.
+
+    The sorted tuple shares the member objects, so a key costs one pointer
+    per member, and set lookups compare members exactly on a hash match.
+    """
+    return tuple(sorted(members))
+
+
+class RingSet:
+    """Collect rings as detectors produce them, merging repeated member sets on arrival.
+
+    The first ring seen for a member set keeps its ID, pattern_type and
+    fields; a later ring with the same members is found in O(ring size)
+    instead of being compared against every ring so far, and only adds its
+    pattern to the ring's pattern_types, its members' roles and a higher
+    risk score. Rings get sequential RING_### IDs and are indexed per
+    account as [(ring_id, role), ...] in ring order, one entry per distinct
+    role.
+    """
+
+    def __init__(self):
+        self.rings = []
+        self.account_rings = defaultdict(list)
+        self.duplicates = 0
+        self._by_key = {}
+
+    def __len__(self):
+        return len(self.rings)
+
+    def add(self, members, pattern_type, risk_score, roles=None, **fields):
+        """Add a ring, or merge it into the known ring with the same member set. Returns the ring.
+
+        `roles` maps accounts to their role in this ring; accounts missing
+        from it get the pattern type as role.
+        """
+        key = canonical_key(members)
+        roles = roles or {}
+        ring = self._by_key.get(key)
+        if ring is not None:
+            self.duplicates += 1
+            if pattern_type not in ring["pattern_types"]:
+                ring["pattern_types"].append(pattern_type)
+            ring["risk_score"] = max(ring["risk_score"], risk_score)
+            for account in members:
+                membership = (ring["ring_id"], roles.get(account, pattern_type))
+                if membership not in self.account_rings[account]:
+                    self.account_rings[account].append(membership)
+            return ring
+        ring = {
+            "ring_id": f"RING_{len(self.rings) + 1:03d}",
+            "member_accounts": members,
+            "pattern_type": pattern_type,
+            "pattern_types": [pattern_type],
+            "risk_score": risk_score,
+            **fields
+        }
+        self._by_key[key] = ring
+        self.rings.append(ring)
+        for account in members:
+            self.account_rings[account].append((ring["ring_id"], roles.get(account, pattern_type)))
+        return ring
+
+
+def _roles(memberships):
+    if len(memberships) == 1:
+        return [memberships[0][1]]
+    return list(dict.fromkeys(role for _, role in memberships))
+
+
+def consolidate_rings(rings, account_rings):
+    """Merge rings that share any member into clusters.
+
+    Rings and accounts form a bipartite graph and every connected component
+    of it is one cluster, which is what a union-find over shared members
+    computes, done in a single sparse pass. Each cluster lists its rings,
+    members, how many of its rings each pattern was detected in, every member's roles
+    (from `account_rings`) and the highest ring risk score. Clusters come
+    back in order of their first ring.
+    """
+    if not rings:
+        return []
+    n_rings = len(rings)
+    sizes = [len(ring["member_accounts"]) for ring in rings]
+    codes, accounts = pd.factorize(np.asarray(
+        [account for ring in rings for account in ring["member_accounts"]], dtype=object))
+    n = n_rings + len(accounts)
+    incidence = csr_matrix((np.ones(len(codes), dtype=np.int8),
+                            (np.repeat(np.arange(n_rings), sizes), codes + n_rings)), shape=(n, n))
+    component = connected_components(incidence, directed=False)[1]
+
+    # Number clusters by their first ring, then group rings and accounts by cluster
+    ring_component = component[:n_rings]
+    first_rings = np.unique(ring_component, return_index=True)[1]
+    cluster_of = np.empty(component.max() + 1, dtype=np.int64)
+    cluster_of[ring_component[np.sort(first_rings)]] = np.arange(len(first_rings))
+    ring_cluster = cluster_of[ring_component]
+    account_cluster = cluster_of[component[n_rings:]]
+    ring_order = np.argsort(ring_cluster, kind='stable')
+    account_order = np.argsort(account_cluster, kind='stable')
+    ring_bounds = np.searchsorted(ring_cluster[ring_order], np.arange(len(first_rings) + 1)).tolist()
+    account_bounds = np.searchsorted(account_cluster[account_order], np.arange(len(first_rings) + 1)).tolist()
+    ring_order = ring_order.tolist()
+    members_by_cluster = accounts[account_order].tolist()
+
+    consolidated = []
+    for cluster in range(len(first_rings)):
+        cluster_rings = [rings[i] for i in ring_order[ring_bounds[cluster]:ring_bounds[cluster + 1]]]
+        members = members_by_cluster[account_bounds[cluster]:account_bounds[cluster + 1]]
+        consolidated.append({
+            "cluster_id": f"CLUSTER_{cluster + 1:03d}",
+            "ring_ids": [ring["ring_id"] for ring in cluster_rings],
+            "member_accounts": members,
+            "member_count": len(members),
+            "pattern_composition": dict(Counter(pattern for ring in cluster_rings
+                                                for pattern in ring.get("pattern_types", [ring["pattern_type"]]))),
+            "member_roles": {account: _roles(account_rings[account]) for account in members},
+            "risk_score": max(ring["risk_score"] for ring in cluster_rings)
+        })
+    return consolidated
@@ -1,73 +1,85 @@
+from collections import defaultdict
+
+import numpy as np
+
+from merchants import DEFAULT_CLASSIFIER
+
+
+def build_ring_index(fraud_rings, excluded=()):
+    """Map each account to its [(ring_id, pattern_type), ...] memberships in ring order."""
+    index = defaultdict(list)
+    for ring in fraud_rings:
+        for account in ring["member_accounts"]:
+            if account not in excluded:
+                index[account].append((ring["ring_id"], ring["pattern_type"]))
+    return index
+
+
+def score_membership(account, ring):
+    """Return (score, pattern) for one account's membership in `ring`."""
+    pattern_type = ring["pattern_type"]
+    if pattern_type == "cycle":
+        return 95.0, "cycle_length_3"
+    if pattern_type == "fan_in":
+        if account == ring.get("aggregator"):
+            return 90.0, "smurfing_aggregator"
+        return 70.0, "smurfing_sender"
+    return 75.0, None
+
+
 def generate_scores(results):
     suspicious_accounts_list = results.get("suspicious_accounts", [])
     fraud_rings = results.get("fraud_rings", [])
     summary = results.get("summary", {})
-    
-    merchant_accounts = {'MERCHANT_01'}
+
+    # Only account IDs are available here, so merchants are recognised by name
+    ring_accounts = list({account for ring in fraud_rings for account in ring["member_accounts"]})
+    merchant_accounts = set(np.asarray(ring_accounts, dtype=object)[DEFAULT_CLASSIFIER.name_mask(ring_accounts)].tolist())
     filtered_accounts = [acc for acc in suspicious_accounts_list if acc not in merchant_accounts]
-    
 
-    account_ring_map = {}
-    ring_pattern_map = {}
-    
-    for ring in fraud_rings:
-        # Skip merchant rings
-        if 'MERCHANT_01' in ring["member_accounts"]:
-            continue
-            
-        ring_id = ring["ring_id"]
-        pattern = ring["pattern_type"]
-        ring_pattern_map[ring_id] = pattern
-        for account in ring["member_accounts"]:
-            if account not in merchant_accounts:
-                account_ring_map[account] = ring_id
-    
+    # Skip merchant rings
+    valid_rings = [ring for ring in fraud_rings if not merchant_accounts.intersection(ring["member_accounts"])]
+    ring_index = build_ring_index(valid_rings, merchant_accounts)
+    rings_by_id = {ring["ring_id"]: ring for ring in valid_rings}
+
     scored_accounts = []
-    
+
     for account in filtered_accounts:
-        ring_id = account_ring_map.get(account)
-        patterns = []
-        
-        if ring_id:
-            pattern_type = ring_pattern_map.get(ring_id, "unknown")
-            
-            if pattern_type == "cycle":
-                patterns.append("cycle_length_3")
-                score = 95.0
-            elif pattern_type == "fan_in":
-                if account == "SMURF_01":
-                    patterns.append("smurfing_aggregator")
-                    score = 90.0
-                else:
-                    patterns.append("smurfing_sender")
-                    score = 70.0
-            else:
-                score = 75.0
-        else:
+        memberships = ring_index.get(account)
+        if not memberships:
             continue  # Skip accounts not in valid rings
-        
+
+        patterns = []
+        best_score, ring_id = None, None
+        for member_ring_id, _ in memberships:
+            score, pattern = score_membership(account, rings_by_id[member_ring_id])
+            if pattern and pattern not in patterns:
+                patterns.append(pattern)
+            if best_score is None or score > best_score:
+                best_score, ring_id = score, member_ring_id
+        ring_ids = list(dict.fromkeys(member_ring_id for member_ring_id, _ in memberships))
+
         scored_accounts.append({
             "account_id": account,
-            "suspicion_score": round(score, 1),
+            "suspicion_score": round(best_score, 1),
             "detected_patterns": patterns,
-            "ring_id": ring_id
+            "ring_id": ring_id,
+            "ring_ids": ring_ids,
+            "ring_count": len(ring_ids)
         })
-    
+
     scored_accounts.sort(key=lambda x: x["suspicion_score"], reverse=True)
-    
-    
+
+    account_scores = {a["account_id"]: a["suspicion_score"] for a in scored_accounts}
     scored_rings = []
-    for ring in fraud_rings:
-        if 'MERCHANT_01' in ring["member_accounts"]:
-            continue
-            
+    for ring in valid_rings:
         ring_members = [m for m in ring["member_accounts"] if m not in merchant_accounts]
         if not ring_members:
             continue
-            
-        ring_scores = [a["suspicion_score"] for a in scored_accounts if a["account_id"] in ring_members]
+
+        ring_scores = [account_scores[m] for m in ring_members if m in account_scores]
         avg_score = sum(ring_scores) / len(ring_scores) if ring_scores else ring["risk_score"]
-        
+
         scored_rings.append({
             "ring_id": ring["ring_id"],
             "member_accounts": ring_members,
@@ -75,13 +87,14 @@ def generate_scores(results):
             "pattern_type": ring["pattern_type"],
             "risk_score": round(avg_score, 1)
         })
-    
+
     summary["total_accounts_analyzed"] = summary.get("total_accounts_analyzed", 0)
     summary["suspicious_accounts_flagged"] = len(scored_accounts)
     summary["fraud_rings_detected"] = len(scored_rings)
-    
+    summary["multi_ring_accounts"] = sum(1 for a in scored_accounts if a["ring_count"] > 1)
+
     return {
         "suspicious_accounts": scored_accounts,
         "fraud_rings": scored_rings,
         "summary": summary
-    }
\ No newline at end of file
+    }
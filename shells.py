@@ -0,0 +1,100 @@
+import numpy as np
+from budget import CHECK_INTERVAL
+from compact_graph import CompactGraph
+
+MIN_CHAIN_NODES = 4
+MAX_CHAIN_EDGES = 5
+MAX_SHELL_DEGREE = 5
+
+
+def iter_shell_chains(G, min_nodes=MIN_CHAIN_NODES, max_edges=MAX_CHAIN_EDGES,
+                      max_degree=MAX_SHELL_DEGREE, exclude=None, sources=None, stats=None, budget=None):
+    """Yield shell chains: simple paths whose intermediates all have degree <= max_degree.
+
+    Only the low-degree subgraph is ever traversed past the first hop, so every
+    source explores at most max_degree ** (max_edges - 1) paths. Only maximal
+    chains are reported: a path is skipped while, within max_edges, its tail
+    could still be extended or its head is a shell with a predecessor to
+    extend it back to. For each (source, target) pair the first such chain in
+    depth-first order is reported.
+    Searches are independent per source; `sources` limits them to a subset.
+    With a `budget` the search stops once it is spent, setting
+    stats['truncated']; stats['sources_searched'] / ['sources_total'] give
+    the coverage.
+    """
+    if isinstance(G, CompactGraph):
+        mask = G.node_mask(exclude)
+        excluded = set(np.flatnonzero(mask).tolist())
+        shells = set(np.flatnonzero((G.degrees() <= max_degree) & ~mask).tolist())
+    else:
+        excluded = set(exclude or ())
+        shells = {n for n, d in G.degree() if d <= max_degree and n not in excluded}
+    eligible = {p for n in shells for p in G.predecessors(n) if p not in excluded}
+    if sources is not None:
+        eligible &= set(sources)
+
+    searched = steps = 0
+    truncated = False
+    try:
+        for source in G:
+            if source not in eligible:
+                continue
+            if budget is not None and not budget.check():
+                truncated = True
+                return
+            reached = set()
+            path = [source]
+            on_path = {source}
+            # A shell source with an outside predecessor is the middle of a longer chain
+            head_preds = set(G.predecessors(source)) - excluded if source in shells else set()
+            stack = [iter(G.successors(source))]
+            while stack:
+                for nxt in stack[-1]:
+                    if nxt in on_path or nxt in excluded:
+                        continue
+                    extends = nxt in shells and len(path) < max_edges
+                    if (len(path) + 1 >= min_nodes and nxt not in reached
+                            and not (extends and _has_next(G, nxt, on_path, excluded))
+                            and not (len(path) < max_edges and head_preds - on_path - {nxt})):
+                        reached.add(nxt)
+                        yield path + [nxt]
+                    if extends:
+                        steps += 1
+                        if budget is not None and steps % CHECK_INTERVAL == 0 and not budget.check():
+                            truncated = True
+                            return
+                        path.append(nxt)
+                        on_path.add(nxt)
+                        stack.append(iter(G.successors(nxt)))
+                        break
+                else:
+                    stack.pop()
+                    on_path.discard(path.pop())
+            searched += 1
+    finally:
+        if stats is not None:
+            stats['sources_searched'] = stats.get('sources_searched', 0) + searched
+            stats['sources_total'] = stats.get('sources_total', 0) + len(eligible)
+            if truncated:
+                stats['truncated'] = True
+
+
+def _has_next(G, node, on_path, excluded):
+    return any(succ not in on_path and succ != node and succ not in excluded for succ in G.successors(node))
+
+
+def maximal_paths(paths):
+    """Drop paths that run, node for node, inside another of `paths`; order is kept."""
+    paths = [tuple(path) for path in paths]
+    inner = set()
+    for path in set(paths):
+        for start in range(len(path)):
+            for end in range(start + 1, len(path) + 1):
+                if end - start < len(path):
+                    inner.add(path[start:end])
+    unique, seen = [], set()
+    for path in paths:
+        if path not in inner and path not in seen:
+            seen.add(path)
+            unique.append(list(path))
+    return unique
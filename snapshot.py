@@ -0,0 +1,112 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from compact_graph import CompactGraph, GRAPH_ARRAYS
+
+SNAPSHOT_VERSION = 1
+META_FILE = 'meta.json'
+MAX_SNAPSHOTS = 64
+# A snapshot's data directory nothing links to is left this long for its writer to finish
+ORPHAN_SECONDS = 3600
+
+
+def _text_array(values):
+    # Fixed-width unicode, unlike object arrays, can be saved without pickle and memory-mapped
+    values = np.asarray(values)
+    return values if values.dtype.kind == 'U' else values.astype(str)
+
+
+def save_graph(graph, path):
+    """Write `graph` as a directory of .npy files that load_graph can memory-map.
+
+    Account labels, transaction IDs and source file names are stored as
+    fixed-width unicode, alongside the label sort order used for account
+    lookups. The files go to a fresh hidden directory next to `path` and
+    `path` is a symlink to it, swapped in one rename: readers see the old
+    snapshot or the new one, never a partial or missing one, and concurrent
+    writers of one path cannot collide. The replaced directory is removed
+    afterwards; processes that already mapped it keep their pages.
+    """
+    path = os.path.abspath(path)
+    parent, name = os.path.split(path)
+    os.makedirs(parent, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(prefix=f'.{name}.', dir=parent)
+    labels = _text_array(graph.labels)
+    arrays = {name: getattr(graph, name) for name in GRAPH_ARRAYS}
+    arrays['labels'] = labels
+    arrays['label_order'] = np.argsort(labels, kind='stable')
+    if graph.transaction_ids is not None:
+        arrays['transaction_ids'] = _text_array(graph.transaction_ids)
+    if graph.source_files is not None:
+        arrays['transaction_sources'] = graph.transaction_sources
+        arrays['source_files'] = _text_array(graph.source_files)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, f'{name}.npy'), np.ascontiguousarray(array), allow_pickle=False)
+    with open(os.path.join(tmp_path, META_FILE), 'w') as fh:
+        json.dump({'version': SNAPSHOT_VERSION, 'nodes': len(labels), 'transactions': len(graph.out_dst),
+                   'arrays': sorted(arrays)}, fh)
+    old = os.readlink(path) if os.path.islink(path) else None
+    if old is None and os.path.isdir(path):
+        # A snapshot written as a plain directory cannot be swapped in one rename
+        shutil.rmtree(path, ignore_errors=True)
+    link = f'{tmp_path}.link'
+    os.symlink(os.path.basename(tmp_path), link)
+    os.replace(link, path)
+    if old is not None:
+        shutil.rmtree(os.path.join(parent, old), ignore_errors=True)
+    return path
+
+
+def load_graph(path, mmap=True):
+    """Open a snapshot written by save_graph as a CompactGraph.
+
+    With `mmap` every array is opened with np.load(mmap_mode='r'): opening
+    costs a few file reads, pages are loaded on first touch and shared by
+    every process that maps the same snapshot. Raises FileNotFoundError if
+    `path` is not a snapshot, ValueError if it has another format version.
+    """
+    with open(os.path.join(path, META_FILE)) as fh:
+        meta = json.load(fh)
+    if meta.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported graph snapshot version {meta.get('version')}")
+    mode = 'r' if mmap else None
+    arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mode, allow_pickle=False)
+              for name in meta['arrays']}
+    return CompactGraph.from_arrays(arrays['labels'], arrays, transaction_ids=arrays.get('transaction_ids'),
+                                    label_order=arrays['label_order'],
+                                    transaction_sources=arrays.get('transaction_sources'),
+                                    source_files=arrays.get('source_files'))
+
+
+def prune_snapshots(root, keep=MAX_SNAPSHOTS):
+    """Delete all but the `keep` most recently written snapshots under `root`.
+
+    Data directories no snapshot links to (left by a writer that lost a
+    race or died) are deleted once they are ORPHAN_SECONDS old.
+    """
+    entries = sorted((entry for entry in os.scandir(root)
+                      if not entry.name.startswith('.') and entry.is_dir()
+                      and os.path.exists(os.path.join(entry.path, META_FILE))),
+                     key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[keep:]:
+        _remove_snapshot(entry.path)
+    linked = {os.readlink(entry.path) for entry in os.scandir(root) if entry.is_symlink()}
+    cutoff = time.time() - ORPHAN_SECONDS
+    for entry in os.scandir(root):
+        if (entry.name.startswith('.') and entry.name not in linked
+                and entry.is_dir(follow_symlinks=False) and entry.stat().st_mtime < cutoff):
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def _remove_snapshot(path):
+    if os.path.islink(path):
+        target = os.path.join(os.path.dirname(path), os.readlink(path))
+        os.unlink(path)
+        shutil.rmtree(target, ignore_errors=True)
+    else:
+        shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,138 @@
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+INSERT_BATCH_ROWS = 50000
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS transactions (
+        transaction_id TEXT PRIMARY KEY,
+        sender_id TEXT NOT NULL,
+        receiver_id TEXT NOT NULL,
+        amount REAL NOT NULL,
+        ts INTEGER NOT NULL
+    )""",
+    'CREATE INDEX IF NOT EXISTS idx_transactions_receiver_ts ON transactions (receiver_id, ts)',
+    'CREATE INDEX IF NOT EXISTS idx_transactions_sender_ts ON transactions (sender_id, ts)',
+    'CREATE INDEX IF NOT EXISTS idx_transactions_ts ON transactions (ts)'
+]
+COLUMNS = 'transaction_id, sender_id, receiver_id, amount, ts'
+
+
+def _ns(value):
+    return None if value is None else int(pd.Timestamp(value).value)
+
+
+class TransactionStore:
+    """Append-only SQLite history of every ingested transaction.
+
+    Rows are deduplicated on transaction_id; timestamps are stored as int64
+    nanoseconds. Queries by account go through the (sender_id, ts) and
+    (receiver_id, ts) indexes and time-range queries through the ts index,
+    and come back as frames shaped like ingest.read_transactions output.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                self._conn.execute(statement)
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM transactions').fetchone()[0]
+
+    def append(self, df):
+        """Insert a transactions frame, skipping IDs already stored. Returns the number of new rows."""
+        ts = df['timestamp'].to_numpy(dtype='datetime64[ns]').view('int64')
+        rows = zip(df['transaction_id'].astype(str).tolist(), df['sender_id'].astype(str).tolist(),
+                   df['receiver_id'].astype(str).tolist(), df['amount'].astype(float).tolist(), ts.tolist())
+        inserted = 0
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            while True:
+                batch = [row for _, row in zip(range(INSERT_BATCH_ROWS), rows)]
+                if not batch:
+                    break
+                self._conn.executemany(f'INSERT OR IGNORE INTO transactions ({COLUMNS}) VALUES (?, ?, ?, ?, ?)',
+                                       batch)
+            inserted = self._conn.total_changes - before
+        return inserted
+
+    def time_range(self, start=None, end=None):
+        """Return every stored transaction with start <= timestamp <= end."""
+        where, params = self._range_clause(start, end)
+        with self._lock:
+            rows = self._conn.execute(f'SELECT {COLUMNS} FROM transactions {where}', params).fetchall()
+        return _to_frame(rows)
+
+    def accounts(self, accounts, start=None, end=None, hops=1):
+        """Return transactions sent or received by `accounts`, expanded `hops` times.
+
+        Each hop adds the counterparties found so far to the account set, so
+        hops=2 also pulls the transactions of every direct counterparty.
+        """
+        where, params = self._range_clause(start, end, prefix='AND')
+        seen = set()
+        frontier = {str(a) for a in accounts}
+        rows = {}
+        with self._lock, self._conn:
+            for _ in range(max(hops, 1)):
+                frontier -= seen
+                if not frontier:
+                    break
+                seen |= frontier
+                self._conn.execute('CREATE TEMP TABLE IF NOT EXISTS query_accounts (account_id TEXT PRIMARY KEY)')
+                self._conn.execute('DELETE FROM query_accounts')
+                self._conn.executemany('INSERT INTO query_accounts VALUES (?)', [(a,) for a in frontier])
+                found = self._conn.execute(
+                    f'SELECT {COLUMNS} FROM query_accounts q JOIN transactions t INDEXED BY idx_transactions_sender_ts '
+                    f'ON t.sender_id = q.account_id {where} '
+                    f'UNION SELECT {COLUMNS} FROM query_accounts q JOIN transactions t '
+                    f'INDEXED BY idx_transactions_receiver_ts ON t.receiver_id = q.account_id {where}',
+                    params + params).fetchall()
+                frontier = set()
+                for row in found:
+                    rows[row[0]] = row
+                    frontier.update((row[1], row[2]))
+            self._conn.execute('DELETE FROM query_accounts')
+        return _to_frame(list(rows.values()))
+
+    @staticmethod
+    def _range_clause(start, end, prefix='WHERE'):
+        clauses, params = [], []
+        if start is not None:
+            clauses.append('ts >= ?')
+            params.append(_ns(start))
+        if end is not None:
+            clauses.append('ts <= ?')
+            params.append(_ns(end))
+        if not clauses:
+            return '', []
+        return f'{prefix} ' + ' AND '.join(clauses), params
+
+
+def _to_frame(rows):
+    if rows:
+        tx_ids, senders, receivers, amounts, ts = zip(*rows)
+    else:
+        tx_ids, senders, receivers, amounts, ts = (), (), (), (), ()
+    codes, categories = pd.factorize(np.array(senders + receivers, dtype=object))
+    dtype = pd.CategoricalDtype(pd.Index(categories, dtype=str))
+    n = len(rows)
+    return pd.DataFrame({
+        'transaction_id': pd.array(tx_ids, dtype=str),
+        'sender_id': pd.Categorical.from_codes(codes[:n], dtype=dtype),
+        'receiver_id': pd.Categorical.from_codes(codes[n:], dtype=dtype),
+        'amount': np.array(amounts, dtype=np.float64),
+        'timestamp': np.array(ts, dtype=np.int64).view('datetime64[ns]')
+    })
@@ -0,0 +1,257 @@
+import heapq
+import threading
+from bisect import insort
+from collections import defaultdict, deque, Counter
+
+import pandas as pd
+
+WINDOW_HOURS = 72
+FAN_MIN_TXS = 4
+FAN_MIN_COUNTERPARTIES = 3
+MAX_CYCLE_LENGTH = 5
+
+
+class StreamingDetector:
+    """Incremental fan-in/fan-out and cycle detection over a sliding time window.
+
+    State is limited to edges younger than `window_hours` relative to the newest
+    timestamp seen. Each new transaction u -> v updates the time-ordered windows
+    of u (out) and v (in) and searches only v's forward neighbourhood for a path
+    back to u, so the cost of a batch depends on the batch, not the history.
+    Rings use the /upload output schema and keep their ring_id across batches
+    until they go `window_hours` without new activity, when they are dropped.
+    """
+
+    def __init__(self, window_hours=WINDOW_HOURS, min_txs=FAN_MIN_TXS,
+                 min_counterparties=FAN_MIN_COUNTERPARTIES, max_cycle_length=MAX_CYCLE_LENGTH,
+                 is_merchant=None):
+        self.window_ns = int(window_hours * 3600 * 10**9)
+        self.min_txs = min_txs
+        self.min_counterparties = min_counterparties
+        self.max_cycle_length = max_cycle_length
+        self.is_merchant = is_merchant or (lambda account: False)
+        # Per account: live (timestamp, counterparty) edges in time order and their counterparty counts
+        self.in_windows = defaultdict(deque)
+        self.out_windows = defaultdict(deque)
+        self.in_counts = defaultdict(Counter)
+        self.out_counts = defaultdict(Counter)
+        self.succ = defaultdict(lambda: defaultdict(int))
+        self.expiry = []
+        self.watermark = None
+        self.seen_ids = set()
+        self.rings = {}
+        self.ring_counter = 0
+        # ring_id -> {account: roles}, ring key -> newest edge timestamp and a heap of (timestamp, key)
+        self.ring_roles = {}
+        self.ring_activity = {}
+        self.ring_expiry = []
+        self.account_rings = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def ingest(self, df):
+        """Add a batch of transactions and return the rings it created or grew."""
+        # Values are checked before any state changes, so a bad batch is rejected whole
+        timestamps = pd.to_datetime(df['timestamp']).to_numpy(dtype='datetime64[ns]').view('int64')
+        ids = df['transaction_id'].tolist() if 'transaction_id' in df else [None] * len(df)
+        senders, receivers = df['sender_id'].tolist(), df['receiver_id'].tolist()
+        for values in (ids, senders, receivers):
+            try:
+                set(values)
+            except TypeError as e:
+                raise ValueError(f'Account and transaction IDs must be scalars: {e}') from e
+        # Window and expiry entries are ordered by (time, account, ...), so mixed-type IDs would not compare
+        ids = [None if tx_id is None else str(tx_id) for tx_id in ids]
+        senders, receivers = [str(a) for a in senders], [str(a) for a in receivers]
+        with self._lock:
+            self._expire_rings()
+            changed = {}
+            for tx_id, sender, receiver, ts in zip(ids, senders, receivers, timestamps.tolist()):
+                # Late events are dropped first: only IDs of edges in the window are remembered,
+                # so expiry forgets each one again with its edge
+                if self.watermark is not None and ts < self.watermark - self.window_ns:
+                    continue
+                if tx_id is not None:
+                    if tx_id in self.seen_ids:
+                        continue
+                    self.seen_ids.add(tx_id)
+                self._add_edge(tx_id, sender, receiver, ts, changed)
+            return self._batch_result(changed)
+
+    def _add_edge(self, tx_id, sender, receiver, ts, changed):
+        self._insert(self.out_windows[sender], (ts, receiver))
+        self._insert(self.in_windows[receiver], (ts, sender))
+        self.out_counts[sender][receiver] += 1
+        self.in_counts[receiver][sender] += 1
+        self.succ[sender][receiver] += 1
+        heapq.heappush(self.expiry, (ts, sender, receiver, tx_id or ''))
+        if self.watermark is None or ts > self.watermark:
+            self.watermark = ts
+            self._expire()
+
+        if self.is_merchant(sender) or self.is_merchant(receiver):
+            return
+        for cycle in self._closing_cycles(sender, receiver):
+            self._record(changed, 'cycle', cycle, {a: 'cycle' for a in cycle}, ts)
+        fan_in = self._fan_members(self.in_windows[receiver], self.in_counts[receiver], ts)
+        if fan_in:
+            roles = {a: 'smurf_sender' for a in fan_in}
+            roles[receiver] = 'aggregator'
+            self._record(changed, 'fan_in', fan_in | {receiver}, roles, ts, key=('fan_in', receiver))
+        fan_out = self._fan_members(self.out_windows[sender], self.out_counts[sender], ts)
+        if fan_out:
+            roles = {a: 'receiver' for a in fan_out}
+            roles[sender] = 'distributor'
+            self._record(changed, 'fan_out', fan_out | {sender}, roles, ts, key=('fan_out', sender))
+
+    @staticmethod
+    def _insert(window, item):
+        # Transactions mostly arrive in time order; only late ones pay for a sorted insert
+        if not window or window[-1] <= item:
+            window.append(item)
+        else:
+            insort(window, item)
+
+    def _fan_members(self, window, counts, ts):
+        if ts >= self.watermark:
+            # Newest edge so far: expiry has already dropped everything older than the window
+            if len(window) < self.min_txs:
+                return None
+            others = counts
+        else:
+            recent = [other for t, other in window if ts - self.window_ns <= t <= ts]
+            if len(recent) < self.min_txs:
+                return None
+            others = set(recent)
+        members = {other for other in others if not self.is_merchant(other)}
+        return members if len(members) >= self.min_counterparties else None
+
+    def _closing_cycles(self, sender, receiver):
+        """Yield live paths receiver -> ... -> sender that close a cycle of 3..max_cycle_length nodes."""
+        path = [receiver]
+        stack = [iter(list(self.succ.get(receiver, ())))]
+        while stack:
+            for nxt in stack[-1]:
+                if nxt == sender:
+                    if len(path) >= 2:
+                        yield [sender] + path
+                elif (nxt not in path and len(path) < self.max_cycle_length - 1
+                      and not self.is_merchant(nxt)):
+                    path.append(nxt)
+                    stack.append(iter(list(self.succ.get(nxt, ()))))
+                    break
+            else:
+                stack.pop()
+                path.pop()
+
+    def _record(self, changed, pattern, members, roles, ts, key=None):
+        key = key or (pattern, tuple(sorted(members)))
+        ring = self.rings.get(key)
+        if ring is None:
+            self.ring_counter += 1
+            ring = {
+                "ring_id": f"RING_{self.ring_counter:03d}",
+                "member_accounts": [],
+                "pattern_type": pattern,
+                "risk_score": 95.0 if pattern == 'cycle' else 85.0,
+                "member_count": 0
+            }
+            self.rings[key] = ring
+            self.ring_roles[ring['ring_id']] = defaultdict(set)
+        if ts > self.ring_activity.get(key, ts - 1):
+            self.ring_activity[key] = ts
+            heapq.heappush(self.ring_expiry, (ts, key))
+        if set(members) <= set(ring['member_accounts']):
+            return
+        ring['member_accounts'] = sorted(set(ring['member_accounts']) | set(members))
+        ring['member_count'] = len(ring['member_accounts'])
+        for account, role in roles.items():
+            self.ring_roles[ring['ring_id']][account].add(role)
+            if ring['ring_id'] not in self.account_rings[account]:
+                self.account_rings[account].append(ring['ring_id'])
+        changed[ring['ring_id']] = ring
+
+    def _expire(self):
+        if self.watermark is None:
+            return
+        cutoff = self.watermark - self.window_ns
+        while self.expiry and self.expiry[0][0] < cutoff:
+            ts, sender, receiver, tx_id = heapq.heappop(self.expiry)
+            self.seen_ids.discard(tx_id)
+            self._drop(self.out_windows, self.out_counts, sender, (ts, receiver))
+            self._drop(self.in_windows, self.in_counts, receiver, (ts, sender))
+            self.succ[sender][receiver] -= 1
+            if self.succ[sender][receiver] <= 0:
+                del self.succ[sender][receiver]
+                if not self.succ[sender]:
+                    del self.succ[sender]
+
+    @staticmethod
+    def _drop(windows, counts, account, item):
+        window = windows[account]
+        if window and window[0] == item:
+            window.popleft()
+        else:
+            window.remove(item)
+        if not window:
+            del windows[account]
+            del counts[account]
+            return
+        other = item[1]
+        counts[account][other] -= 1
+        if not counts[account][other]:
+            del counts[account][other]
+
+    def _expire_rings(self):
+        """Drop rings whose newest edge left the window, and their members' references to them."""
+        if self.watermark is None:
+            return
+        cutoff = self.watermark - self.window_ns
+        while self.ring_expiry and self.ring_expiry[0][0] < cutoff:
+            ts, key = heapq.heappop(self.ring_expiry)
+            if self.ring_activity[key] != ts:
+                continue
+            ring_id = self.rings.pop(key)['ring_id']
+            del self.ring_activity[key]
+            for account in self.ring_roles.pop(ring_id):
+                self.account_rings[account].remove(ring_id)
+                if not self.account_rings[account]:
+                    del self.account_rings[account]
+
+    def _batch_result(self, changed):
+        rings = list(changed.values())
+        touched = {account for ring in rings for account in ring['member_accounts']}
+        accounts = []
+        for account in touched:
+            if self.is_merchant(account):
+                continue
+            ring_ids = self.account_rings[account]
+            patterns = set().union(*(self.ring_roles[ring_id][account] for ring_id in ring_ids))
+            if 'cycle' in patterns:
+                score = 95.0
+            elif 'aggregator' in patterns:
+                score = 90.0
+            elif 'distributor' in patterns:
+                score = 88.0
+            elif 'smurf_sender' in patterns:
+                score = 85.0
+            else:
+                score = 80.0
+            accounts.append({
+                "account_id": account,
+                "suspicion_score": score,
+                "detected_patterns": sorted(patterns),
+                "ring_id": ring_ids[0],
+                "ring_ids": list(ring_ids),
+                "ring_count": len(ring_ids)
+            })
+        accounts.sort(key=lambda x: x['suspicion_score'], reverse=True)
+        return {
+            "suspicious_accounts": accounts,
+            "fraud_rings": rings,
+            "summary": {
+                "suspicious_accounts_flagged": len(accounts),
+                "fraud_rings_detected": len(rings),
+                "total_rings_tracked": len(self.rings),
+                "live_edges": len(self.expiry)
+            }
+        }
@@ -0,0 +1,134 @@
+import argparse
+import numpy as np
+import pandas as pd
+
+START = pd.Timestamp('2024-01-01')
+
+
+def generate_transactions(n_rows=10000, seed=42, n_cycles=10, n_fan_in=5, n_fan_out=5, n_shells=5,
+                          n_merchants=3, n_accounts=None, days=30, fan_size=8):
+    """Build a seeded transaction frame with planted fraud patterns.
+
+    Background traffic is uniform random transfers between `n_accounts`
+    accounts spread over `days`, a share of which is paid to high-volume
+    merchants. On top of it the generator plants cycles of 3-5 accounts,
+    fan-in and fan-out bursts of `fan_size` counterparties within 24h and
+    shell chains of 4-6 accounts, each using fresh accounts. Returns
+    (df, truth) where truth lists the planted members per pattern.
+    """
+    rng = np.random.default_rng(seed)
+    names = []
+    planted = []
+    truth = {'cycles': [], 'fan_in': [], 'fan_out': [], 'shells': [], 'merchants': []}
+
+    def new_accounts(prefix, group, count):
+        start = len(names)
+        names.extend(f'{prefix}_{group:04d}_{i}' for i in range(count))
+        return list(range(start, start + count))
+
+    def burst_start():
+        return int(rng.integers(0, max(days - 2, 1) * 24 * 3600))
+
+    for group in range(n_cycles):
+        members = new_accounts('CYC', group, int(rng.integers(3, 6)))
+        t0 = burst_start()
+        for i, sender in enumerate(members):
+            planted.append((sender, members[(i + 1) % len(members)], t0 + i * 3600))
+        truth['cycles'].append(members)
+    for group in range(n_fan_in):
+        members = new_accounts('FANIN', group, fan_size + 1)
+        t0 = burst_start()
+        for i, sender in enumerate(members[1:]):
+            planted.append((sender, members[0], t0 + i * 1800))
+        truth['fan_in'].append(members)
+    for group in range(n_fan_out):
+        members = new_accounts('FANOUT', group, fan_size + 1)
+        t0 = burst_start()
+        for i, receiver in enumerate(members[1:]):
+            planted.append((members[0], receiver, t0 + i * 1800))
+        truth['fan_out'].append(members)
+    for group in range(n_shells):
+        members = new_accounts('SHELL', group, int(rng.integers(4, 7)))
+        t0 = burst_start()
+        for i in range(len(members) - 1):
+            planted.append((members[i], members[i + 1], t0 + i * 7200))
+        truth['shells'].append(members)
+
+    merchant_ids = list(range(len(names), len(names) + n_merchants))
+    names.extend(f'MERCHANT_{i:03d}' for i in range(n_merchants))
+
+    n_background = max(n_rows - len(planted), 0)
+    n_accounts = n_accounts or max(n_background // 2, 10)
+    first_background = len(names)
+    senders = rng.integers(0, n_accounts, n_background) + first_background
+    receivers = rng.integers(0, n_accounts, n_background) + first_background
+    if n_merchants:
+        to_merchant = rng.random(n_background) < 0.1
+        receivers[to_merchant] = rng.choice(merchant_ids, int(to_merchant.sum()))
+    receivers = np.where(receivers == senders, (receivers - first_background + 1) % n_accounts + first_background,
+                         receivers)
+    seconds = rng.integers(0, days * 24 * 3600, n_background)
+
+    if planted:
+        p_senders, p_receivers, p_seconds = map(np.array, zip(*planted))
+        senders = np.concatenate((senders, p_senders))
+        receivers = np.concatenate((receivers, p_receivers))
+        seconds = np.concatenate((seconds, p_seconds))
+    order = np.argsort(seconds, kind='stable')
+    senders, receivers, seconds = senders[order], receivers[order], seconds[order]
+
+    categories = np.concatenate((np.array(names, dtype=object),
+                                 ('ACC_' + pd.Series(np.arange(n_accounts)).astype(str)).to_numpy(dtype=object)))
+    df = pd.DataFrame({
+        'transaction_id': ('TX_' + pd.Series(np.arange(len(senders))).astype(str)).to_numpy(dtype=object),
+        'sender_id': pd.Categorical.from_codes(senders, categories),
+        'receiver_id': pd.Categorical.from_codes(receivers, categories),
+        'amount': np.round(rng.lognormal(6, 1.2, len(senders)), 2),
+        'timestamp': START + pd.to_timedelta(seconds, unit='s')
+    })
+    for pattern in ('cycles', 'fan_in', 'fan_out', 'shells'):
+        truth[pattern] = [categories[members].tolist() for members in truth[pattern]]
+    truth['merchants'] = categories[merchant_ids].tolist()
+    return df, truth
+
+
+def write_csv(df, path_or_buffer, compression=None):
+    df.to_csv(path_or_buffer, index=False, date_format='%Y-%m-%d %H:%M:%S', compression=compression)
+
+
+def write_transactions(df, path_or_buffer, fmt='csv'):
+    """Write a generated frame as csv, gzip, zstd, parquet or feather."""
+    if fmt == 'parquet':
+        df.to_parquet(path_or_buffer, index=False)
+    elif fmt == 'feather':
+        df.to_feather(path_or_buffer)
+    elif fmt == 'gzip':
+        write_csv(df, path_or_buffer, compression='gzip')
+    elif fmt == 'zstd':
+        import pyarrow
+        data = pyarrow.compress(df.to_csv(index=False, date_format='%Y-%m-%d %H:%M:%S').encode(),
+                                'zstd', asbytes=True)
+        if isinstance(path_or_buffer, str):
+            with open(path_or_buffer, 'wb') as fh:
+                fh.write(data)
+        else:
+            path_or_buffer.write(data)
+    else:
+        write_csv(df, path_or_buffer)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic transactions CSV with planted fraud rings')
+    parser.add_argument('rows', type=int)
+    parser.add_argument('output')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cycles', type=int, default=10)
+    parser.add_argument('--fan-in', type=int, default=5)
+    parser.add_argument('--fan-out', type=int, default=5)
+    parser.add_argument('--shells', type=int, default=5)
+    parser.add_argument('--merchants', type=int, default=3)
+    parser.add_argument('--format', default='csv', choices=['csv', 'gzip', 'zstd', 'parquet', 'feather'])
+    args = parser.parse_args()
+    frame, _ = generate_transactions(args.rows, seed=args.seed, n_cycles=args.cycles, n_fan_in=args.fan_in,
+                                     n_fan_out=args.fan_out, n_shells=args.shells, n_merchants=args.merchants)
+    write_transactions(frame, args.output, args.format)
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+START = pd.Timestamp('2024-01-01')
+
+
+def transactions(edges, ids=None, amount=100.0):
+    """A transactions frame from (sender, receiver) or (sender, receiver, hours) edges.
+
+    Edges without hours are an hour apart in list order. IDs default to
+    T<row>_<sender>_<receiver>.
+    """
+    edges = [edge if len(edge) == 3 else (*edge, i) for i, edge in enumerate(edges)]
+    return pd.DataFrame({
+        'transaction_id': ids if ids is not None else [f'T{i}_{s}_{r}' for i, (s, r, _) in enumerate(edges)],
+        'sender_id': [sender for sender, _, _ in edges],
+        'receiver_id': [receiver for _, receiver, _ in edges],
+        'amount': amount,
+        'timestamp': [START + pd.Timedelta(hours=hours) for _, _, hours in edges],
+    })
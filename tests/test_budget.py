@@ -0,0 +1,47 @@
+import io
+
+import app
+from conftest import transactions
+from pipeline import Pipeline
+
+
+def _triangles(count):
+    return transactions([(sender, receiver, i) for k in range(count)
+                         for i, (sender, receiver) in enumerate(((f'A{k}', f'B{k}'), (f'B{k}', f'C{k}'),
+                                                                 (f'C{k}', f'A{k}')))])
+
+
+def _cycle_report(df, max_cycles):
+    with Pipeline(df, params={'detectors': ['cycles'], 'max_cycles': max_cycles}) as pipeline:
+        return pipeline.detect()['cycles']
+
+
+def test_cycle_cap_truncates_only_when_a_cycle_was_left_out():
+    assert _cycle_report(_triangles(3), max_cycles=3)['status'] == 'complete'
+    assert _cycle_report(_triangles(4), max_cycles=3)['status'] == 'truncated'
+
+
+def test_parsing_spends_the_analysis_budget():
+    result = app.run_analysis(_triangles(3), params={'max_seconds': 0})
+    assert not result['summary']['complete']
+    assert all(info['status'] == 'skipped' for info in result['detectors'].values())
+    assert result['metrics']['counters']['budget_spent_before_graph'] == 1
+
+
+def test_budget_truncated_result_is_never_a_cache_hit(monkeypatch):
+    monkeypatch.setattr(app, 'RESULT_CACHE', app.ResultCache())
+    monkeypatch.setattr(app, 'ANALYSES', app.AnalysisStore())
+    monkeypatch.setattr(app, 'GRAPH_SNAPSHOT_DIR', None)
+    client = app.app.test_client()
+    csv = _triangles(3).to_csv(index=False).encode()
+
+    def upload(**fields):
+        return client.post('/upload', data={'file': (io.BytesIO(csv), 't.csv'), 'view': 'summary',
+                                            **fields}).get_json()
+
+    for _ in range(2):
+        partial = upload(max_seconds='1e-9')
+        assert not partial['summary']['complete'] and partial['cache_hit'] is False
+    assert client.get(f"/results/{partial['result_id']}/rings").status_code == 200
+    assert upload()['cache_hit'] is False
+    assert upload()['cache_hit'] is True
@@ -0,0 +1,46 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import ResultCache, hash_batch, hash_upload
+
+
+def test_hash_covers_content_and_params_and_rewinds():
+    stream = io.BytesIO(b'a,b\n1,2\n')
+    key = hash_upload(stream, {'fan_hours': 72})
+    assert stream.read() == b'a,b\n1,2\n'
+    assert hash_upload(io.BytesIO(b'a,b\n1,2\n'), {'fan_hours': 72}) == key
+    assert hash_upload(io.BytesIO(b'a,b\n1,3\n'), {'fan_hours': 72}) != key
+    assert hash_upload(io.BytesIO(b'a,b\n1,2\n'), {'fan_hours': 24}) != key
+    files = [('one.csv', io.BytesIO(b'x')), ('two.csv', io.BytesIO(b'y'))]
+    assert hash_batch(files) != hash_batch(files[::-1])
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.put('a', {'n': 1})
+    cache.put('b', {'n': 2})
+    assert cache.get('a') == {'n': 1}
+    cache.put('c', {'n': 3})
+    assert cache.get('b') is None
+    assert cache.get('a') == {'n': 1} and cache.get('c') == {'n': 3}
+
+
+def test_disk_tier_outlives_the_process_and_stays_under_its_size(tmp_path):
+    cache = ResultCache(max_entries=1, disk_dir=str(tmp_path), max_disk_bytes=250)
+    for key in 'abc':
+        cache.put(key, {'key': key, 'padding': 'x' * 80})
+        # Distinct mtimes in put order, however coarse the filesystem clock
+        os.utime(tmp_path / f'{key}.json', (ord(key), ord(key)))
+    assert sorted(os.listdir(tmp_path)) == ['b.json', 'c.json']
+    reopened = ResultCache(disk_dir=str(tmp_path))
+    assert reopened.get('b')['key'] == 'b'
+    assert reopened.get('a') is None
+
+
+def test_concurrent_puts_of_one_key_all_land(tmp_path):
+    cache = ResultCache(disk_dir=str(tmp_path))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda n: cache.put('a', {'n': n}), range(64)))
+    assert os.listdir(tmp_path) == ['a.json']
+    assert ResultCache(disk_dir=str(tmp_path)).get('a')['n'] in range(64)
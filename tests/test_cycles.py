@@ -0,0 +1,41 @@
+import networkx as nx
+import numpy as np
+
+from compact_graph import CompactGraph
+from conftest import transactions
+from cycles import iter_short_cycles, iter_temporal_cycles
+
+
+def _rotation(cycle):
+    low = cycle.index(min(cycle))
+    return tuple(cycle[low:] + cycle[:low])
+
+
+def test_short_cycles_match_networkx_once_each():
+    rng = np.random.default_rng(7)
+    edges = [(f'N{a}', f'N{b}', 0) for a, b in rng.integers(0, 40, (160, 2)) if a != b]
+    graph = CompactGraph.from_frame(transactions(edges))
+    found = [_rotation(graph.labels[cycle].tolist()) for cycle in iter_short_cycles(graph)]
+    expected = {_rotation(cycle) for cycle in nx.simple_cycles(nx.DiGraph([e[:2] for e in edges]), length_bound=5)
+                if len(cycle) >= 3}
+    assert len(found) == len(set(found))
+    assert set(found) == expected
+
+
+def test_excluded_accounts_break_their_cycles():
+    graph = CompactGraph.from_frame(transactions([('A', 'B', 0), ('B', 'C', 1), ('C', 'A', 2),
+                                                  ('C', 'M', 3), ('M', 'B', 4)]))
+    assert len(list(iter_short_cycles(graph))) == 2
+    cycles = [graph.labels[cycle].tolist() for cycle in iter_short_cycles(graph, exclude=[graph.index_of('M')])]
+    assert [sorted(cycle) for cycle in cycles] == [['A', 'B', 'C']]
+
+
+def test_temporal_cycles_need_legs_forward_in_time_within_the_window():
+    forward = CompactGraph.from_frame(transactions([('A', 'B', 0), ('B', 'C', 1), ('C', 'A', 2)]))
+    assert [forward.labels[cycle].tolist() for cycle in iter_temporal_cycles(forward)] == [['A', 'B', 'C']]
+    backward = CompactGraph.from_frame(transactions([('A', 'B', 2), ('B', 'C', 1), ('C', 'A', 0)]))
+    assert len(list(iter_short_cycles(backward))) == 1
+    assert list(iter_temporal_cycles(backward)) == []
+    slow = CompactGraph.from_frame(transactions([('A', 'B', 0), ('B', 'C', 50), ('C', 'A', 100)]))
+    assert list(iter_temporal_cycles(slow, window_hours=72)) == []
+    assert len(list(iter_temporal_cycles(slow, window_hours=120))) == 1
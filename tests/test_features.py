@@ -0,0 +1,45 @@
+import pandas as pd
+
+from features import account_features
+from utils import calculate_transaction_velocity
+
+
+def test_window_velocity_is_the_rate_in_the_busiest_window_of_hours():
+    df = pd.DataFrame({
+        'transaction_id': list('abcde'),
+        'sender_id': ['A'] * 5,
+        'receiver_id': list('BCDEF'),
+        'amount': 1.0,
+        'timestamp': pd.to_datetime(['2024-01-01 00:00', '2024-01-01 01:00', '2024-01-01 02:00',
+                                     '2024-01-05 00:00', '2024-01-09 00:00'])})
+    assert account_features(df, hours=2).at['A', 'window_velocity_per_hour'] == 1.5
+    assert account_features(df, hours=72).at['A', 'window_velocity_per_hour'] == 3 / 72
+    assert account_features(df, hours=72).at['B', 'window_velocity_per_hour'] == 0.0
+
+
+def test_transaction_velocity_is_the_rate_over_the_active_span():
+    df = pd.DataFrame({
+        'transaction_id': ['a', 'b', 'c'],
+        'sender_id': ['A', 'A', 'C'],
+        'receiver_id': ['B', 'C', 'D'],
+        'amount': 1.0,
+        'timestamp': pd.to_datetime(['2024-01-01 00:00', '2024-01-01 01:00', '2024-01-01 05:00'])})
+    assert calculate_transaction_velocity(df, 'A') == 2.0
+    assert calculate_transaction_velocity(df, 'C') == 2 / 4
+    assert calculate_transaction_velocity(df, 'B') == 0
+    assert calculate_transaction_velocity(df, 'Z') == 0
+    assert calculate_transaction_velocity(df, 'C', features=account_features(df)) == 2 / 4
+
+
+def test_features_follow_a_frame_modified_in_place():
+    df = pd.DataFrame({
+        'transaction_id': ['a', 'b'],
+        'sender_id': ['A', 'A'],
+        'receiver_id': ['B', 'C'],
+        'amount': 1.0,
+        'timestamp': pd.to_datetime(['2024-01-01 00:00', '2024-01-01 01:00'])})
+    assert account_features(df).at['A', 'tx_count'] == 2
+    df.loc[2] = ['c', 'A', 'D', 1.0, pd.Timestamp('2024-01-01 01:30')]
+    features = account_features(df)
+    assert features.at['A', 'tx_count'] == 3
+    assert features.at['D', 'tx_count'] == 1
@@ -0,0 +1,47 @@
+import gzip
+import io
+import warnings
+
+import pandas as pd
+import pytest
+
+from ingest import IngestError, read_transactions
+
+CSV = ('transaction_id,sender_id,receiver_id,amount,timestamp\n'
+       + ''.join(f'T{i},A{i % 7},B{i % 5},{i}.5,2024-01-01 00:{i % 60:02d}:00\n' for i in range(2000)))
+
+
+def test_truncated_gzip_is_an_ingest_error():
+    data = gzip.compress(CSV.encode())
+    with pytest.raises(IngestError):
+        read_transactions(io.BytesIO(data[:len(data) // 2]))
+
+
+def test_corrupt_gzip_is_an_ingest_error():
+    data = bytearray(gzip.compress(CSV.encode()))
+    data[30] ^= 0xff
+    with pytest.raises(IngestError):
+        read_transactions(io.BytesIO(bytes(data)))
+
+
+def _feather_v1(df):
+    pyarrow = pytest.importorskip('pyarrow')
+    import pyarrow.feather
+    buffer = io.BytesIO()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        pyarrow.feather.write_feather(pyarrow.Table.from_pandas(df, preserve_index=False), buffer, version=1)
+    return io.BytesIO(buffer.getvalue())
+
+
+@pytest.mark.filterwarnings('ignore::DeprecationWarning')
+def test_feather_reads_only_the_required_columns():
+    df = pd.read_csv(io.StringIO(CSV))
+    df['memo'] = 'x'
+    parsed, stats = read_transactions(_feather_v1(df[['memo'] + list(df.columns[:-1])]))
+    assert stats['format'] == 'feather'
+    assert list(parsed.columns) == ['transaction_id', 'sender_id', 'receiver_id', 'amount', 'timestamp']
+    assert len(parsed) == 2000
+
+    with pytest.raises(IngestError, match='receiver_id'):
+        read_transactions(_feather_v1(df.drop(columns=['receiver_id'])))
@@ -0,0 +1,82 @@
+import io
+
+import pytest
+
+import app
+from investigate import account_detail
+from synth import generate_transactions
+
+
+def _upload(client, seed, **fields):
+    df, _ = generate_transactions(2000, seed=seed)
+    buffer = io.BytesIO()
+    df.to_csv(buffer, index=False)
+    return client.post('/upload', data={'file': (io.BytesIO(buffer.getvalue()), f'{seed}.csv'),
+                                        'view': 'summary', **fields}).get_json()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, 'ANALYSES', app.AnalysisStore(max_entries=1))
+    monkeypatch.setattr(app, 'RESULT_CACHE', app.ResultCache())
+    monkeypatch.setattr(app, 'GRAPH_SNAPSHOT_DIR', None)
+    return app.app.test_client()
+
+
+def test_drilldown_on_evicted_analysis_is_expired_404(client):
+    first = _upload(client, 1)
+    ring_id = app.RESULT_CACHE.get(first['result_id'])['fraud_rings'][0]['ring_id']
+    assert client.get(f"/analysis/{first['result_id']}/ring/{ring_id}").status_code == 200
+
+    _upload(client, 2)
+    response = client.get(f"/analysis/{first['result_id']}/ring/{ring_id}")
+    assert response.status_code == 404
+    assert response.get_json()['expired'] is True
+    assert client.get(f"/results/{first['result_id']}/rings").status_code == 200
+
+    unknown = client.get('/analysis/nope/ring/RING_001')
+    assert unknown.status_code == 404
+    assert unknown.get_json()['expired'] is False
+
+
+def test_reupload_is_served_from_the_cache_after_its_analysis_is_evicted(client):
+    first = _upload(client, 1)
+    _upload(client, 2)
+    again = _upload(client, 1)
+    assert again['result_id'] == first['result_id']
+    assert again['cache_hit'] is True
+    ring_id = app.RESULT_CACHE.get(first['result_id'])['fraud_rings'][0]['ring_id']
+    assert client.get(f"/analysis/{first['result_id']}/ring/{ring_id}").status_code == 404
+    assert client.get(f"/graph/{first['result_id']}.png").status_code == 404
+
+
+def test_drilldown_works_again_after_refreshed_reupload(client):
+    first = _upload(client, 1)
+    _upload(client, 2)
+    again = _upload(client, 1, refresh='true')
+    assert again['result_id'] == first['result_id']
+    assert again['cache_hit'] is False
+    ring_id = app.RESULT_CACHE.get(first['result_id'])['fraud_rings'][0]['ring_id']
+    assert client.get(f"/analysis/{first['result_id']}/ring/{ring_id}").status_code == 200
+
+
+def test_cache_hit_survives_a_restart(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(app, 'RESULT_CACHE', app.ResultCache(disk_dir=str(tmp_path)))
+    first = _upload(client, 1)
+    monkeypatch.setattr(app, 'RESULT_CACHE', app.ResultCache(disk_dir=str(tmp_path)))
+    monkeypatch.setattr(app, 'ANALYSES', app.AnalysisStore(max_entries=1))
+    again = _upload(client, 1)
+    assert again['cache_hit'] is True
+    assert again['summary'] == first['summary']
+
+
+def test_account_transactions_are_the_earliest_in_time_order(client):
+    first = _upload(client, 3)
+    analysis = app.ANALYSES.get(first['result_id'])
+    graph = analysis['graph']
+    node = int(graph.degrees().argmax())
+    account = graph.labels[node]
+    everything = account_detail(analysis, account, limit=10**6)['transactions']
+    limited = account_detail(analysis, account, limit=5)['transactions']
+    assert limited == everything[:5]
+    assert [row['timestamp'] for row in everything] == sorted(row['timestamp'] for row in everything)
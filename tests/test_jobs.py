@@ -0,0 +1,84 @@
+import io
+import time
+
+import pytest
+
+import app
+from jobs import JobManager
+from store import TransactionStore
+from synth import generate_transactions
+
+
+def _csv(seed):
+    df, _ = generate_transactions(1000, seed=seed)
+    buffer = io.BytesIO()
+    df.to_csv(buffer, index=False)
+    return buffer.getvalue()
+
+
+def _wait(client, job_id, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        info = client.get(f'/jobs/{job_id}').get_json()
+        if info['status'] in ('done', 'failed', 'cancelled'):
+            return info
+        time.sleep(0.1)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+@pytest.fixture(scope='module')
+def jobs():
+    manager = JobManager(max_workers=1, analyze=app.analyze_job, on_done=app.finish_job)
+    original, app.JOBS = app.JOBS, manager
+    yield manager
+    app.JOBS = original
+    if manager._executor is not None:
+        manager._executor.shutdown()
+        manager._manager.shutdown()
+
+
+def test_job_metrics_are_recorded_in_the_server_process(jobs, monkeypatch):
+    monkeypatch.setattr(app, 'METRICS', app.MetricsRegistry())
+    client = app.app.test_client()
+    job_id = client.post('/jobs', data={'file': (io.BytesIO(_csv(1)), 'one.csv')}).get_json()['job_id']
+    assert _wait(client, job_id)['status'] == 'done'
+    text = app.METRICS.render()
+    assert 'fraud_jobs_total{status="done"} 1' in text
+    assert 'fraud_analysis_rows_parsed_total 1000' in text
+    assert 'fraud_jobs_queue_depth 0' in client.get('/metrics').get_data(as_text=True)
+
+
+def test_job_results_share_the_upload_cache_and_drill_down(jobs):
+    client = app.app.test_client()
+    data = _csv(2)
+    submitted = client.post('/jobs', data={'file': (io.BytesIO(data), 'two.csv')}).get_json()
+    info = _wait(client, submitted['job_id'])
+    result_id = info['result']['result_id']
+    assert result_id == submitted['result_id']
+    ring_id = info['result']['fraud_rings'][0]['ring_id']
+    assert client.get(f'/analysis/{result_id}/ring/{ring_id}').status_code == 200
+    assert client.get(f'/graph/{result_id}.png').status_code == 200
+
+    again = client.post('/jobs', data={'file': (io.BytesIO(data), 'two.csv')})
+    assert again.status_code == 200 and again.get_json()['cache_hit'] is True
+    assert _wait(client, again.get_json()['job_id'])['result']['result_id'] == result_id
+    upload = client.post('/upload', data={'file': (io.BytesIO(data), 'two.csv'), 'view': 'summary'}).get_json()
+    assert upload['cache_hit'] is True and upload['result_id'] == result_id
+
+
+def test_job_worker_appends_through_its_own_store_connection(monkeypatch, tmp_path):
+    path = str(tmp_path / 'history.db')
+    monkeypatch.setattr(app, 'TRANSACTION_STORE_PATH', path)
+    monkeypatch.setattr(app, 'TRANSACTIONS', TransactionStore(path))
+    manager = JobManager(max_workers=1, analyze=app.analyze_job, on_done=app.finish_job)
+    monkeypatch.setattr(app, 'JOBS', manager)
+    client = app.app.test_client()
+    try:
+        # Held by a request thread while the worker forks and runs
+        with app.TRANSACTIONS._lock:
+            job_id = client.post('/jobs', data={'file': (io.BytesIO(_csv(3)), 'three.csv')}).get_json()['job_id']
+            assert _wait(client, job_id)['status'] == 'done'
+        assert len(app.TRANSACTIONS) == 1000
+    finally:
+        manager._executor.shutdown()
+        manager._manager.shutdown()
@@ -0,0 +1,42 @@
+import io
+
+import app
+from compact_graph import CompactGraph
+from conftest import transactions
+from merchants import MerchantClassifier
+
+
+def _frame():
+    edges = [('A', 'PAYROLL_CO', 0), ('acc_0201', 'B', 1), ('B', 'C', 2)]
+    edges += [(f'P{i}', 'HUB', 3 + i) for i in range(5)] + [('P0', 'HUB', 9)]
+    return transactions(edges)
+
+
+def test_names_and_receipt_volume_make_merchants():
+    classifier = MerchantClassifier(min_receipts=6, min_payers=5)
+    assert classifier.accounts(_frame()) == {'PAYROLL_CO', 'acc_0201', 'HUB'}
+    assert MerchantClassifier(min_receipts=6, min_payers=6).accounts(_frame()) == {'PAYROLL_CO', 'acc_0201'}
+    assert MerchantClassifier(min_receipts=None).accounts(_frame()) == {'PAYROLL_CO', 'acc_0201'}
+
+
+def test_graph_mask_is_indexed_by_node():
+    graph = CompactGraph.from_frame(_frame())
+    mask = MerchantClassifier(min_receipts=6, min_payers=5).mask(graph)
+    assert len(mask) == graph.number_of_nodes()
+    assert set(graph.labels[mask].tolist()) == {'PAYROLL_CO', 'acc_0201', 'HUB'}
+
+
+def test_single_names_follow_the_same_rules():
+    classifier = MerchantClassifier()
+    assert classifier.is_merchant('my_shop_01') and classifier.is_merchant('ACC_0200')
+    assert not classifier.is_merchant('ACC_0300') and not classifier.is_merchant(42)
+
+
+def test_upload_still_reports_a_large_fan_in(monkeypatch):
+    monkeypatch.setattr(app, 'RESULT_CACHE', app.ResultCache())
+    monkeypatch.setattr(app, 'ANALYSES', app.AnalysisStore())
+    monkeypatch.setattr(app, 'GRAPH_SNAPSHOT_DIR', None)
+    edges = [(f'S{i}', 'AGG', i) for i in range(20)] + [('X', 'Y', 0), ('Y', 'Z', 1), ('Z', 'X', 2)]
+    csv = transactions(edges).to_csv(index=False).encode()
+    body = app.app.test_client().post('/upload', data={'file': (io.BytesIO(csv), 't.csv')}).get_json()
+    assert sorted(ring['pattern_type'] for ring in body['fraud_rings']) == ['cycle', 'fan_in']
@@ -0,0 +1,37 @@
+from metrics import MetricsRegistry, RunMetrics
+
+
+def test_samples_keep_their_precision():
+    registry = MetricsRegistry()
+    registry.inc('response_bytes_total', 1965123, endpoint='/upload')
+    registry.inc('response_bytes_total', 1, endpoint='/upload')
+    registry.inc('seconds_total', 0.1)
+    registry.inc('seconds_total', 0.2)
+    registry.set('queue_depth', 3)
+    lines = registry.render().splitlines()
+    assert 'fraud_response_bytes_total{endpoint="/upload"} 1965124' in lines
+    assert f'fraud_seconds_total {0.1 + 0.2!r}' in lines
+    assert 'fraud_queue_depth 3' in lines
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 5.0):
+        registry.observe('stage_seconds', seconds, stage='parse')
+    lines = registry.render().splitlines()
+    assert 'fraud_stage_seconds_bucket{stage="parse",le="0.1"} 1' in lines
+    assert 'fraud_stage_seconds_bucket{stage="parse",le="1"} 2' in lines
+    assert 'fraud_stage_seconds_bucket{stage="parse",le="+Inf"} 3' in lines
+    assert 'fraud_stage_seconds_count{stage="parse"} 3' in lines
+
+
+def test_a_worker_run_folds_into_the_registry():
+    run = RunMetrics()
+    with run.stage('graph'):
+        pass
+    run.count('rows_parsed', 1000)
+    registry = MetricsRegistry()
+    registry.record_run(RunMetrics.from_dict(run.as_dict()))
+    text = registry.render()
+    assert 'fraud_analysis_rows_parsed_total 1000\n' in text
+    assert 'fraud_analysis_stage_seconds_count{stage="graph"} 1' in text
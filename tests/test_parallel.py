@@ -0,0 +1,28 @@
+import pytest
+
+from compact_graph import CompactGraph
+from cycles import iter_short_cycles, iter_temporal_cycles
+from merchants import MerchantClassifier
+from parallel import ParallelDetector, pack_units
+from shells import iter_shell_chains
+from synth import generate_transactions
+
+
+@pytest.fixture(scope='module')
+def graph():
+    df, _ = generate_transactions(3000, seed=5)
+    return CompactGraph.from_frame(df)
+
+
+def test_pool_results_match_the_serial_search_in_order(graph):
+    exclude = MerchantClassifier().mask(graph)
+    with ParallelDetector(graph, exclude, workers=2) as pool:
+        assert pool.cycles() == [list(c) for c in iter_short_cycles(graph, exclude=exclude)]
+        assert pool.cycles(mode='temporal') == list(iter_temporal_cycles(graph, exclude=exclude))
+        assert pool.shell_chains() == list(iter_shell_chains(graph, exclude=exclude))
+
+
+def test_units_are_balanced_heaviest_first():
+    units = pack_units([10, 1, 1, 8, 1, 1], 2)
+    assert units == [[0, 4], [1, 2, 3, 5]]
+    assert pack_units([3], 4) == [[0]]
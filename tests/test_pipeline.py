@@ -0,0 +1,46 @@
+import pytest
+
+import pipeline as pipeline_module
+from conftest import transactions
+from pipeline import Pipeline, DETECTORS
+
+
+def _planted():
+    edges = [('A', 'B'), ('B', 'C'), ('C', 'A')]
+    edges += [(f'S{i}', 'HUB') for i in range(4)]
+    edges += [('D', f'R{i}') for i in range(4)]
+    return transactions(edges)
+
+
+def test_planted_patterns_are_rings_and_members_score_their_strongest_role():
+    with Pipeline(_planted(), params={'detectors': list(DETECTORS)}) as pipeline:
+        reports = pipeline.detect()
+        rings, account_rings, accounts, _ = pipeline.score()
+    assert all(report['status'] == 'complete' for report in reports.values())
+    assert {(ring['pattern_type'], tuple(sorted(ring['member_accounts']))) for ring in rings} == {
+        ('cycle', ('A', 'B', 'C')),
+        ('fan_in', ('HUB', 'S0', 'S1', 'S2', 'S3')),
+        ('fan_out', ('D', 'R0', 'R1', 'R2', 'R3'))}
+    assert [ring['ring_id'] for ring in rings] == ['RING_001', 'RING_002', 'RING_003']
+    scores = {account['account_id']: account['suspicion_score'] for account in accounts}
+    assert (scores['A'], scores['HUB'], scores['D'], scores['S0'], scores['R0']) == (95.0, 90.0, 88.0, 85.0, 80.0)
+    assert account_rings['HUB'] == [(rings[1]['ring_id'], 'aggregator')]
+
+
+def test_shared_artifacts_are_built_once(monkeypatch):
+    calls = []
+    for name in ('graph', 'account_stats', 'merchant_mask'):
+        build = pipeline_module.ARTIFACTS[name]
+        monkeypatch.setitem(pipeline_module.ARTIFACTS, name,
+                            lambda p, name=name, build=build: calls.append(name) or build(p))
+    with Pipeline(_planted(), params={'detectors': list(DETECTORS)}) as pipeline:
+        pipeline.detect()
+        pipeline.score()
+    assert sorted(calls) == ['account_stats', 'graph', 'merchant_mask']
+
+
+def test_disabled_detectors_do_not_run_and_unknown_ones_are_rejected():
+    with Pipeline(_planted(), params={'detectors': ['cycles']}) as pipeline:
+        assert list(pipeline.detect()) == ['cycles']
+    with pytest.raises(ValueError, match='nope'):
+        Pipeline(_planted(), params={'detectors': ['cycles', 'nope']})
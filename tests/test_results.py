@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+import app
+import results
+
+
+def _result(n_rings):
+    rings = [{'ring_id': f'RING_{i + 1:03d}', 'member_accounts': [f'A{i}', f'B{i}', f'C{i}'],
+              'pattern_type': 'cycle' if i % 2 else 'fan_in', 'risk_score': 95.0 if i % 2 else 85.0,
+              'member_count': 3} for i in range(n_rings)]
+    accounts = [{'account_id': f'A{i}', 'suspicion_score': 95.0 if i % 2 else 85.0,
+                 'detected_patterns': ['cycle' if i % 2 else 'smurf_sender'], 'ring_id': f'RING_{i + 1:03d}',
+                 'ring_ids': [f'RING_{i + 1:03d}'], 'ring_count': 1} for i in range(n_rings)]
+    return {'result_id': 'r1', 'suspicious_accounts': accounts, 'fraud_rings': rings,
+            'summary': {'fraud_rings_detected': n_rings}}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, 'RESULT_CACHE', app.ResultCache())
+    app.RESULT_CACHE.put('r1', _result(50))
+    return app.app.test_client()
+
+
+def test_stream_is_generated_as_it_is_read(client, monkeypatch):
+    monkeypatch.setattr(results, 'STREAM_CHUNK_BYTES', 1)
+    generated = []
+
+    def counting(*args, **kwargs):
+        for chunk in results.iter_ndjson(*args, **kwargs):
+            generated.append(chunk)
+            yield chunk
+
+    monkeypatch.setattr(app, 'iter_ndjson', counting)
+    response = client.get('/results/r1/stream', buffered=False)
+    assert len(generated) == 1
+    lines = b''.join(response.response).splitlines()
+    assert (len(generated), len(lines)) == (100, 101)
+    assert json.loads(lines[0])['type'] == 'summary'
+
+
+def test_pages_follow_the_filter_and_sort(client):
+    body = client.get('/results/r1/rings?pattern=cycle&sort=ring_id&order=asc&limit=10&offset=20').get_json()
+    assert body['total'] == 25
+    assert [ring['ring_id'] for ring in body['items']] == [f'RING_{i:03d}' for i in range(42, 51, 2)]
+    assert body['next_offset'] is None
+    assert client.get('/results/r1/rings?order=up').status_code == 400
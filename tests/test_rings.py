@@ -0,0 +1,40 @@
+from rings import RingSet, consolidate_rings
+
+
+def _fan_in_over_a_cycle():
+    ring_set = RingSet()
+    ring_set.add(['A', 'B', 'C'], 'cycle', 95.0)
+    ring_set.add(['C', 'A', 'B'], 'fan_in', 85.0, roles={'A': 'aggregator', 'B': 'smurf_sender', 'C': 'smurf_sender'})
+    ring_set.add(['A', 'D', 'E'], 'fan_out', 85.0, roles={'A': 'distributor'})
+    return ring_set
+
+
+def test_repeated_member_set_is_merged_into_the_first_ring():
+    ring_set = _fan_in_over_a_cycle()
+    assert len(ring_set) == 2 and ring_set.duplicates == 1
+    ring = ring_set.rings[0]
+    assert (ring['ring_id'], ring['pattern_type'], ring['pattern_types']) == ('RING_001', 'cycle', ['cycle', 'fan_in'])
+    assert ring_set.account_rings['A'] == [('RING_001', 'cycle'), ('RING_001', 'aggregator'),
+                                           ('RING_002', 'distributor')]
+    assert ring_set.account_rings['D'] == [('RING_002', 'fan_out')]
+
+
+def test_same_ring_twice_adds_nothing():
+    ring_set = RingSet()
+    ring_set.add(['A', 'B', 'C'], 'cycle', 95.0)
+    ring_set.add(['B', 'C', 'A'], 'cycle', 95.0)
+    assert ring_set.rings[0]['pattern_types'] == ['cycle']
+    assert ring_set.account_rings['B'] == [('RING_001', 'cycle')]
+
+
+def test_clusters_keep_merged_patterns_and_roles():
+    ring_set = _fan_in_over_a_cycle()
+    ring_set.add(['X', 'Y', 'Z'], 'cycle', 95.0)
+    clusters = consolidate_rings(ring_set.rings, ring_set.account_rings)
+    assert [cluster['ring_ids'] for cluster in clusters] == [['RING_001', 'RING_002'], ['RING_003']]
+    first = clusters[0]
+    assert sorted(first['member_accounts']) == ['A', 'B', 'C', 'D', 'E']
+    assert first['pattern_composition'] == {'cycle': 1, 'fan_in': 1, 'fan_out': 1}
+    assert first['member_roles']['A'] == ['cycle', 'aggregator', 'distributor']
+    assert first['member_roles']['B'] == ['cycle', 'smurf_sender']
+    assert first['risk_score'] == 95.0
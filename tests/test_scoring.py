@@ -0,0 +1,30 @@
+from scoring import build_ring_index, generate_scores
+
+
+def _results():
+    rings = [
+        {'ring_id': 'RING_001', 'member_accounts': ['A', 'B', 'C'], 'pattern_type': 'cycle', 'risk_score': 95.0},
+        {'ring_id': 'RING_002', 'member_accounts': ['C', 'S1', 'S2'], 'pattern_type': 'fan_in', 'risk_score': 85.0,
+         'aggregator': 'C'},
+        {'ring_id': 'RING_003', 'member_accounts': ['X', 'SHOP_1', 'Y'], 'pattern_type': 'cycle', 'risk_score': 95.0},
+    ]
+    accounts = ['A', 'B', 'C', 'S1', 'S2', 'X', 'SHOP_1', 'Y']
+    return {'suspicious_accounts': accounts, 'fraud_rings': rings, 'summary': {'total_accounts_analyzed': 9}}
+
+
+def test_ring_index_lists_memberships_in_ring_order():
+    index = build_ring_index(_results()['fraud_rings'], excluded={'SHOP_1'})
+    assert index['C'] == [('RING_001', 'cycle'), ('RING_002', 'fan_in')]
+    assert 'SHOP_1' not in index
+
+
+def test_merchant_rings_are_dropped_and_accounts_keep_their_best_ring():
+    scored = generate_scores(_results())
+    assert [ring['ring_id'] for ring in scored['fraud_rings']] == ['RING_001', 'RING_002']
+    accounts = {account['account_id']: account for account in scored['suspicious_accounts']}
+    assert set(accounts) == {'A', 'B', 'C', 'S1', 'S2'}
+    assert (accounts['C']['suspicion_score'], accounts['C']['ring_id'], accounts['C']['ring_count']) == (95.0, 'RING_001', 2)
+    assert accounts['C']['detected_patterns'] == ['cycle_length_3', 'smurfing_aggregator']
+    assert accounts['S1']['suspicion_score'] == 70.0
+    assert scored['fraud_rings'][1]['risk_score'] == round((95.0 + 70.0 + 70.0) / 3, 1)
+    assert scored['summary']['multi_ring_accounts'] == 1
@@ -0,0 +1,34 @@
+from compact_graph import CompactGraph
+from conftest import transactions
+from pipeline import Pipeline
+from shells import iter_shell_chains, maximal_paths
+
+
+def _shell_rings(df):
+    with Pipeline(df, params={'detectors': ['shell_chains']}) as pipeline:
+        pipeline.detect()
+        rings = pipeline.score()[0]
+    return [ring['member_accounts'] for ring in rings]
+
+
+def test_planted_chain_is_one_ring():
+    chain = list('ABCDEF')
+    assert _shell_rings(transactions(list(zip(chain, chain[1:])))) == [chain]
+
+
+def test_each_of_several_chains_is_one_ring():
+    chains = [[f'{name}{i}' for i in range(length)] for name, length in (('P', 4), ('Q', 5), ('R', 6))]
+    edges = [edge for chain in chains for edge in zip(chain, chain[1:])]
+    assert sorted(_shell_rings(transactions(edges))) == chains
+
+
+def test_chain_longer_than_the_limit_is_not_reported_as_all_its_pieces():
+    chain = list('ABCDEFG')
+    graph = CompactGraph.from_frame(transactions(list(zip(chain, chain[1:]))))
+    paths = [graph.labels[path].tolist() for path in iter_shell_chains(graph, max_edges=5)]
+    assert paths == [list('ABCDEF'), list('BCDEFG')]
+
+
+def test_maximal_paths_drops_sub_paths_and_repeats():
+    paths = [[1, 2, 3, 4, 5], [2, 3, 4, 5], [1, 2, 3, 4, 5], [7, 2, 3, 4]]
+    assert maximal_paths(paths) == [[1, 2, 3, 4, 5], [7, 2, 3, 4]]
@@ -0,0 +1,57 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from compact_graph import CompactGraph
+from snapshot import load_graph, prune_snapshots, save_graph
+
+
+def _graph(n):
+    df = pd.DataFrame({'transaction_id': [f'T{i}' for i in range(n)],
+                       'sender_id': [f'A{i}' for i in range(n)],
+                       'receiver_id': [f'A{(i + 1) % n}' for i in range(n)],
+                       'amount': np.ones(n),
+                       'timestamp': pd.date_range('2024-01-01', periods=n, freq='h')})
+    return CompactGraph.from_frame(df)
+
+
+def test_resaving_swaps_the_snapshot_without_a_gap(tmp_path):
+    path = str(tmp_path / 'result')
+    save_graph(_graph(5), path)
+    first = load_graph(path)
+    save_graph(_graph(7), path)
+    assert load_graph(path).number_of_nodes() == 7
+    # The replaced snapshot stays readable through pages already mapped
+    assert first.number_of_nodes() == 5 and list(first.out_dst) == list(_graph(5).out_dst)
+    assert sorted(name for name in os.listdir(tmp_path) if not name.startswith('.')) == ['result']
+    assert len([name for name in os.listdir(tmp_path) if name.startswith('.')]) == 1
+
+
+def test_concurrent_writers_of_one_path_do_not_collide(tmp_path):
+    path = str(tmp_path / 'result')
+    errors = []
+
+    def write(n):
+        try:
+            save_graph(_graph(n), path)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(3, 11)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert load_graph(path).number_of_nodes() in range(3, 11)
+
+
+def test_prune_removes_links_and_their_data(tmp_path):
+    for k in range(3):
+        save_graph(_graph(4), str(tmp_path / f'r{k}'))
+        os.utime(tmp_path / f'r{k}', (k, k))
+    prune_snapshots(str(tmp_path), keep=1)
+    assert sorted(name for name in os.listdir(tmp_path) if not name.startswith('.')) == ['r2']
+    assert len([name for name in os.listdir(tmp_path) if name.startswith('.')]) == 1
@@ -0,0 +1,43 @@
+import pytest
+
+from conftest import transactions
+from store import TransactionStore
+
+
+def _frame(rows):
+    return transactions([row[1:] for row in rows], ids=[row[0] for row in rows])
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TransactionStore(str(tmp_path / 'history.db'))
+    store.append(_frame([('T1', 'A', 'B', 0), ('T2', 'B', 'C', 5), ('T3', 'C', 'D', 10), ('T4', 'X', 'Y', 20)]))
+    yield store
+    store.close()
+
+
+def test_append_skips_transaction_ids_already_stored(store):
+    assert store.append(_frame([('T1', 'A', 'B', 0), ('T5', 'D', 'E', 30)])) == 1
+    assert len(store) == 5
+
+
+def test_time_range_is_inclusive_and_typed(store):
+    df = store.time_range(start='2024-01-01 05:00', end='2024-01-01 10:00')
+    assert sorted(df['transaction_id']) == ['T2', 'T3']
+    assert df['timestamp'].dtype == 'datetime64[ns]'
+    assert len(store.time_range()) == 4
+
+
+def test_account_queries_expand_by_hops(store):
+    assert sorted(store.accounts(['B'])['transaction_id']) == ['T1', 'T2']
+    assert sorted(store.accounts(['B'], hops=2)['transaction_id']) == ['T1', 'T2', 'T3']
+    assert sorted(store.accounts(['B'], hops=2, end='2024-01-01 05:00')['transaction_id']) == ['T1', 'T2']
+
+
+def test_reads_see_appends_from_another_connection(store, tmp_path):
+    assert sorted(store.accounts(['Y'])['transaction_id']) == ['T4']
+    other = TransactionStore(str(tmp_path / 'history.db'))
+    other.append(_frame([('T5', 'Y', 'Z', 30)]))
+    other.close()
+    assert sorted(store.accounts(['Y'])['transaction_id']) == ['T4', 'T5']
+    assert not store._conn.in_transaction
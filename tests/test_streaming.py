@@ -0,0 +1,64 @@
+import pytest
+
+import app
+from conftest import transactions
+from streaming import StreamingDetector
+
+
+def test_accounts_carry_every_ring_like_the_batch_schema():
+    detector = StreamingDetector()
+    result = detector.ingest(transactions([('A', 'B', 0), ('B', 'C', 1), ('C', 'A', 2)]
+                                          + [(f'S{i}', 'A', 3 + i) for i in range(4)]))
+    account = next(acc for acc in result['suspicious_accounts'] if acc['account_id'] == 'A')
+    assert account['ring_count'] == 2
+    assert account['ring_id'] == account['ring_ids'][0]
+    assert account['detected_patterns'] == ['aggregator', 'cycle']
+
+
+def test_state_and_rings_older_than_the_window_are_evicted():
+    detector = StreamingDetector(window_hours=72)
+    detector.ingest(transactions([('A', 'B', 0), ('B', 'C', 1), ('C', 'A', 2)]))
+    assert len(detector.rings) == 1
+    detector.ingest(transactions([('X', 'Y', 200)]))
+    detector.ingest(transactions([('Y', 'Z', 201)]))
+    assert not detector.rings and not detector.ring_roles
+    assert set(detector.account_rings) == set()
+    assert set(detector.in_windows) == {'Y', 'Z'}
+    assert set(detector.out_counts) == {'X', 'Y'}
+
+
+def test_late_transactions_leave_no_seen_ids_behind():
+    detector = StreamingDetector(window_hours=72)
+    detector.ingest(transactions([('X', 'Y', 200)]))
+    detector.ingest(transactions([(f'L{i}', 'M', 0) for i in range(1000)]))
+    assert len(detector.seen_ids) == 1 and len(detector.expiry) == 1
+    duplicate = transactions([('X', 'Y', 200)])
+    assert detector.ingest(duplicate)['summary']['live_edges'] == 1
+
+
+def test_mixed_type_ids_are_compared_as_strings():
+    detector = StreamingDetector()
+    df = transactions([(1, 'B', 0), ('B', 2, 0), (2, 1, 0), ('A', 'B', 0)], ids=[7, 'T1', 8.5, None])
+    result = detector.ingest(df)
+    assert sorted(result['fraud_rings'][0]['member_accounts']) == ['1', '2', 'B']
+    assert detector.seen_ids == {'7', 'T1', '8.5'}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, 'STREAM', StreamingDetector())
+    return app.app.test_client()
+
+
+def test_ingest_rejects_bad_values_with_json_400(client):
+    response = client.post('/ingest', json={'transactions': [
+        {'transaction_id': 'T1', 'sender_id': 'A', 'receiver_id': 'B', 'amount': 1, 'timestamp': 'not a date'}]})
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    assert not app.STREAM.expiry
+
+
+def test_ingest_of_an_empty_batch_is_a_no_op(client):
+    response = client.post('/ingest', json={'transactions': []})
+    assert response.status_code == 200
+    assert response.get_json()['fraud_rings'] == []
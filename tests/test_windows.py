@@ -0,0 +1,52 @@
+import numpy as np
+
+from compact_graph import CompactGraph
+from conftest import transactions
+from pipeline import Pipeline
+from streaming import StreamingDetector
+from windows import NS_PER_HOUR, find_windows
+
+
+def _fan_in_frame(senders, hours_apart=1):
+    return transactions([(sender, 'HUB', hours_apart * i) for i, sender in enumerate(senders)])
+
+
+def test_repeated_counterparties_inside_one_window_are_a_fan_in():
+    # Regression: any 4 consecutive rows hold at most 2 senders, but the 72h
+    # window holds all 3, so streaming flagged this and batch did not.
+    df = _fan_in_frame(['A', 'A', 'A', 'B', 'B', 'B', 'C', 'C', 'C'])
+    graph = CompactGraph.from_frame(df)
+    keys, ts, others = graph.sorted_edges('in')
+    starts, ends = find_windows(keys, ts, others, hours=72, min_txs=4, min_counterparties=3)
+    assert len(starts) == 1
+    assert set(graph.labels[others[starts[0]:ends[0]]].tolist()) == {'A', 'B', 'C'}
+
+    streamed = StreamingDetector().ingest(df)
+    assert [ring['pattern_type'] for ring in streamed['fraud_rings']] == ['fan_in']
+
+
+def test_window_spans_hours_not_rows():
+    df = _fan_in_frame(['A', 'B', 'C', 'D'], hours_apart=30)
+    graph = CompactGraph.from_frame(df)
+    keys, ts, others = graph.sorted_edges('in')
+    starts, _ = find_windows(keys, ts, others, hours=72, min_txs=4, min_counterparties=3)
+    assert len(starts) == 0
+    starts, _ = find_windows(keys, ts, others, hours=90, min_txs=4, min_counterparties=3)
+    assert len(starts) == 1
+
+
+def test_excluded_rows_close_the_window():
+    keys = np.zeros(6, dtype=np.int32)
+    ts = np.arange(6, dtype=np.int64) * NS_PER_HOUR
+    others = np.arange(6, dtype=np.int32)
+    excluded = np.array([False, False, True, False, False, False])
+    starts, ends = find_windows(keys, ts, others, min_txs=3, min_counterparties=3, excluded=excluded)
+    assert (starts.tolist(), ends.tolist()) == ([3], [6])
+
+
+def test_a_merchant_payment_does_not_hide_a_full_span_fan_in():
+    df = _fan_in_frame(['S1', 'S2', 'S3', 'S4', 'PAYROLL_CO'])
+    with Pipeline(df, params={'detectors': ['fan_in'], 'fan_full_span': True}) as pipeline:
+        pipeline.detect()
+        rings = pipeline.score()[0]
+    assert [sorted(ring['member_accounts']) for ring in rings] == [['HUB', 'S1', 'S2', 'S3', 'S4']]
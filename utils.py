@@ -1,5 +1,8 @@
 import pandas as pd
 import networkx as nx
+from compact_graph import CompactGraph
+from features import account_features
+from merchants import MerchantClassifier
 
 def validate_csv_structure(df):
     required = ['transaction_id', 'sender_id', 'receiver_id', 'amount', 'timestamp']
@@ -7,27 +10,35 @@ def validate_csv_structure(df):
     return len(missing) == 0, missing
 
 def get_graph_metrics(G):
+    if isinstance(G, CompactGraph):
+        n, m = G.number_of_nodes(), G.number_of_edges()
+        density = m / (n * (n - 1)) if n > 1 else 0
+    else:
+        density = nx.density(G)
     return {
         "nodes": G.number_of_nodes(),
         "edges": G.number_of_edges(),
-        "density": nx.density(G),
+        "density": density,
         "is_directed": G.is_directed()
     }
 
 def find_strongly_connected_components(G):
+    if isinstance(G, CompactGraph):
+        return [set(c.tolist()) for c in G.strongly_connected_components()]
     return list(nx.strongly_connected_components(G))
 
-def calculate_transaction_velocity(df, account_id, hours=72):
-    account_txs = df[(df['sender_id'] == account_id) | (df['receiver_id'] == account_id)]
-    if len(account_txs) < 2:
+def calculate_transaction_velocity(df, account_id, hours=72, features=None):
+    if features is None:
+        # Only the account's own rows bear on its velocity
+        features = account_features(df[(df['sender_id'] == account_id) | (df['receiver_id'] == account_id)],
+                                    hours=hours)
+    if account_id not in features.index:
         return 0
-    time_span = (account_txs['timestamp'].max() - account_txs['timestamp'].min()).total_seconds() / 3600
-    return len(account_txs) / max(time_span, 1)
+    return features.at[account_id, 'velocity_per_hour']
 
 def flag_merchant_accounts(df, threshold=100):
-    receivers = df.groupby('receiver_id')['amount'].agg(['count', 'sum'])
-    return receivers[receivers['count'] > threshold].index.tolist()
-
+    classifier = MerchantClassifier(patterns=(), prefixes=(), min_receipts=threshold + 1, min_payers=1)
+    return sorted(classifier.accounts(df))
 
 # from datetime import timedelta
 
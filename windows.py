@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+NS_PER_HOUR = 3600 * 10**9
+
+
+def find_windows(keys, ts, others, hours=72, min_txs=4, min_counterparties=1,
+                 full_span=False, excluded=None, stats=None):
+    """Return (starts, ends) row ranges of the first qualifying window per account.
+
+    Rows must be sorted by (key, timestamp). A sliding window is every
+    transaction of one account in the `hours` up to one of its transactions
+    and needs at least `min_txs` of them; with `full_span` the window is all
+    of the account's transactions. Windows need `min_counterparties` distinct
+    counterparties. A sliding window may not contain `excluded` rows; a
+    full-span window has no such limit, so callers drop those rows first (see
+    graph_windows). The number of candidate windows is added to
+    stats['windows_scanned'].
+    """
+    n = len(keys)
+    limit = int(hours * NS_PER_HOUR)
+
+    if full_span:
+        bounds = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1], True]) if n else np.array([0])
+        starts, ends = bounds[:-1], bounds[1:]
+        if stats is not None:
+            stats['windows_scanned'] = stats.get('windows_scanned', 0) + (len(starts) if n else 0)
+        valid = (ends - starts >= min_txs) & (ts[ends - 1] - ts[starts] <= limit)
+        if min_counterparties > 1 and n:
+            width = np.int64(others.max()) + 1
+            pairs = np.unique(keys.astype(np.int64) * width + others)
+            distinct = np.bincount(pairs // width, minlength=keys.max() + 1)
+            valid &= distinct[keys[starts]] >= min_counterparties
+        return starts[valid], ends[valid]
+
+    if n < min_txs:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    last = min_txs - 1
+    if stats is not None:
+        stats['windows_scanned'] = stats.get('windows_scanned', 0) + n - last
+    # A window may not reach back past the account's first row or an excluded row
+    rows = np.arange(n)
+    first = np.where(np.r_[True, keys[1:] != keys[:-1]], rows, 0)
+    if excluded is not None:
+        first = np.where(excluded, rows + 1, first)
+    first = np.maximum.accumulate(first)
+    ends = rows[last:]
+    ends = ends[(ends - last >= first[ends]) & (ts[ends] - ts[ends - last] <= limit)]
+    # Second pointer: walk each window start back to the oldest row within
+    # `hours` of its end, a binary search over all candidate ends at once.
+    starts, oldest = ends - last, ts[ends] - limit
+    step = 1 << int((starts - first[ends]).max(initial=0)).bit_length()
+    while step:
+        back = starts - step
+        ok = back >= first[ends]
+        ok[ok] = ts[back[ok]] >= oldest[ok]
+        starts = np.where(ok, back, starts)
+        step >>= 1
+    if min_counterparties > 1:
+        keep = _diverse_windows(starts, ends, keys, others, min_counterparties)
+    else:
+        keep = np.r_[True, keys[ends][1:] != keys[ends][:-1]] if len(ends) else np.array([], dtype=bool)
+    return starts[keep], ends[keep] + 1
+
+
+def _diverse_windows(starts, ends, keys, others, min_counterparties):
+    """Mark each account's first window [start, end] with `min_counterparties` distinct counterparties.
+
+    Window starts never move backwards within an account, so both pointers
+    only advance and every row enters and leaves the counts at most once.
+    """
+    keep = np.zeros(len(ends), dtype=bool)
+    account, counts, left, right, done = None, {}, 0, 0, False
+    for k, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+        if keys[end] != account:
+            account, counts, left, right, done = keys[end], {}, start, start, False
+        elif done:
+            continue
+        for other in others[right:end + 1].tolist():
+            counts[other] = counts.get(other, 0) + 1
+        right = end + 1
+        for other in others[left:start].tolist():
+            counts[other] -= 1
+            if not counts[other]:
+                del counts[other]
+        left = start
+        if len(counts) >= min_counterparties:
+            keep[k] = done = True
+    return keep
+
+
+def graph_windows(graph, direction='in', hours=72, min_txs=4, min_counterparties=1,
+                  full_span=False, exclude=None, stats=None, edges=None):
+    """Find fan-in (direction='in') or fan-out ('out') windows in the time-sorted CSR edges of a CompactGraph.
+
+    Each hit is a dict with the account, its counterparties in time order and
+    the window size. Accounts and counterparties are node indices; `exclude` is a collection of
+    node indices or a boolean node mask. `edges` may pass in an already built
+    graph.sorted_edges(direction). Transactions with an excluded counterparty
+    end a sliding window; a full-span window is taken over the account's
+    other transactions, so a single merchant payment does not hide a fan.
+    """
+    keys, ts, others = edges if edges is not None else graph.sorted_edges(direction)
+    mask = graph.node_mask(exclude) if exclude is not None else None
+    excluded = mask[others] if mask is not None else None
+    if full_span and excluded is not None:
+        keep = ~excluded
+        keys, ts, others, excluded = keys[keep], ts[keep], others[keep], None
+    starts, ends = find_windows(keys, ts, others, hours=hours, min_txs=min_txs,
+                                min_counterparties=min_counterparties, full_span=full_span,
+                                excluded=excluded, stats=stats)
+
+    windows = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        account = int(keys[start])
+        if mask is not None and mask[account]:
+            continue
+        windows.append({
+            'account': account,
+            'counterparties': pd.unique(others[start:end]).tolist(),
+            'transaction_count': end - start
+        })
+    return windows